@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+"""
+gunicorn reads this file from the working directory (see Procfile).
+
+GUNICORN_PRELOAD=true loads the Django app in the master before forking the
+workers, so they share its imported modules copy-on-write; add
+PRELOAD_HEAVY_MODULES=true to include pandas and NumPy (see
+portfolio/services/preload.py). Workers and their count still come from the
+usual gunicorn flags and WEB_CONCURRENCY.
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "False").lower() == "true"
+
+
+def pre_fork(server, worker):
+    # Loading the app opens no database connection, but one the master did
+    # open must not be inherited by (and shared between) its workers.
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'marketvault.settings')
+# Serve analytics from the async views (see ASYNC_ANALYTICS_VIEWS).
+os.environ.setdefault('MARKETVAULT_ASGI', '1')
 
 application = get_asgi_application()
@@ -53,12 +53,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'portfolio.middleware.request_timing_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'portfolio.middleware.profiling_middleware',
 ]
 
 HAS_WHITENOISE = find_spec("whitenoise") is not None
@@ -194,6 +196,143 @@ else:
         }
     }
 
+# Analytics warming
+# Writes and logins recompute the user's analytics on a background pool of
+# ANALYTICS_WARM_WORKERS threads, so the next dashboard load is a cache hit.
+# `manage.py warm_analytics` warms every user; it needs a cache shared between
+# processes (the file cache used with DATABASE_URL) to be of use.
+ANALYTICS_WARMING = os.getenv("ANALYTICS_WARMING", "True").lower() == "true"
+ANALYTICS_WARM_WORKERS = int(os.getenv("ANALYTICS_WARM_WORKERS", "2"))
+
+# Background imports
+# Uploads are queued as ImportJob rows and processed by `manage.py run_import_worker`
+# (the "worker" process in the Procfile). Without a worker (local dev, tests) the
+# job runs inline in the upload request.
+IMPORT_JOBS_INLINE = os.getenv(
+    "IMPORT_JOBS_INLINE",
+    "False" if os.getenv("DATABASE_URL") else "True",
+).lower() == "true"
+# The uploaded files wait in this storage until their job has run, so the web
+# and worker processes must share it: a common IMPORT_UPLOAD_DIR, or a remote
+# storage backend when they run on separate hosts.
+IMPORT_UPLOAD_STORAGE = {
+    "BACKEND": "django.core.files.storage.FileSystemStorage",
+    "OPTIONS": {"location": os.getenv("IMPORT_UPLOAD_DIR", str(BASE_DIR / "import_uploads"))},
+}
+
+# Async analytics
+# marketvault/asgi.py sets MARKETVAULT_ASGI, which routes the analytics and price
+# refresh endpoints to portfolio/async_views.py. pandas runs on a pool of
+# ANALYTICS_EXECUTOR_WORKERS threads; up to PRICE_DOWNLOAD_CONCURRENCY symbols
+# are downloaded at once.
+ASYNC_ANALYTICS_VIEWS = os.getenv("MARKETVAULT_ASGI", "False").lower() in ("1", "true")
+ANALYTICS_EXECUTOR_WORKERS = int(os.getenv("ANALYTICS_EXECUTOR_WORKERS", "4"))
+PRICE_DOWNLOAD_CONCURRENCY = int(os.getenv("PRICE_DOWNLOAD_CONCURRENCY", "8"))
+
+# Price downloads an analytics request waits for, in seconds. Slower downloads
+# finish in the background and the payload is served from cached prices, marked
+# "stale". 0 waits for every download.
+PRICE_FETCH_DEADLINE_SECONDS = float(os.getenv("PRICE_FETCH_DEADLINE_SECONDS", "5"))
+
+# Price provider
+# "yahoo" downloads closes from Yahoo Finance. "local" serves
+# <data_symbol>.parquet / .csv files (date and close columns) from
+# PRICE_FIXTURES_DIR instead, for tests, benchmarks and air-gapped deployments;
+# PRICE_PROVIDER_LATENCY and PRICE_PROVIDER_FAILURE_RATE simulate a remote feed.
+if os.getenv("PRICE_PROVIDER", "yahoo") == "local":
+    PRICE_PROVIDER = {
+        "BACKEND": "local",
+        "OPTIONS": {
+            "directory": os.getenv("PRICE_FIXTURES_DIR", str(BASE_DIR / "price_fixtures")),
+            "latency": float(os.getenv("PRICE_PROVIDER_LATENCY", "0")),
+            "failure_rate": float(os.getenv("PRICE_PROVIDER_FAILURE_RATE", "0")),
+        },
+    }
+else:
+    PRICE_PROVIDER = {"BACKEND": os.getenv("PRICE_PROVIDER", "yahoo")}
+
+# Request timing
+# Every response carries a Server-Timing header with its stage breakdown (ORM,
+# price cache, downloads, pandas, JSON encoding) and is logged as one JSON line
+# on the "portfolio.timing" logger; requests slower than SLOW_REQUEST_SECONDS
+# are logged as warnings. REQUEST_TIMING_LOG_LEVEL=INFO logs all of them.
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "True").lower() == "true"
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "portfolio.timing": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_TIMING_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+# Metrics
+# Served in Prometheus text format at /metrics to staff users, or to scrapers
+# sending "Authorization: Bearer $METRICS_TOKEN". Each process adds its counts
+# to the SQLite file at METRICS_DB_PATH every METRICS_FLUSH_SECONDS, so the
+# endpoint reports all gunicorn workers; in development (no DATABASE_URL) the
+# counts stay in the process.
+METRICS_DB_PATH = os.getenv(
+    "METRICS_DB_PATH",
+    "/tmp/marketvault_metrics.sqlite3" if os.getenv("DATABASE_URL") else "",
+)
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Startup
+# pandas, NumPy and yfinance are imported on first use. With
+# PRELOAD_HEAVY_MODULES the WSGI entry point imports them up front instead;
+# combined with GUNICORN_PRELOAD (gunicorn.conf.py) that happens once in the
+# gunicorn master and the forked workers share the memory.
+PRELOAD_HEAVY_MODULES = os.getenv("PRELOAD_HEAVY_MODULES", "False").lower() == "true"
+
+# Query budgets
+# Requests running more queries than their endpoint's budget (QUERY_BUDGETS by
+# URL name, else QUERY_BUDGET_DEFAULT), or one SELECT more than its repeat limit
+# (QUERY_REPEAT_LIMITS by URL name, else QUERY_REPEAT_LIMIT; an N+1 pattern),
+# are logged on the "portfolio.queries" logger. With QUERY_BUDGET_STRICT they
+# raise instead; the test runner and the benchmark suite turn it on.
+QUERY_BUDGET_DEFAULT = int(os.getenv("QUERY_BUDGET_DEFAULT", "50"))
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "5"))
+QUERY_BUDGETS = {
+    # pages and single objects: a fixed number of queries whatever the page size
+    "transactions": 10,
+    "transaction": 10,
+    "assets": 10,
+    "import-job": 5,
+    "metrics": 5,
+    # an inline import runs the same few queries for every chunk of the file
+    "import": None,
+    # cold analytics requests also write the prices they download, per symbol
+    **{name: 200 for name in (
+        "analytics-growth", "analytics-allocation", "analytics-asset-growth", "analytics-dividends-monthly",
+        "analytics-winners-losers", "analytics-details", "analytics-returns", "analytics-valuation",
+    )},
+}
+QUERY_REPEAT_LIMITS = {
+    "import": None,
+}
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "False").lower() == "true"
+TEST_RUNNER = "portfolio.test_runner.PortfolioTestRunner"
+
+# Profiling
+# Staff can profile one request with ?profile=1; a PROFILE_SAMPLE_RATE share
+# (0 to 1) of analytics requests is profiled as well. Profiles go to
+# PROFILE_DIR as cProfile .prof files or, with PROFILE_FORMAT=speedscope,
+# sampled speedscope JSON, each with a .meta.json describing the request.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/marketvault_profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "cprofile")
+PROFILE_SAMPLING_INTERVAL = float(os.getenv("PROFILE_SAMPLING_INTERVAL", "0.005"))
+
 # Feature flag for self-service signup.
 # Keep False while running a private single-user deployment.
 REGISTRATION_ENABLED = False
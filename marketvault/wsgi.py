@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'marketvault.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_HEAVY_MODULES:
+    # under gunicorn --preload this runs once in the master (see gunicorn.conf.py)
+    from portfolio.services.preload import preload_heavy_modules
+
+    preload_heavy_modules()
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PortfolioConfig(AppConfig):
     name = 'portfolio'
+
+    def ready(self):
+        # registers the login hook that warms the analytics cache
+        from portfolio.services import analytics_warming  # noqa: F401
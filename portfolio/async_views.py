@@ -0,0 +1,146 @@
+"""
+Async versions of the analytics and price-refresh views, routed instead of the
+sync ones when ASYNC_ANALYTICS_VIEWS is set (the ASGI entry point sets it).
+
+A slow price download no longer ties up a worker: ORM reads go through async
+querysets, pandas runs on a bounded thread pool and symbol downloads are
+awaited concurrently (see services/async_analytics.py).
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Asset
+from .services.analytics_cache import (
+    analytics_cache_key,
+    invalidate_analytics_cache,
+    payload_cache_timeout,
+    priced_value,
+    return_period,
+)
+from .services.conditional import conditional_get, payload_response, prices_version
+from .services.profiling import bypass_cache
+from .services.request_timing import record_cache
+
+PANDAS_MISSING = {"error": "Analytics is unavailable because pandas is not installed"}
+
+
+async def _cached_payload(request, entry, function_name, **kwargs):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+
+    try:
+        from portfolio.services import analytics
+        from portfolio.services.async_analytics import analytics_payload
+    except ModuleNotFoundError:
+        return JsonResponse(PANDAS_MISSING, status=500)
+
+    user = await request.auser()
+    key = analytics_cache_key(user.id, entry)
+    version = await sync_to_async(prices_version)(user.id)
+    payload = None if bypass_cache() else priced_value(await cache.aget(key), version)
+    record_cache(entry, payload is not None)
+    if payload is None:
+        payload = await analytics_payload(user, getattr(analytics, function_name), **kwargs)
+        await cache.aset(key, (version, payload), payload_cache_timeout(payload))
+    return payload_response(payload)
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_growth(request):
+    return await _cached_payload(request, "growth", "growth_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_allocation(request):
+    return await _cached_payload(request, "allocation", "allocation_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_asset_growth(request):
+    return await _cached_payload(request, "asset_growth", "asset_growth_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_dividends_monthly(request):
+    return await _cached_payload(request, "dividends_monthly", "dividends_monthly_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_winners_losers(request):
+    period = return_period(request.GET.get("range"))
+    return await _cached_payload(request, f"winners_losers:{period}", "winners_losers_payload", period=period)
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_details(request):
+    return await _cached_payload(request, "details", "details_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_returns(request):
+    return await _cached_payload(request, "returns_payload", "returns_payload")
+
+
+@login_required
+@conditional_get(prices=True)
+async def analytics_valuation(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+
+    try:
+        from portfolio.services.async_analytics import analytics_payload
+        from portfolio.services.analytics import valuation_payload
+    except ModuleNotFoundError:
+        return JsonResponse(PANDAS_MISSING, status=500)
+
+    as_of = None
+    if request.GET.get("as_of"):
+        try:
+            as_of = parse_date(request.GET["as_of"])
+        except ValueError:
+            as_of = None
+        if as_of is None:
+            return JsonResponse({"error": "as_of must be a date (YYYY-MM-DD)"}, status=400)
+        if as_of > timezone.now().date():
+            return JsonResponse({"error": "as_of cannot be in the future"}, status=400)
+
+    user = await request.auser()
+    payload = await analytics_payload(user, valuation_payload, as_of=as_of)
+    return payload_response(payload)
+
+
+@login_required
+async def refresh_asset_prices(request, asset_id):
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+
+    try:
+        from portfolio.services.async_analytics import run_in_executor
+        from portfolio.services.prices_cache import refresh_asset_price_history
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Price refresh is unavailable because pandas is not installed"}, status=500)
+
+    user = await request.auser()
+    try:
+        asset = await Asset.objects.aget(id=asset_id, user=user)
+    except Asset.DoesNotExist:
+        return JsonResponse({"error": "Asset not found"}, status=404)
+
+    result = await run_in_executor("downloads", refresh_asset_price_history, asset, user=user)
+    await run_in_executor("downloads", invalidate_analytics_cache, user, [asset.data_symbol])
+    return JsonResponse({
+        "asset_id": asset.id,
+        "data_symbol": asset.data_symbol,
+        "price_refresh": result,
+    })
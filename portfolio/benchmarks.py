@@ -0,0 +1,411 @@
+# portfolio/benchmarks.py
+"""
+Analytics benchmark suite: synthetic portfolios, a stubbed price provider and
+timed cases for the payloads, the price cache and the import/export paths.
+
+Run it with `manage.py benchmark_analytics` (JSON results for tracking
+regressions across commits) or, at a tiny scale, as the tests tagged
+"benchmark". measure_startup() times a fresh worker's app loading for
+`manage.py benchmark_startup`.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+import django
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction as db_transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from portfolio.models import Asset, PricePoint, Transaction, User
+from portfolio.services.query_budget import count_queries, find_problems, report
+
+CRYPTO_SUFFIX = "-EUR"
+
+
+@dataclass
+class Scale:
+    assets: int = 20
+    transactions: int = 5_000
+    years: int = 5
+    crypto_share: float = 0.2
+    seed: int = 0
+
+
+@dataclass
+class CaseResult:
+    name: str
+    group: str
+    runs: list = field(default_factory=list)
+    peak_memory_bytes: int | None = 0
+    queries: int = 0
+    query_problems: list = field(default_factory=list)
+
+    @property
+    def wall_seconds(self):
+        return statistics.median(self.runs)
+
+    def as_dict(self):
+        return {**asdict(self), "wall_seconds": self.wall_seconds, "min_seconds": min(self.runs)}
+
+
+def stub_download_close_prices(symbols, start_date, end_date):
+    """
+    A deterministic stand-in for prices_yahoo.download_close_prices. Crypto
+    symbols trade every day, the others on weekdays only, like the real feeds.
+    Every symbol gets its own random walk so the cache's duplicate-series guard
+    never triggers.
+    """
+    end = pd.Timestamp(end_date) - pd.Timedelta(days=1)
+    frames = {}
+    for symbol in symbols:
+        if symbol.endswith(CRYPTO_SUFFIX):
+            index = pd.date_range(start_date, end, freq="D")
+        else:
+            index = pd.bdate_range(start_date, end)
+        rng = np.random.default_rng(sum(map(ord, symbol)))
+        steps = rng.normal(0.0003, 0.015, len(index))
+        frames[symbol] = pd.Series(20.0 * np.exp(np.cumsum(steps)), index=index)
+    return pd.DataFrame(frames)
+
+
+@contextmanager
+def stubbed_price_provider():
+    with patch("portfolio.services.prices_cache.download_close_prices", side_effect=stub_download_close_prices) as stub:
+        yield stub
+
+
+def create_synthetic_portfolio(scale, username=None):
+    """A user with scale.assets assets and scale.transactions transactions spread over scale.years years."""
+    rng = np.random.default_rng(scale.seed)
+    user = User.objects.create(username=username or f"benchmark-{uuid.uuid4().hex[:12]}")
+
+    crypto_count = int(round(scale.assets * scale.crypto_share))
+    assets = []
+    for number in range(scale.assets):
+        is_crypto = number < crypto_count
+        assets.append(Asset(
+            user=user,
+            ticker=f"SYN{number}",
+            name=f"Synthetic {number}",
+            asset_type=Asset.AssetType.CRYPTO if is_crypto else Asset.AssetType.STOCK,
+            data_symbol=f"SYN{number}{CRYPTO_SUFFIX}" if is_crypto else f"SYN{number}.AS",
+        ))
+    assets = Asset.objects.bulk_create(assets)
+
+    now = timezone.now()
+    seconds = np.sort(rng.integers(0, scale.years * 365 * 86400, scale.transactions))
+    asset_numbers = rng.integers(0, len(assets), scale.transactions)
+    kinds = rng.choice(np.array(["BUY", "SELL", "DIV"]), size=scale.transactions, p=[0.7, 0.15, 0.15])
+
+    transactions = []
+    for offset, asset_number, kind in zip(seconds, asset_numbers, kinds):
+        asset = assets[asset_number]
+        if kind == "DIV" and asset.asset_type == Asset.AssetType.CRYPTO:
+            kind = "BUY"
+        transaction = Transaction(
+            user=user,
+            asset=asset,
+            txn_type=kind,
+            timestamp=now - timedelta(seconds=int(scale.years * 365 * 86400 - offset)),
+        )
+        if kind == "DIV":
+            transaction.div_amount = Decimal(str(round(rng.uniform(0.5, 30), 2)))
+        else:
+            transaction.quantity = Decimal(str(round(rng.uniform(0.1, 5 if kind == "BUY" else 1), 4)))
+            transaction.unit_price = Decimal(str(round(rng.uniform(5, 200), 2)))
+        transaction.row_hash = transaction.compute_row_hash()
+        transactions.append(transaction)
+    Transaction.objects.bulk_create(transactions, batch_size=2000)
+    return user
+
+
+def measure(name, group, function, repeat=1, setup=None, trace_memory=True):
+    """
+    Time function() `repeat` times, then run it once more under tracemalloc
+    for its peak memory: tracing slows pandas down several times over, so it
+    stays out of the timed runs. setup(), if given, runs before every run and
+    is not measured. The query count is taken from the last timed run, whose
+    queries are also checked for N+1 patterns (see services/query_budget.py).
+    """
+    result = CaseResult(name=name, group=group)
+    for _run in range(repeat):
+        if setup is not None:
+            setup()
+        with count_queries() as templates:
+            started = time.perf_counter()
+            function()
+            result.runs.append(time.perf_counter() - started)
+        result.queries = sum(templates.values())
+    result.query_problems = find_problems(result.queries, templates)
+    report(f"benchmark {name}", result.query_problems)
+
+    if not trace_memory:
+        result.peak_memory_bytes = None
+        return result
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        _current, result.peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def _price_window(user):
+    start = Transaction.objects.filter(user=user).order_by("timestamp").values_list("timestamp", flat=True).first()
+    today = timezone.now().date()
+    return (start.date() if start else today).isoformat(), (today + timedelta(days=1)).isoformat()
+
+
+def _price_cases(user, repeat, trace_memory):
+    from portfolio.services.prices_cache import get_close_prices_cached
+
+    symbols = list(Asset.objects.filter(user=user).values_list("data_symbol", flat=True))
+    start_date, end_date = _price_window(user)
+
+    def fetch():
+        get_close_prices_cached(symbols, start_date, end_date, user=user)
+
+    def drop_prices():
+        PricePoint.objects.filter(asset__user=user).delete()
+
+    def age_prices():
+        # the last week is missing, so every symbol is refreshed
+        PricePoint.objects.filter(asset__user=user, date__gte=timezone.now().date() - timedelta(days=7)).delete()
+
+    return [
+        measure("get_close_prices_cached:cold", "prices", fetch, repeat, drop_prices, trace_memory),
+        measure("get_close_prices_cached:stale", "prices", fetch, repeat, age_prices, trace_memory),
+        measure("get_close_prices_cached:warm", "prices", fetch, repeat, None, trace_memory),
+    ]
+
+
+def _payload_cases(user, repeat, trace_memory):
+    from portfolio.services import analytics
+    from portfolio.services.analytics_cache import invalidate_analytics_cache
+
+    cases = [
+        ("growth_payload", {}),
+        ("allocation_payload", {}),
+        ("asset_growth_payload", {}),
+        ("dividends_monthly_payload", {}),
+        ("winners_losers_payload", {"period": "1Y"}),
+        ("details_payload", {}),
+        ("returns_payload", {}),
+        ("valuation_payload", {}),
+    ]
+    results = []
+    for name, kwargs in cases:
+        function = getattr(analytics, name)
+        # cold analytics cache, warm price cache: the cost of the payload itself
+        results.append(measure(
+            name, "payloads",
+            lambda function=function, kwargs=kwargs: function(user, **kwargs),
+            repeat,
+            setup=lambda: invalidate_analytics_cache(user, warm=False),
+            trace_memory=trace_memory,
+        ))
+    return results
+
+
+def _import_export_cases(user, scale, repeat, trace_memory):
+    from portfolio.management.commands.benchmark_import import synthetic_transactions
+    from portfolio.services.exports import iter_csv_export, write_xlsx_export
+    from portfolio.services.imports import import_transactions
+
+    rows = synthetic_transactions(scale.transactions, symbols=scale.assets, seed=scale.seed)
+    payload = rows.to_csv(index=False).encode()
+
+    def run_import():
+        with db_transaction.atomic():
+            target = User.objects.create(username=f"benchmark-import-{uuid.uuid4().hex[:12]}")
+            upload = BytesIO(payload)
+            upload.name = "transactions.csv"
+            import_transactions(target, upload, ".csv")
+            db_transaction.set_rollback(True)
+
+    def run_csv_export():
+        for _piece in iter_csv_export(user):
+            pass
+
+    def run_xlsx_export():
+        write_xlsx_export(user).close()
+
+    return [
+        measure("import_transactions:csv", "import_export", run_import, repeat, None, trace_memory),
+        measure("export:csv", "import_export", run_csv_export, repeat, None, trace_memory),
+        measure("export:xlsx", "import_export", run_xlsx_export, repeat, None, trace_memory),
+    ]
+
+
+GROUPS = ("prices", "payloads", "import_export")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(scale=None, repeat=3, groups=GROUPS, trace_memory=True, progress=None, strict_queries=True):
+    """
+    Build a synthetic portfolio, run the selected case groups against it with
+    the stubbed price provider and return the results as a JSON-ready dict.
+    Everything written to the database is rolled back afterwards. Without
+    trace_memory, peak_memory_bytes is None and every case runs `repeat` times
+    instead of `repeat` + 1. With strict_queries a case with an N+1 query
+    pattern raises QueryBudgetExceeded; otherwise it is logged and listed in
+    the case's query_problems.
+    """
+    scale = scale or Scale()
+    results = []
+
+    with (
+        override_settings(QUERY_BUDGET_STRICT=strict_queries),
+        stubbed_price_provider(),
+        db_transaction.atomic(),
+    ):
+        started = time.perf_counter()
+        user = create_synthetic_portfolio(scale)
+        setup_seconds = time.perf_counter() - started
+
+        for group in groups:
+            if group == "prices":
+                group_results = _price_cases(user, repeat, trace_memory)
+            elif group == "payloads":
+                group_results = _payload_cases(user, repeat, trace_memory)
+            else:
+                group_results = _import_export_cases(user, scale, repeat, trace_memory)
+            for result in group_results:
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+
+        from portfolio.services.analytics_cache import invalidate_analytics_cache
+
+        invalidate_analytics_cache(user, warm=False)
+        db_transaction.set_rollback(True)
+
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "pandas": pd.__version__,
+            "database": connection.vendor,
+            "scale": asdict(scale),
+            "repeat": repeat,
+            "trace_memory": trace_memory,
+            "strict_queries": strict_queries,
+            "setup_seconds": setup_seconds,
+        },
+        "results": [result.as_dict() for result in results],
+    }
+
+
+# Worker startup: what a fresh process pays to load the app, measured in a
+# child interpreter so nothing this process imported is counted.
+
+HEAVY_MODULES = ("numpy", "pandas", "yfinance", "scipy", "openpyxl", "pyarrow")
+
+_STARTUP_SCRIPT = """
+import json, os, resource, sys, time
+from importlib import import_module
+
+started = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+import_module(settings.ROOT_URLCONF)
+if sys.argv[1] == "preload":
+    from portfolio.services.preload import preload_heavy_modules
+    preload_heavy_modules()
+seconds = time.perf_counter() - started
+
+try:
+    # current RSS; ru_maxrss would include the parent's peak on Linux
+    with open("/proc/self/statm") as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss = rss if sys.platform == "darwin" else rss * 1024
+print(json.dumps({
+    "seconds": seconds,
+    "rss_bytes": rss,
+    "modules": sorted(name for name in sys.modules if "." not in name),
+}))
+"""
+
+
+@dataclass
+class StartupResult:
+    name: str
+    runs: list = field(default_factory=list)
+    rss_bytes: int = 0
+    heavy_modules: list = field(default_factory=list)
+    slowest_imports: list = field(default_factory=list)
+
+    @property
+    def wall_seconds(self):
+        return statistics.median(self.runs)
+
+    def as_dict(self):
+        return {**asdict(self), "wall_seconds": self.wall_seconds, "min_seconds": min(self.runs)}
+
+
+def _slowest_imports(importtime_output, limit):
+    # "import time: self [us] | cumulative | imported package"; nested imports are indented
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            imports.append((name.strip(), int(cumulative) / 1_000_000))
+    return [
+        {"module": name, "cumulative_seconds": seconds}
+        for name, seconds in sorted(imports, key=lambda item: -item[1])[:limit]
+    ]
+
+
+def measure_startup(preload=False, repeat=3, slowest=10):
+    """
+    Start `repeat` interpreters that set up Django and import the URLconf, as
+    a worker does before its first request, plus preload_heavy_modules() with
+    preload. Reports the median time, the largest resident memory, which of HEAVY_MODULES
+    ended up imported and the slowest top-level imports (python -X importtime).
+    """
+    from django.conf import settings
+
+    result = StartupResult(name="startup:preload" if preload else "startup")
+    for _run in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _STARTUP_SCRIPT, "preload" if preload else "lazy"],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR, timeout=120,
+        )
+        child = json.loads(completed.stdout.strip().splitlines()[-1])
+        result.runs.append(child["seconds"])
+        result.rss_bytes = max(result.rss_bytes, child["rss_bytes"])
+        result.heavy_modules = [name for name in HEAVY_MODULES if name in child["modules"]]
+        result.slowest_imports = _slowest_imports(completed.stderr, slowest)
+    return result
@@ -0,0 +1,79 @@
+# portfolio/management/commands/benchmark_analytics.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.benchmarks import GROUPS, Scale, run_suite
+from portfolio.services.query_budget import QueryBudgetExceeded
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the analytics payloads, the price cache and import/export against a synthetic "
+        "portfolio with a stubbed price provider. Writes JSON results for comparison across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assets", type=int, default=Scale.assets)
+        parser.add_argument("--transactions", type=int, default=Scale.transactions)
+        parser.add_argument("--years", type=int, default=Scale.years)
+        parser.add_argument(
+            "--crypto-share",
+            type=float,
+            default=Scale.crypto_share,
+            help="Share of assets priced on a 7-day calendar.",
+        )
+        parser.add_argument("--seed", type=int, default=Scale.seed)
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported.")
+        parser.add_argument("--groups", nargs="+", default=list(GROUPS), help=f"Any of: {' '.join(GROUPS)}")
+        parser.add_argument(
+            "--skip-memory",
+            action="store_true",
+            help="Leave out the extra tracemalloc run per case that measures peak memory.",
+        )
+        parser.add_argument(
+            "--allow-query-problems",
+            action="store_true",
+            help="Log N+1 query patterns and report them in the results instead of failing.",
+        )
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        unknown = set(options["groups"]) - set(GROUPS)
+        if unknown:
+            raise CommandError(f"Unknown groups: {', '.join(sorted(unknown))}")
+        if options["repeat"] < 1 or options["assets"] < 1 or options["transactions"] < 1 or options["years"] < 1:
+            raise CommandError("--repeat, --assets, --transactions and --years must be positive")
+        if not 0 <= options["crypto_share"] <= 1:
+            raise CommandError("--crypto-share must be between 0 and 1")
+
+        scale = Scale(
+            assets=options["assets"],
+            transactions=options["transactions"],
+            years=options["years"],
+            crypto_share=options["crypto_share"],
+            seed=options["seed"],
+        )
+        try:
+            report = run_suite(
+                scale,
+                repeat=options["repeat"],
+                groups=[group for group in GROUPS if group in options["groups"]],
+                trace_memory=not options["skip_memory"],
+                progress=self._progress if options["output"] else None,
+                strict_queries=not options["allow_query_problems"],
+            )
+        except QueryBudgetExceeded as exc:
+            raise CommandError(f"Query budget exceeded in {exc}")
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
+
+    def _progress(self, result):
+        memory = "" if result.peak_memory_bytes is None else f"{result.peak_memory_bytes / 2**20:8.1f} MiB  "
+        self.stdout.write(f"{result.name:<34} {result.wall_seconds * 1000:10.1f} ms  {memory}{result.queries:6d} queries")
@@ -0,0 +1,167 @@
+# portfolio/management/commands/benchmark_async_analytics.py
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import ModuleType
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+from django.utils import timezone
+
+from portfolio import async_views, views
+from portfolio.models import Asset, Transaction, User
+from portfolio.services.prices_cache import wait_for_background_fetches
+
+# The requests the dashboard fires on load.
+DASHBOARD_ENDPOINTS = (
+    ("analytics/growth", "analytics_growth"),
+    ("analytics/allocation", "analytics_allocation"),
+    ("analytics/asset-growth", "analytics_asset_growth"),
+    ("analytics/dividends-monthly", "analytics_dividends_monthly"),
+    ("analytics/winners-losers", "analytics_winners_losers"),
+    ("analytics/details", "analytics_details"),
+)
+
+
+def _urlconf(view_module):
+    urlconf = ModuleType(f"benchmark_urls_{view_module.__name__.rsplit('.', 1)[-1]}")
+    urlconf.urlpatterns = [path(route, getattr(view_module, name)) for route, name in DASHBOARD_ENDPOINTS]
+    return urlconf
+
+
+def slow_download(latency):
+    """A stand-in for the Yahoo download that sleeps, then returns a distinct series per symbol."""
+
+    def download_close_prices(symbols, start_date, end_date):
+        time.sleep(latency)
+        index = pd.date_range(start_date, pd.Timestamp(end_date) - pd.Timedelta(days=1), freq="D")
+        return pd.DataFrame(
+            {symbol: 10.0 + (sum(map(ord, symbol)) % 97) + np.arange(len(index)) * 0.01 for symbol in symbols},
+            index=index,
+        )
+
+    return download_close_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sync (WSGI) and async (ASGI) analytics views under concurrent cold dashboard "
+        "loads, with a slow stubbed price provider."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=8, help="Concurrent dashboard loads.")
+        parser.add_argument("--symbols", type=int, default=4, help="Assets per user.")
+        parser.add_argument("--latency", type=float, default=0.5, help="Seconds per stubbed price download.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Sync workers (requests handled at once) for the WSGI run. The ASGI run uses one event loop.",
+        )
+
+    def handle(self, *args, **options):
+        with patch("portfolio.services.prices_cache.download_close_prices", slow_download(options["latency"])):
+            for mode in ("wsgi", "asgi"):
+                users = self._create_users(mode, options["users"], options["symbols"])
+                cache.clear()
+                try:
+                    with override_settings(
+                        ROOT_URLCONF=_urlconf(async_views if mode == "asgi" else views),
+                        ALLOWED_HOSTS=["testserver"],
+                    ):
+                        started = time.perf_counter()
+                        if mode == "wsgi":
+                            latencies = self._run_wsgi(users, options["workers"])
+                        else:
+                            latencies = asyncio.run(self._run_asgi(users))
+                        seconds = time.perf_counter() - started
+                finally:
+                    # downloads that missed the request deadline still write to these users' assets
+                    wait_for_background_fetches()
+                    self._delete_users(users)
+
+                self._report(mode, latencies, seconds)
+
+    def _create_users(self, mode, user_count, symbol_count):
+        run = uuid.uuid4().hex[:8]
+        since = timezone.now() - timedelta(days=400)
+        users = []
+        for user_number in range(user_count):
+            user = User.objects.create(username=f"benchmark-{mode}-{run}-{user_number}")
+            for symbol_number in range(symbol_count):
+                asset = Asset.objects.create(
+                    user=user,
+                    ticker=f"B{run[:4]}{user_number}{symbol_number}"[:20],
+                    data_symbol=f"BENCH{run}{user_number}X{symbol_number}.AS",
+                )
+                Transaction.objects.bulk_create([
+                    Transaction(
+                        user=user, asset=asset, txn_type="BUY", quantity=1, unit_price=10,
+                        timestamp=since + timedelta(days=30 * month),
+                    )
+                    for month in range(12)
+                ])
+            users.append(user)
+        return users
+
+    def _delete_users(self, users):
+        Transaction.objects.filter(user__in=users).delete()
+        Asset.objects.filter(user__in=users).delete()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def _run_wsgi(self, users, workers):
+        requests = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            requests += [(client, f"/{route}") for route, _name in DASHBOARD_ENDPOINTS]
+
+        def timed_get(request):
+            client, url = request
+            started = time.perf_counter()
+            try:
+                response = client.get(url)
+            finally:
+                connection.close()
+            assert response.status_code == 200, (url, response.status_code)
+            return time.perf_counter() - started
+
+        # each worker thread handles one request at a time, like a sync gunicorn worker
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(timed_get, requests))
+
+    async def _run_asgi(self, users):
+        clients = []
+        for user in users:
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+
+        async def timed_get(client, url):
+            started = time.perf_counter()
+            response = await client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            return time.perf_counter() - started
+
+        return await asyncio.gather(*(
+            timed_get(client, f"/{route}") for client in clients for route, _name in DASHBOARD_ENDPOINTS
+        ))
+
+    def _report(self, mode, latencies, seconds):
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{mode:<5} {len(latencies):>5} requests  {seconds:8.2f} s  "
+            f"{len(latencies) / seconds:8.1f} req/s  "
+            f"p50 {statistics.median(latencies):6.2f} s  p95 {p95:6.2f} s"
+        )
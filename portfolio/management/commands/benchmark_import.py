@@ -0,0 +1,129 @@
+# portfolio/management/commands/benchmark_import.py
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from portfolio.models import User
+from portfolio.services.imports import (
+    SUPPORTED_IMPORT_EXTENSIONS,
+    _normalize_chunk,
+    import_chunks,
+    import_transactions,
+)
+
+
+def synthetic_transactions(rows, symbols=200, seed=0):
+    """A DataFrame of import rows: mostly trades, some dividends."""
+    rng = np.random.default_rng(seed)
+    txn_type = rng.choice(np.array(["BUY", "SELL", "DIV"]), size=rows, p=[0.6, 0.3, 0.1])
+    is_div = txn_type == "DIV"
+
+    quantity = np.round(rng.uniform(0.1, 50, rows), 4).astype(str)
+    unit_price = np.round(rng.uniform(1, 500, rows), 2).astype(str)
+    div_amount = np.round(rng.uniform(0.1, 20, rows), 2).astype(str)
+
+    return pd.DataFrame({
+        "data_symbol": np.char.add(np.char.add("SYM", rng.integers(0, symbols, rows).astype(str)), ".AS"),
+        "txn_type": txn_type,
+        "quantity": np.where(is_div, "", quantity),
+        "unit_price": np.where(is_div, "", unit_price),
+        "div_amount": np.where(is_div, div_amount, ""),
+        "timestamp": 1262304000 + np.sort(rng.integers(0, 15 * 365 * 86400, rows)),
+    })
+
+
+def _write_xlsx(frame, path):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("transactions")
+    sheet.append(list(frame.columns))
+    for row in frame.itertuples(index=False):
+        sheet.append([value if value != "" else None for value in row])
+    workbook.save(path)
+
+
+def _write_csv(frame, path):
+    frame.to_csv(path, index=False)
+
+
+def _write_parquet(frame, path):
+    frame = frame.replace("", None)
+    frame.to_parquet(path, index=False)
+
+
+WRITERS = {
+    ".xlsx": _write_xlsx,
+    ".csv": _write_csv,
+    ".parquet": _write_parquet,
+}
+
+
+class Command(BaseCommand):
+    help = "Compare import throughput (rows per second) of the supported file formats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument(
+            "--formats",
+            nargs="+",
+            default=[extension.lstrip(".") for extension in SUPPORTED_IMPORT_EXTENSIONS],
+            help="Any of: xlsx csv parquet",
+        )
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument(
+            "--parse-only",
+            action="store_true",
+            help="Only read and validate the file; skip the database writes.",
+        )
+
+    def handle(self, *args, **options):
+        extensions = [f".{name.lstrip('.').lower()}" for name in options["formats"]]
+        unknown = [extension for extension in extensions if extension not in WRITERS]
+        if unknown:
+            raise CommandError(f"Unknown formats: {', '.join(unknown)}")
+
+        rows = options["rows"]
+        self.stdout.write(f"Generating {rows} synthetic transactions...")
+        frame = synthetic_transactions(rows)
+
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in extensions:
+                path = os.path.join(directory, f"transactions{extension}")
+                try:
+                    WRITERS[extension](frame, path)
+                except ImportError as error:
+                    self.stdout.write(f"{extension:<9} skipped: {str(error).splitlines()[0]}")
+                    continue
+
+                seconds, imported = self._run(path, extension, options)
+                size_mb = os.path.getsize(path) / 1_000_000
+                self.stdout.write(
+                    f"{extension:<9} {imported:>9} rows  {size_mb:8.1f} MB  "
+                    f"{seconds:8.2f} s  {imported / seconds:>10.0f} rows/s"
+                )
+
+    def _run(self, path, extension, options):
+        with open(path, "rb") as uploaded_file:
+            started = time.perf_counter()
+            if options["parse_only"]:
+                imported = 0
+                for chunk in import_chunks(uploaded_file, extension, options["chunk_size"]):
+                    clean = _normalize_chunk(chunk)
+                    imported += int(clean["error"].isna().sum())
+                return time.perf_counter() - started, imported
+
+            # Import into a throwaway user and roll everything back afterwards.
+            with db_transaction.atomic():
+                user = User.objects.create(username=f"benchmark-import-{uuid.uuid4().hex[:12]}")
+                started = time.perf_counter()
+                result = import_transactions(user, uploaded_file, extension, options["chunk_size"])
+                seconds = time.perf_counter() - started
+                db_transaction.set_rollback(True)
+            return seconds, result["created_transactions"]
@@ -0,0 +1,53 @@
+# portfolio/management/commands/benchmark_startup.py
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portfolio.benchmarks import _git_commit, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        "Time how long a fresh worker takes to load the app, and its memory, with the analytics "
+        "stack imported lazily and with it preloaded. Writes JSON results for comparison across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Interpreters started per case; the median is reported.")
+        parser.add_argument("--slowest", type=int, default=10, help="Slowest top-level imports to list per case.")
+        parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be positive")
+
+        results = []
+        for preload in (False, True):
+            result = measure_startup(preload=preload, repeat=options["repeat"], slowest=options["slowest"])
+            results.append(result)
+            if options["output"]:
+                self.stdout.write(
+                    f"{result.name:<16} {result.wall_seconds * 1000:8.1f} ms  {result.rss_bytes / 2**20:7.1f} MiB  "
+                    f"heavy: {', '.join(result.heavy_modules) or '-'}"
+                )
+
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+            },
+            "results": [result.as_dict() for result in results],
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                handle.write(output + "\n")
+            self.stdout.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,67 @@
+# portfolio/management/commands/explain_prices.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.models import User
+from portfolio.services.price_explain import explain_price_decisions
+
+
+class Command(BaseCommand):
+    help = (
+        "Show why the price cache would download (or reuse) each of a user's symbols, "
+        "without fetching anything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("symbols", nargs="*", help="Data symbols to explain (default: all of the user's).")
+        parser.add_argument("--start", help="Window start, YYYY-MM-DD (default: the user's first trade).")
+        parser.add_argument("--end", help="Window end, exclusive, YYYY-MM-DD (default: tomorrow).")
+        parser.add_argument("--force", nargs="+", default=[], metavar="SYMBOL", help="Treat these as force-refreshed.")
+        parser.add_argument("--json", action="store_true", help="Print the full reports as JSON.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        reports = explain_price_decisions(
+            user,
+            data_symbols=options["symbols"] or None,
+            start_date=options["start"],
+            end_date=options["end"],
+            force_refresh_symbols=options["force"],
+        )
+        unknown = set(options["symbols"]) - {report["data_symbol"] for report in reports}
+        if unknown:
+            raise CommandError(f"{user.username} has no assets for: {', '.join(sorted(unknown))}")
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        for report in reports:
+            cache = report["cache"]
+            coverage = "-" if cache["coverage"] is None else f"{cache['coverage']:.0%}"
+            decision = report["decision"] if report["reason"] is None else f"{report['decision']} ({report['reason']})"
+            self.stdout.write(
+                f"{report['data_symbol']:<16} {decision:<24} {cache['rows']:>6} rows  {coverage:>5} covered  "
+                f"latest {cache['latest_date'] or '-'}"
+            )
+            jump = report["anomalies"]["suspicious_jump"]
+            if jump:
+                self.stdout.write(f"    suspicious jump on {jump['date']}: {jump['previous_close']} -> {jump['close']}")
+            if report["anomalies"]["duplicate_of"]:
+                self.stdout.write(f"    cached closes identical to {report['anomalies']['duplicate_of']}")
+            if report["fallback_symbols"]:
+                self.stdout.write(f"    fallbacks: {', '.join(report['fallback_symbols'])}")
+            estimate = report["estimated_download"]
+            if estimate:
+                seconds = "unknown" if estimate["seconds"] is None else f"~{estimate['seconds']} s per attempt"
+                self.stdout.write(
+                    f"    download: {estimate['rows']} rows, up to {estimate['max_requests']} requests, {seconds}"
+                )
+            if report["download_in_flight"]:
+                self.stdout.write("    a download is already running")
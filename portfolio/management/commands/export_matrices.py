@@ -0,0 +1,53 @@
+# portfolio/management/commands/export_matrices.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portfolio.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a user's daily price, holdings and invested matrices as Arrow IPC "
+        "or Parquet files (one file per matrix)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--out", default=".", help="Output directory.")
+        parser.add_argument("--format", choices=["arrow", "parquet"], default="arrow")
+        parser.add_argument(
+            "--matrices",
+            nargs="+",
+            choices=["prices", "holdings", "invested"],
+            default=["prices", "holdings", "invested"],
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ModuleNotFoundError:
+            raise CommandError("pyarrow is not installed")
+
+        from portfolio.services.analytics import analytics_matrices
+        from portfolio.services.arrow_export import ARROW_FORMATS, matrix_table, write_table_file
+
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        matrices = analytics_matrices(user, names=options["matrices"])
+        if not matrices:
+            raise CommandError("The user has no transactions")
+
+        out = Path(options["out"])
+        out.mkdir(parents=True, exist_ok=True)
+        as_of = timezone.now().date()
+        file_extension = ARROW_FORMATS[options["format"]][1]
+
+        for name, frame in matrices.items():
+            path = out / f"{name}{file_extension}"
+            write_table_file(matrix_table(frame, name, as_of=as_of), path, options["format"])
+            self.stdout.write(f"{path}: {frame.shape[0]} days x {frame.shape[1]} symbols")
@@ -0,0 +1,67 @@
+# portfolio/management/commands/profile_analytics.py
+import io
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.models import User
+from portfolio.services.analytics_cache import invalidate_analytics_cache
+from portfolio.services.profiling import PROFILE_FORMATS, Profile
+
+PAYLOADS = (
+    "growth", "allocation", "asset_growth", "dividends_monthly", "winners_losers", "details", "returns", "valuation",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile analytics payloads for a user against the configured database and "
+        "write the profiles to PROFILE_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username whose analytics to profile.")
+        parser.add_argument(
+            "--payload", action="append", choices=PAYLOADS, metavar="PAYLOAD",
+            help=f"Payload to profile, repeatable (default: all of {', '.join(PAYLOADS)}).",
+        )
+        parser.add_argument("--format", choices=PROFILE_FORMATS, default=None, help="Default: PROFILE_FORMAT.")
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Clear the user's analytics cache first, so the ledger and returns are rebuilt too.",
+        )
+        parser.add_argument("--output-dir", default=None, help="Default: PROFILE_DIR.")
+        parser.add_argument("--top", type=int, default=15, help="cProfile functions to print, by cumulative time.")
+
+    def handle(self, *args, **options):
+        try:
+            from portfolio.services import analytics
+        except ModuleNotFoundError:
+            raise CommandError("Analytics is unavailable because pandas is not installed")
+
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        seconds = getattr(settings, "PRICE_FETCH_DEADLINE_SECONDS", None) or None
+        for name in options["payload"] or PAYLOADS:
+            if options["cold"]:
+                invalidate_analytics_cache(user, warm=False)
+
+            profile = Profile(options["format"])
+            profile.run(analytics.budgeted_payload, getattr(analytics, f"{name}_payload"), user, seconds=seconds)
+            path = profile.write(
+                f"profile_analytics {name}",
+                {"kind": "command", "payload": name, "user_id": user.id, "cold": options["cold"]},
+                directory=options["output_dir"],
+            )
+            if path is None:
+                raise CommandError("Could not profile: another profiler is active")
+            self.stdout.write(f"{name}: {path}")
+
+            if profile.format == "cprofile" and options["top"]:
+                out = io.StringIO()
+                pstats.Stats(profile.recorders[0].profile, stream=out).sort_stats("cumulative").print_stats(options["top"])
+                self.stdout.write(out.getvalue())
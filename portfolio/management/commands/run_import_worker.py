@@ -0,0 +1,44 @@
+# portfolio/management/commands/run_import_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolio.services.import_jobs import claim_next_job, requeue_stale_jobs, run_import_job
+
+
+class Command(BaseCommand):
+    help = "Process queued transaction imports (ImportJob rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are queued now, then exit.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Import worker started")
+        try:
+            while True:
+                close_old_connections()
+                requeue_stale_jobs()
+
+                job = claim_next_job()
+                if job is not None:
+                    self.stdout.write(f"Running import job {job.id} ({job.file_name})")
+                    run_import_job(job)
+                    continue
+
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("Import worker stopped")
@@ -0,0 +1,65 @@
+# portfolio/management/commands/warm_analytics.py
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from portfolio.models import Transaction, User
+from portfolio.services.analytics_warming import warm_user_in_process
+
+
+class Command(BaseCommand):
+    help = "Precompute the cached analytics of every user (or the given ones) on a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Users to warm (default: everyone with transactions).")
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Worker processes (default: one per CPU); 1 warms in this process.",
+        )
+        parser.add_argument("--only-missing", action="store_true", help="Leave payloads that are cached alone.")
+
+    def handle(self, *args, **options):
+        try:
+            import pandas  # noqa: F401
+        except ModuleNotFoundError:
+            raise CommandError("Analytics is unavailable because pandas is not installed")
+        if options["processes"] < 1:
+            raise CommandError("--processes must be positive")
+
+        if options["usernames"]:
+            users = dict(User.objects.filter(username__in=options["usernames"]).values_list("id", "username"))
+            unknown = set(options["usernames"]) - set(users.values())
+            if unknown:
+                raise CommandError(f"No users named: {', '.join(sorted(unknown))}")
+        else:
+            user_ids = Transaction.objects.values_list("user_id", flat=True).distinct()
+            users = dict(User.objects.filter(id__in=user_ids).values_list("id", "username"))
+
+        if isinstance(caches["default"], LocMemCache):
+            self.stderr.write(
+                "The local-memory cache is private to each process: the web server will not see these payloads."
+            )
+
+        if options["processes"] == 1:
+            results = [warm_user_in_process(user_id, options["only_missing"]) for user_id in users]
+        else:
+            # forked workers must not share this process's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options["processes"]) as pool:
+                futures = [pool.submit(warm_user_in_process, user_id, options["only_missing"]) for user_id in users]
+                results = [future.result() for future in as_completed(futures)]
+
+        failures = 0
+        for user_id, computed, seconds, error in sorted(results, key=lambda result: users[result[0]]):
+            if error:
+                failures += 1
+                self.stdout.write(f"{users[user_id]}: failed after {seconds:.2f} s: {error}")
+            else:
+                self.stdout.write(f"{users[user_id]}: {len(computed)} payloads in {seconds:.2f} s")
+        self.stdout.write(f"Warmed {len(results) - failures} of {len(users)} users")
+        if failures:
+            raise CommandError(f"{failures} users could not be warmed")
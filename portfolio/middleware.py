@@ -0,0 +1,135 @@
+# portfolio/middleware.py
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from portfolio.services.profiling import PROFILE_FORMATS, Profile, profiling
+from portfolio.services.query_budget import budget_for, find_problems, repeat_limit_for, report
+from portfolio.services.request_timing import request_timings
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger("portfolio.timing")
+
+
+def _finish(request, response, timings):
+    if getattr(settings, "SERVER_TIMING_HEADER", True):
+        response["Server-Timing"] = timings.server_timing()
+
+    record = {
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        **timings.as_dict(),
+    }
+    slow = record["total_ms"] >= getattr(settings, "SLOW_REQUEST_SECONDS", 1.0) * 1000
+    timing_logger.log(logging.WARNING if slow else logging.INFO, json.dumps(record))
+
+    url_name = request.resolver_match.url_name if request.resolver_match else None
+    report(
+        f"{request.method} {request.path}",
+        find_problems(timings.queries, timings.query_templates, budget_for(url_name), repeat_limit_for(url_name)),
+    )
+    return response
+
+
+@sync_and_async_middleware
+def request_timing_middleware(get_response):
+    """
+    Time every request by stage (see services/request_timing.py), send the
+    breakdown in a Server-Timing header and log it as one JSON line on the
+    "portfolio.timing" logger: INFO normally, WARNING past SLOW_REQUEST_SECONDS.
+    Its queries are checked against the endpoint's query budget (see
+    services/query_budget.py).
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with request_timings() as timings:
+                response = await get_response(request)
+                return _finish(request, response, timings)
+    else:
+        def middleware(request):
+            with request_timings() as timings:
+                response = get_response(request)
+                return _finish(request, response, timings)
+
+    return middleware
+
+
+def _sampled(request):
+    rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+    return bool(rate) and request.path.startswith("/analytics/") and random.random() < rate
+
+
+def _write_profile(request, response, profile, user, seconds):
+    metadata = {
+        "kind": "request",
+        "method": request.method,
+        "path": request.path,
+        "query": {key: value for key, value in request.GET.items() if key != "profile"},
+        "user_id": getattr(user, "id", None),
+        "status": response.status_code,
+        "duration_seconds": round(seconds, 4),
+        "trigger": "staff" if profile.explicit else "sampled",
+        "payload_cache": "bypassed" if profile.explicit else "used",
+    }
+    try:
+        path = profile.write(f"{request.method} {request.path}", metadata)
+    except OSError as exc:
+        logger.warning("Could not write the profile of %s: %s", request.path, exc)
+        return response
+    if path is not None and profile.explicit:
+        response["X-Profile"] = path.name
+    return response
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """
+    Profile a request when a staff user adds ?profile=1 (or ?profile=cprofile,
+    ?profile=speedscope), and a PROFILE_SAMPLE_RATE share of /analytics/
+    requests. Staff profiles skip the cached payload so there is something to
+    profile; the response names the file in an X-Profile header. See
+    services/profiling.py.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            profile, user = None, None
+            if "profile" in request.GET:
+                user = await request.auser()
+                if user.is_staff:
+                    requested = request.GET["profile"]
+                    profile = Profile(requested if requested in PROFILE_FORMATS else None, explicit=True)
+            if profile is None and _sampled(request):
+                profile = Profile()
+            if profile is None:
+                return await get_response(request)
+
+            started = time.perf_counter()
+            # the async analytics views run their payload under the profile (see async_analytics)
+            with profiling(profile):
+                response = await get_response(request)
+            if user is None:
+                user = await request.auser()
+            return _write_profile(request, response, profile, user, time.perf_counter() - started)
+    else:
+        def middleware(request):
+            profile = None
+            if "profile" in request.GET and request.user.is_staff:
+                requested = request.GET["profile"]
+                profile = Profile(requested if requested in PROFILE_FORMATS else None, explicit=True)
+            if profile is None and _sampled(request):
+                profile = Profile()
+            if profile is None:
+                return get_response(request)
+
+            started = time.perf_counter()
+            with profiling(profile):
+                response = profile.run(get_response, request)
+            return _write_profile(request, response, profile, request.user, time.perf_counter() - started)
+
+    return middleware
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0008_transaction_user_timestamp_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "asset", "txn_type", "timestamp"],
+                name="portfolio_t_user_id_126bee_idx",
+            ),
+        ),
+    ]
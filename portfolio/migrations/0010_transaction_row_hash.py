@@ -0,0 +1,76 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:40
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# A frozen copy of portfolio.models.transaction_row_hash as of this migration:
+# later changes to the live function must not change what it backfilled.
+def transaction_row_hash(data_symbol, txn_type, unix_seconds, quantity, unit_price, div_amount):
+    def amount(value):
+        if value is None:
+            return ""
+        return format(Decimal(value).quantize(Decimal("1e-8")) + 0, "f")
+
+    parts = [data_symbol, txn_type, str(int(unix_seconds)), amount(quantity), amount(unit_price), amount(div_amount)]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def backfill_row_hashes(apps, schema_editor):
+    Transaction = apps.get_model("portfolio", "Transaction")
+
+    seen = set()
+    last_id = 0
+    while True:
+        # keyset pages instead of iterator(): we write to the table we read from
+        rows = list(
+            Transaction.objects
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .values_list(
+                "id", "user_id", "asset__data_symbol", "txn_type",
+                "timestamp", "quantity", "unit_price", "div_amount",
+            )[:1000]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        batch = []
+        for txn_id, user_id, data_symbol, txn_type, timestamp, quantity, unit_price, div_amount in rows:
+            row_hash = transaction_row_hash(
+                data_symbol, txn_type, timestamp.timestamp(), quantity, unit_price, div_amount,
+            )
+            # Existing duplicates keep a NULL hash; the first copy carries it.
+            if (user_id, row_hash) in seen:
+                continue
+            seen.add((user_id, row_hash))
+            batch.append(Transaction(id=txn_id, row_hash=row_hash))
+
+        Transaction.objects.bulk_update(batch, ["row_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0009_transaction_user_asset_type_timestamp_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="row_hash",
+            field=models.CharField(blank=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_row_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="transaction",
+            constraint=models.UniqueConstraint(
+                fields=("user", "row_hash"),
+                name="unique_user_row_hash",
+                violation_error_message="An identical transaction already exists.",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0010_transaction_row_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("status", models.CharField(choices=[("QUEUED", "Queued"), ("RUNNING", "Running"), ("DONE", "Done"), ("FAILED", "Failed")], default="QUEUED", max_length=10)),
+                ("file_name", models.CharField(max_length=255)),
+                ("extension", models.CharField(max_length=10)),
+                ("payload", models.BinaryField(default=bytes)),
+                ("rows_processed", models.PositiveIntegerField(default=0)),
+                ("created_transactions", models.PositiveIntegerField(default=0)),
+                ("created_assets", models.PositiveIntegerField(default=0)),
+                ("skipped_existing", models.PositiveIntegerField(default=0)),
+                ("skipped_duplicates", models.PositiveIntegerField(default=0)),
+                ("row_error_count", models.PositiveIntegerField(default=0)),
+                ("row_errors", models.JSONField(blank=True, default=list)),
+                ("error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="import_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["status", "created_at"], name="portfolio_i_status_679646_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0011_importjob"),
+    ]
+
+    operations = [
+        # (user, timestamp) is a prefix of the new index, which also covers the
+        # id tie-break of the keyset-paginated transaction list
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="portfolio_t_user_id_cacdcc_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "timestamp", "id"],
+                name="portfolio_t_user_id_78d55b_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:20
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# A frozen copy of portfolio.models.transaction_row_hash as of this migration.
+def transaction_row_hash(data_symbol, txn_type, unix_seconds, quantity, unit_price, div_amount):
+    def amount(value):
+        if value is None:
+            return ""
+        return format(Decimal(value).quantize(Decimal("1e-8")) + 0, "f")
+
+    parts = [data_symbol, txn_type, str(int(unix_seconds)), amount(quantity), amount(unit_price), amount(div_amount)]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def hash_duplicates(apps, schema_editor):
+    # 0010 left the later copies of identical rows without a hash
+    Transaction = apps.get_model("portfolio", "Transaction")
+
+    last_id = 0
+    while True:
+        rows = list(
+            Transaction.objects
+            .filter(id__gt=last_id, row_hash__isnull=True)
+            .order_by("id")
+            .values_list(
+                "id", "asset__data_symbol", "txn_type", "timestamp", "quantity", "unit_price", "div_amount",
+            )[:1000]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        Transaction.objects.bulk_update(
+            [
+                Transaction(
+                    id=txn_id,
+                    row_hash=transaction_row_hash(
+                        data_symbol, txn_type, timestamp.timestamp(), quantity, unit_price, div_amount,
+                    ),
+                )
+                for txn_id, data_symbol, txn_type, timestamp, quantity, unit_price, div_amount in rows
+            ],
+            ["row_hash"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0012_transaction_user_timestamp_id_index"),
+    ]
+
+    operations = [
+        # Only imports skip rows the user already has; identical transactions
+        # entered by hand or through the bulk endpoint are allowed again.
+        migrations.RemoveConstraint(
+            model_name="transaction",
+            name="unique_user_row_hash",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["user", "row_hash"], name="portfolio_t_user_id_f60c87_idx"),
+        ),
+        migrations.RunPython(hash_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:40
+
+import uuid
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+import portfolio.models
+
+
+def move_payloads_to_storage(apps, schema_editor):
+    # only jobs that have not run yet still hold their upload
+    ImportJob = apps.get_model("portfolio", "ImportJob")
+    for job in ImportJob.objects.exclude(payload=b"").only("id", "extension", "payload").iterator(chunk_size=1):
+        job.upload.save(f"{uuid.uuid4().hex}{job.extension}", ContentFile(bytes(job.payload)), save=False)
+        ImportJob.objects.filter(id=job.id).update(upload=job.upload.name, payload=b"")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portfolio", "0013_transaction_row_hash_not_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="upload",
+            field=models.FileField(
+                blank=True, max_length=255, storage=portfolio.models.import_upload_storage, upload_to="imports",
+            ),
+        ),
+        migrations.RunPython(move_payloads_to_storage, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="importjob",
+            name="payload",
+        ),
+    ]
@@ -1,8 +1,46 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from django.utils.module_loading import import_string
 from django.core.exceptions import ValidationError
 
+import hashlib
+from decimal import Decimal
+
+_ROW_HASH_QUANTUM = Decimal("1e-8")  # the 8 decimal places amounts are stored with
+
+
+def _row_hash_amount(value):
+    if value is None:
+        return ""
+    # "+ 0" turns -0 into 0
+    return format(Decimal(value).quantize(_ROW_HASH_QUANTUM) + 0, "f")
+
+
+def transaction_row_hash(data_symbol, txn_type, unix_seconds, quantity, unit_price, div_amount):
+    """
+    Content hash of a transaction row. Timestamps count in whole seconds and
+    amounts at the stored precision, so a row that went through export_data
+    and back through import_data hashes the same as the original.
+    """
+    parts = [
+        data_symbol,
+        txn_type,
+        str(int(unix_seconds)),
+        _row_hash_amount(quantity),
+        _row_hash_amount(unit_price),
+        _row_hash_amount(div_amount),
+    ]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def import_upload_storage():
+    """The storage ImportJob uploads are spooled to, from settings.IMPORT_UPLOAD_STORAGE."""
+    config = settings.IMPORT_UPLOAD_STORAGE
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
 # Create your models here.
 class User(AbstractUser):
     pass
@@ -44,10 +82,16 @@ class Transaction(models.Model):
     unit_price = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)
     div_amount = models.DecimalField(max_digits=20, decimal_places=8, null=True, blank=True)
     timestamp = models.DateTimeField(default=timezone.now)
+    # transaction_row_hash() of the row; kept up to date by save(). Imports skip
+    # rows whose hash the user already has, but it is not unique: two identical
+    # transactions (same-day buys at the same price) can be entered by hand.
+    row_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)
 
     class Meta:
         indexes = [
-            models.Index(fields=["user", "timestamp"]),
+            models.Index(fields=["user", "timestamp", "id"]),
+            models.Index(fields=["user", "asset", "txn_type", "timestamp"]),
+            models.Index(fields=["user", "row_hash"]),
         ]
 
     def serialize(self):
@@ -88,8 +132,32 @@ class Transaction(models.Model):
             if div_field_filled:
                 raise ValidationError({"div_amount": "Buy/Sell transactions cannot include a dividend amount."})
 
+    def compute_row_hash(self):
+        return transaction_row_hash(
+            self.asset.data_symbol,
+            self.txn_type,
+            self.timestamp.timestamp(),
+            self.quantity,
+            self.unit_price,
+            self.div_amount,
+        )
+
+    @classmethod
+    def rehash_asset(cls, asset):
+        """Recompute the row hashes of an asset's transactions after its data_symbol changed."""
+        transactions = list(
+            cls.objects
+            .filter(asset=asset)
+            .only("id", "txn_type", "timestamp", "quantity", "unit_price", "div_amount")
+        )
+        for transaction in transactions:
+            transaction.asset = asset
+            transaction.row_hash = transaction.compute_row_hash()
+        cls.objects.bulk_update(transactions, ["row_hash"], batch_size=1000)
+
     def save(self, *args, **kwargs):
         self.full_clean()
+        self.row_hash = self.compute_row_hash()
         return super().save(*args, **kwargs)
 
 class PricePoint(models.Model):
@@ -108,3 +176,58 @@ class PricePoint(models.Model):
 
     def __str__(self):
         return f"{self.asset.ticker} {self.date} {self.close}"
+
+class ImportJob(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    user = models.ForeignKey("User", on_delete=models.CASCADE, related_name="import_jobs")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    file_name = models.CharField(max_length=255)
+    extension = models.CharField(max_length=10)
+    # the uploaded file, streamed to storage rather than kept in the row;
+    # deleted once the job has finished
+    upload = models.FileField(upload_to="imports", storage=import_upload_storage, max_length=255, blank=True)
+
+    rows_processed = models.PositiveIntegerField(default=0)
+    created_transactions = models.PositiveIntegerField(default=0)
+    created_assets = models.PositiveIntegerField(default=0)
+    skipped_existing = models.PositiveIntegerField(default=0)
+    skipped_duplicates = models.PositiveIntegerField(default=0)
+    row_error_count = models.PositiveIntegerField(default=0)
+    row_errors = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def serialize(self):
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds() if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "file_name": self.file_name,
+            "rows_processed": self.rows_processed,
+            "rows_per_second": round(self.rows_processed / elapsed, 1) if elapsed > 0 else None,
+            "created_transactions": self.created_transactions,
+            "created_assets": self.created_assets,
+            "skipped_existing": self.skipped_existing,
+            "skipped_duplicates": self.skipped_duplicates,
+            "row_error_count": self.row_error_count,
+            "row_errors": self.row_errors,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
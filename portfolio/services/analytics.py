@@ -1,9 +1,33 @@
 # portfolio/services/analytics.py
+import time
+
+import numpy as np
 import pandas as pd
+from django.core.cache import cache
 from django.utils import timezone
 
-from portfolio.models import Asset, Transaction
-from portfolio.services.prices_cache import get_close_prices_cached
+from portfolio.models import Asset
+from portfolio.services import metrics
+from portfolio.services.analytics_cache import (
+    ANALYTICS_CACHE_TIMEOUT,
+    RETURN_PERIODS,
+    SHARD_CACHE_TIMEOUT,
+    analytics_cache_key,
+    priced_value,
+    return_period,
+    shard_cache_key,
+)
+from portfolio.services.conditional import prices_version
+from portfolio.services.holdings import ChangePointHoldings
+from portfolio.services.ledger import (
+    day_number,
+    day_to_timestamp,
+    ledger_totals_by_symbol,
+    load_ledger,
+    monthly_dividends,
+)
+from portfolio.services.prices_cache import current_stale_symbols, get_close_prices_cached, price_budget
+from portfolio.services.request_timing import record_cache, stage
 
 
 def _asset_metadata_map(user, data_symbols):
@@ -27,201 +51,261 @@ def _asset_metadata_map(user, data_symbols):
     return metadata
 
 
-def _transactions_dataframe(user):
+def _ledger(user):
     """
-    Build a DataFrame from DB transactions.
-    Columns: timestamp, date, data_symbol, txn_type, quantity, unit_price, div_amount
+    The user's canonical ledger frame, built once and shared by every payload
+    until the next write invalidates it.
     """
-    transactions = (
-        Transaction.objects
-        .filter(user=user)
-        .select_related("asset")
-        .order_by("timestamp")
-    )
-
-    rows = []
-    for transaction in transactions:
-        rows.append({
-            "timestamp": transaction.timestamp,
-            "date": transaction.timestamp.date(),
-            "data_symbol": transaction.asset.data_symbol,
-            "txn_type": transaction.txn_type,
-            "quantity": float(transaction.quantity) if transaction.quantity is not None else None,
-            "unit_price": float(transaction.unit_price) if transaction.unit_price is not None else None,
-            "div_amount": float(transaction.div_amount) if transaction.div_amount is not None else None,
-        })
-
-    if not rows:
-        return pd.DataFrame(columns=["timestamp", "date", "data_symbol", "txn_type", "quantity", "unit_price", "div_amount"])
+    key = analytics_cache_key(user.id, "ledger")
+    ledger = cache.get(key)
+    record_cache("ledger", ledger is not None)
+    if ledger is None:
+        with stage("ledger"):
+            ledger = load_ledger(user)
+        cache.set(key, ledger, ANALYTICS_CACHE_TIMEOUT)
+    return ledger
 
-    df = pd.DataFrame(rows)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
 
-
-def _holdings_timeseries(df):
+def _holdings_timeseries(ledger):
     """
-    Inspired by your notebook: pivot by ticker, fillna(0), cumsum().
-
-    BUY  -> +quantity
-    SELL -> -quantity
-    DIV  -> ignored for holdings
+    Dense daily holdings (days x data_symbol) from the first trade until today.
+    Only use this when full series are needed; point-in-time lookups should go
+    through ChangePointHoldings directly.
     """
-    if df.empty:
-        return pd.DataFrame()
-
-    trades = df[df["txn_type"].isin(["BUY", "SELL"])].copy()
-    if trades.empty:
+    holdings = ChangePointHoldings.from_ledger(ledger)
+    if holdings.empty:
         return pd.DataFrame()
 
-    trades["signed_qty"] = trades["quantity"]
-    trades.loc[trades["txn_type"] == "SELL", "signed_qty"] *= -1
-
-    holdings = (
-        trades.pivot_table(
-            index="date",
-            columns="data_symbol",
-            values="signed_qty",
-            aggfunc="sum"
-        )
-        .fillna(0)
-        .cumsum()
-        .sort_index()
-    )
-
     # Reindex to daily dates so price-multiplication is easy
-    start = holdings.index.min()
     end = pd.to_datetime(timezone.now().date())
-    full_index = pd.date_range(start, end, freq="D")
-
-    holdings = holdings.reindex(full_index).ffill().fillna(0)
-    holdings.index.name = "date"
-
-    return holdings
+    full_index = pd.date_range(holdings.start, end, freq="D", name="date")
+    return holdings.dense(full_index)
 
 
-def _invested_timeseries(df):
+def _compute_asset_shards(user, ledger, today):
     """
-    "Net invested" curve (like your 'inleg' idea).
-    Convention:
-      BUY: cash outflow  -> invested increases (+)
-      SELL: cash inflow  -> invested decreases (-)
-      DIV: cash inflow   -> invested decreases (-)
+    Build per-asset shards for every symbol in the ledger.
 
-    Returns a daily Series named 'invested'.
+    A shard holds one asset's daily value and net-invested series, starting at
+    the asset's first transaction and ending today, plus the latest position
+    figures and dividend stats. Prices are loaded in one batch for the symbols
+    being (re)computed only.
     """
-    if df.empty:
-        return pd.Series(dtype=float)
-
-    df = df.copy()
-    df["cashflow"] = 0.0
+    first_day = int(ledger["day"].min())
+    days = np.arange(first_day, int(day_number(today)) + 1, dtype=np.int32)
+    index = pd.DatetimeIndex(days.astype("datetime64[D]"))
+
+    is_trade = ledger["txn_type"].isin(["BUY", "SELL"])
+    first_days = ledger.groupby("data_symbol", observed=True)["day"].min()
+    first_trade_days = ledger[is_trade].groupby("data_symbol", observed=True)["day"].min()
+
+    holdings = ChangePointHoldings.from_ledger(ledger).dense(index)
+
+    prices = pd.DataFrame()
+    if not holdings.empty:
+        prices = get_close_prices_cached(
+            data_symbols=holdings.columns.tolist(),
+            start_date=day_to_timestamp(first_trade_days.min()).strftime("%Y-%m-%d"),
+            end_date=(today + timezone.timedelta(days=1)).strftime("%Y-%m-%d"),
+            user=user,
+        )
+    if not prices.empty:
+        prices.index = pd.to_datetime(prices.index.date)
+        prices = prices.reindex(index).ffill().bfill().dropna(axis=1, how="all")
+    stale_symbols = current_stale_symbols()
 
-    is_buy = df["txn_type"] == "BUY"
-    is_sell = df["txn_type"] == "SELL"
-    is_div = df["txn_type"] == "DIV"
+    invested = (
+        ledger.groupby(["day", "data_symbol"], observed=True)["cashflow"]
+        .sum()
+        .unstack(fill_value=0)
+        .sort_index()
+        .cumsum()
+        .reindex(days)
+        .ffill()
+        .fillna(0)
+    )
 
-    df.loc[is_buy, "cashflow"] = df.loc[is_buy, "quantity"] * df.loc[is_buy, "unit_price"]
-    df.loc[is_sell, "cashflow"] = -1 * df.loc[is_sell, "quantity"] * df.loc[is_sell, "unit_price"]
-    df.loc[is_div, "cashflow"] = -1 * df.loc[is_div, "div_amount"]
+    totals = ledger_totals_by_symbol(
+        user,
+        data_symbols=first_days.index.tolist(),
+        ttm_since=today - timezone.timedelta(days=365),
+    )
 
-    daily = df.groupby("date")["cashflow"].sum().sort_index().cumsum()
+    shards = {}
+    for symbol, start_day in first_days.items():
+        offset = int(start_day) - first_day
+        has_prices = symbol in prices.columns
+        symbol_invested = invested[symbol].to_numpy(dtype=float)[offset:]
+
+        if symbol in holdings.columns:
+            quantities = holdings[symbol].to_numpy(dtype=float)[offset:]
+        else:
+            quantities = np.zeros(len(symbol_invested))
+
+        if has_prices:
+            symbol_prices = prices[symbol].to_numpy(dtype=float)[offset:]
+            symbol_values = quantities * symbol_prices
+            latest_price = float(symbol_prices[-1])
+        else:
+            symbol_values = np.zeros(len(symbol_invested))
+            latest_price = None
+
+        latest_value = float(symbol_values[-1])
+        net_invested = float(symbol_invested[-1])
+        roi_pct = None
+        if net_invested > 0 and latest_value > 0:
+            roi_pct = ((latest_value - net_invested) / net_invested) * 100
+
+        first_trade_day = first_trade_days.get(symbol)
+        shards[symbol] = {
+            "symbol": symbol,
+            "as_of": today,
+            "start_day": int(start_day),
+            "first_trade_day": int(first_trade_day) if first_trade_day is not None else None,
+            "has_prices": has_prices,
+            "stale": symbol in stale_symbols,
+            "values": symbol_values,
+            "invested": symbol_invested,
+            "quantity": float(quantities[-1]),
+            "price": latest_price,
+            "value": latest_value,
+            "net_invested": net_invested,
+            "roi_pct": roi_pct,
+            "dividends_total": totals.get(symbol, {}).get("total_dividends", 0.0),
+            "dividends_ttm": totals.get(symbol, {}).get("dividends_ttm", 0.0),
+        }
 
-    # daily index fill
-    start = daily.index.min()
-    end = pd.to_datetime(timezone.now().date())
-    full_index = pd.date_range(start, end, freq="D")
+    return shards
 
-    daily = daily.reindex(full_index).ffill()
-    daily.name = "invested"
 
-    return daily
+def _asset_shards(user, ledger):
+    """
+    Return {data_symbol: shard} for every symbol in the ledger.
+    Shards are read from the cache and only the missing or out-of-date ones are
+    recomputed, so writes that invalidate one asset only recompute one shard.
+    """
+    if ledger.empty:
+        return {}
 
+    today = timezone.now().date()
+    # read before the prices, so prices stored meanwhile retire what is built now
+    version = prices_version(user.id)
+    symbols = sorted(ledger["data_symbol"].unique())
+    keys = {symbol: shard_cache_key(user.id, symbol) for symbol in symbols}
+    cached = cache.get_many(list(keys.values()))
+
+    shards = {}
+    missing = []
+    for symbol in symbols:
+        shard = cached.get(keys[symbol])
+        if shard is None or shard["as_of"] != today or shard["prices_version"] != version:
+            missing.append(symbol)
+        else:
+            shards[symbol] = shard
+        record_cache(f"shard:{symbol}", symbol in shards)
+
+    if missing:
+        fresh = _compute_asset_shards(user, ledger[ledger["data_symbol"].isin(missing)], today)
+        for shard in fresh.values():
+            shard["prices_version"] = version
+        # shards built from stale prices are rebuilt on the next request
+        cache.set_many(
+            {keys[symbol]: shard for symbol, shard in fresh.items() if not shard["stale"]},
+            SHARD_CACHE_TIMEOUT,
+        )
+        shards.update(fresh)
 
-def _asset_insights(df, holdings, prices, asset_metadata=None):
-    if df.empty or holdings.empty or prices.empty:
-        return {"best_performer": None, "worst_performer": None, "top_dividend_asset": None}
+    return shards
 
-    latest_holdings = holdings.iloc[-1]
-    latest_prices = prices.ffill().iloc[-1].reindex(latest_holdings.index).fillna(0)
 
-    open_holdings = latest_holdings[latest_holdings > 0]
-    if open_holdings.empty:
-        return {"best_performer": None, "worst_performer": None, "top_dividend_asset": None}
+def budgeted_payload(payload_function, user, *args, seconds=None, **kwargs):
+    """
+    Build a payload with price downloads bounded by a price_budget(). Payloads
+    built while some downloads were still running carry "stale": true and
+    list those symbols in "stale_symbols".
+    """
+    started = time.perf_counter()
+    with price_budget(seconds) as budget, stage("compute"):
+        payload = payload_function(user, *args, **kwargs)
+    metrics.observe(
+        "marketvault_payload_compute_seconds", time.perf_counter() - started, payload=payload_function.__name__,
+    )
+    if budget.stale_symbols:
+        payload = {**payload, "stale": True, "stale_symbols": sorted(budget.stale_symbols)}
+    return payload
 
-    open_symbols = open_holdings.index.tolist()
-    open_values = (open_holdings * latest_prices.reindex(open_symbols).fillna(0)).fillna(0)
 
-    df_open = df[df["data_symbol"].isin(open_symbols)].copy()
-    if df_open.empty:
-        return {"best_performer": None, "worst_performer": None, "top_dividend_asset": None}
+def _stack_shards(shards, field, index):
+    """
+    Place one series per shard into a (days x shards) matrix aligned on index.
+    Days before a shard starts are zero; every shard ends on index[-1].
+    """
+    first_day = day_number(index[0])
+    matrix = np.zeros((len(index), len(shards)))
+    for column, shard in enumerate(shards):
+        series = shard[field]
+        offset = shard["start_day"] - first_day
+        if offset >= 0:
+            matrix[offset:, column] = series[:len(index) - offset]
+        else:
+            matrix[:, column] = series[-offset:]
+    return matrix
+
+
+def _portfolio_index(shards):
+    traded = [shard["first_trade_day"] for shard in shards.values() if shard["first_trade_day"] is not None]
+    if not traded:
+        return None
+    as_of = next(iter(shards.values()))["as_of"]
+    return pd.date_range(day_to_timestamp(min(traded)), pd.to_datetime(as_of), freq="D")
+
+
+def _shard_asset_summary(symbol, meta, **extra):
+    return {
+        "symbol": symbol,
+        "ticker": meta.get("ticker", symbol),
+        "short_name": meta.get("short_name", symbol),
+        "name": meta.get("name", symbol),
+        **extra,
+    }
 
-    df_open["cashflow_asset"] = 0.0
-    is_buy = df_open["txn_type"] == "BUY"
-    is_sell = df_open["txn_type"] == "SELL"
-    is_div = df_open["txn_type"] == "DIV"
 
-    df_open.loc[is_buy, "cashflow_asset"] = df_open.loc[is_buy, "quantity"] * df_open.loc[is_buy, "unit_price"]
-    df_open.loc[is_sell, "cashflow_asset"] = -1 * df_open.loc[is_sell, "quantity"] * df_open.loc[is_sell, "unit_price"]
-    df_open.loc[is_div, "cashflow_asset"] = -1 * df_open.loc[is_div, "div_amount"]
+def _asset_insights(shards, asset_metadata=None):
+    open_shards = [
+        shard for shard in shards.values()
+        if shard["has_prices"] and shard["quantity"] > 0
+    ]
+    if not open_shards:
+        return {"best_performer": None, "worst_performer": None, "top_dividend_asset": None}
 
-    net_invested = df_open.groupby("data_symbol")["cashflow_asset"].sum().reindex(open_symbols).fillna(0)
-    roi_by_asset = pd.Series(index=open_symbols, dtype=float)
+    symbols = [shard["symbol"] for shard in open_shards]
+    open_values = np.array([shard["value"] for shard in open_shards])
+    roi = np.array([np.nan if shard["roi_pct"] is None else shard["roi_pct"] for shard in open_shards])
+    ttm_div = np.array([shard["dividends_ttm"] for shard in open_shards])
 
-    valid_roi_mask = (net_invested > 0) & (open_values > 0)
-    roi_by_asset.loc[valid_roi_mask] = (
-        (open_values.loc[valid_roi_mask] - net_invested.loc[valid_roi_mask]) / net_invested.loc[valid_roi_mask]
-    ) * 100
+    div_yield = np.full(len(open_shards), np.nan)
+    valid_yield_mask = open_values > 0
+    div_yield[valid_yield_mask] = (ttm_div[valid_yield_mask] / open_values[valid_yield_mask]) * 100
 
+    metadata = asset_metadata or {}
     best = None
     worst = None
-    roi_clean = roi_by_asset.dropna()
-    if not roi_clean.empty:
-        best_symbol = roi_clean.idxmax()
-        worst_symbol = roi_clean.idxmin()
-        best_meta = (asset_metadata or {}).get(best_symbol, {})
-        worst_meta = (asset_metadata or {}).get(worst_symbol, {})
-        best = {
-            "symbol": best_symbol,
-            "ticker": best_meta.get("ticker", best_symbol),
-            "short_name": best_meta.get("short_name", best_symbol),
-            "name": best_meta.get("name", best_symbol),
-            "roi_pct": float(roi_clean.loc[best_symbol]),
-        }
-        worst = {
-            "symbol": worst_symbol,
-            "ticker": worst_meta.get("ticker", worst_symbol),
-            "short_name": worst_meta.get("short_name", worst_symbol),
-            "name": worst_meta.get("name", worst_symbol),
-            "roi_pct": float(roi_clean.loc[worst_symbol]),
-        }
-
-    cutoff = pd.to_datetime((timezone.now() - timezone.timedelta(days=365)).date())
-    ttm_div = (
-        df_open[(df_open["txn_type"] == "DIV") & (df_open["date"] >= cutoff)]
-        .groupby("data_symbol")["div_amount"]
-        .sum()
-        .reindex(open_symbols)
-        .fillna(0)
-    )
-
-    div_yield_by_asset = pd.Series(index=open_symbols, dtype=float)
-    valid_yield_mask = open_values > 0
-    div_yield_by_asset.loc[valid_yield_mask] = (
-        ttm_div.loc[valid_yield_mask] / open_values.loc[valid_yield_mask]
-    ) * 100
+    if not np.isnan(roi).all():
+        best_symbol = symbols[int(np.nanargmax(roi))]
+        worst_symbol = symbols[int(np.nanargmin(roi))]
+        best = _shard_asset_summary(
+            best_symbol, metadata.get(best_symbol, {}), roi_pct=float(np.nanmax(roi)),
+        )
+        worst = _shard_asset_summary(
+            worst_symbol, metadata.get(worst_symbol, {}), roi_pct=float(np.nanmin(roi)),
+        )
 
     top_dividend_asset = None
-    div_clean = div_yield_by_asset.dropna()
-    if not div_clean.empty:
-        top_symbol = div_clean.idxmax()
-        top_meta = (asset_metadata or {}).get(top_symbol, {})
-        top_dividend_asset = {
-            "symbol": top_symbol,
-            "ticker": top_meta.get("ticker", top_symbol),
-            "short_name": top_meta.get("short_name", top_symbol),
-            "name": top_meta.get("name", top_symbol),
-            "dividend_yield_ttm_pct": float(div_clean.loc[top_symbol]),
-        }
+    if not np.isnan(div_yield).all():
+        top_symbol = symbols[int(np.nanargmax(div_yield))]
+        top_dividend_asset = _shard_asset_summary(
+            top_symbol, metadata.get(top_symbol, {}), dividend_yield_ttm_pct=float(np.nanmax(div_yield)),
+        )
 
     return {
         "best_performer": best,
@@ -237,88 +321,42 @@ def growth_payload(user):
     - portfolio_value
     - invested
     """
-    df = _transactions_dataframe(user)
-    if df.empty:
-        return {
-            "dates": [],
-            "portfolio_value": [],
-            "invested": [],
-            "dividends_ttm": 0.0,
-            "dividend_yield_ttm": None,
-            "best_performer": None,
-            "worst_performer": None,
-            "top_dividend_asset": None,
-        }
-
-    holdings = _holdings_timeseries(df)
-    if holdings.empty:
-        return {
-            "dates": [],
-            "portfolio_value": [],
-            "invested": [],
-            "dividends_ttm": 0.0,
-            "dividend_yield_ttm": None,
-            "best_performer": None,
-            "worst_performer": None,
-            "top_dividend_asset": None,
-        }
+    empty = {
+        "dates": [],
+        "portfolio_value": [],
+        "invested": [],
+        "dividends_ttm": 0.0,
+        "dividend_yield_ttm": None,
+        "best_performer": None,
+        "worst_performer": None,
+        "top_dividend_asset": None,
+    }
 
-    start_date = holdings.index.min().strftime("%Y-%m-%d")
-    end_date = (timezone.now().date() + timezone.timedelta(days=1)).strftime("%Y-%m-%d")
+    ledger = _ledger(user)
+    shards = _asset_shards(user, ledger)
+    index = _portfolio_index(shards) if shards else None
+    if index is None:
+        return empty
 
-    prices = get_close_prices_cached(
-        data_symbols=holdings.columns.tolist(),
-        start_date=start_date,
-        end_date=end_date,
-        user=user,
-    )
-    
-    if prices.empty:
+    priced = [shard for shard in shards.values() if shard["has_prices"]]
+    if not priced:
         # no price data => return empty series (or you could return holdings-only)
-        return {
-            "dates": [],
-            "portfolio_value": [],
-            "invested": [],
-            "dividends_ttm": 0.0,
-            "dividend_yield_ttm": None,
-            "best_performer": None,
-            "worst_performer": None,
-            "top_dividend_asset": None,
-        }
-
-    # Align on dates
-    prices.index = pd.to_datetime(prices.index.date)
-    prices = prices.reindex(holdings.index)
-    prices = prices.ffill().bfill()
-
-    # Drop symbols with no data at all
-    prices = prices.dropna(axis=1, how="all")
+        return empty
 
-    # Keep holdings only for symbols we have prices for
-    holdings = holdings.reindex(columns=prices.columns).fillna(0)
-    asset_metadata = _asset_metadata_map(user, holdings.columns.tolist())
+    total = _stack_shards(priced, "values", index).sum(axis=1)
+    invested = _stack_shards(list(shards.values()), "invested", index).sum(axis=1)
 
-    values = holdings * prices
-    total = values.sum(axis=1)
-
-    invested = _invested_timeseries(df)
-    invested = invested.reindex(total.index).ffill()
-
-    cutoff = pd.to_datetime((timezone.now() - timezone.timedelta(days=365)).date())
-    ttm_dividends = (
-        df[(df["txn_type"] == "DIV") & (df["date"] >= cutoff)]["div_amount"]
-        .fillna(0)
-        .sum()
-    )
-    latest_value = float(total.iloc[-1]) if len(total) else 0.0
+    asset_metadata = _asset_metadata_map(user, [shard["symbol"] for shard in priced])
+    ttm_dividends = sum(shard["dividends_ttm"] for shard in shards.values())
+    latest_value = float(total[-1]) if len(total) else 0.0
     dividend_yield_ttm = ((float(ttm_dividends) / latest_value) * 100) if latest_value > 0 else None
-    insights = _asset_insights(df, holdings, prices, asset_metadata=asset_metadata)
+    insights = _asset_insights(shards, asset_metadata=asset_metadata)
 
-    dates = [d.strftime("%Y-%m-%d") for d in total.index]
+    dates = [d.strftime("%Y-%m-%d") for d in index]
     return {
         "dates": dates,
-        "portfolio_value": [float(x) for x in total.values],
-        "invested": [float(x) for x in invested.values],
+        "portfolio_value": [float(x) for x in total],
+        "invested": [float(x) for x in invested],
         "dividends_ttm": float(ttm_dividends),
         "dividend_yield_ttm": dividend_yield_ttm,
         "best_performer": insights["best_performer"],
@@ -333,43 +371,18 @@ def allocation_payload(user):
     - labels: data_symbols
     - values: current position value (holdings * latest price)
     """
-    df = _transactions_dataframe(user)
-    if df.empty:
-        return {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
-
-    holdings = _holdings_timeseries(df)
-    if holdings.empty:
-        return {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
-
-    last_holdings = holdings.iloc[-1]
-    last_holdings = last_holdings[last_holdings > 0]
-
-    if last_holdings.empty:
-        return {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
-
-    # pull prices for a small recent window and use last available
-    start_date = (timezone.now().date() - timezone.timedelta(days=30)).strftime("%Y-%m-%d")
-    end_date = (timezone.now().date() + timezone.timedelta(days=1)).strftime("%Y-%m-%d")
-
-    prices = get_close_prices_cached(
-        data_symbols=last_holdings.index.tolist(),
-        start_date=start_date,
-        end_date=end_date,
-        user=user,
-    )
-
-    if prices.empty:
-        return {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
+    empty = {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
 
-    # latest prices
-    prices.index = pd.to_datetime(prices.index.date)
-    latest = prices.ffill().iloc[-1].reindex(last_holdings.index).fillna(0)
-
-    current_values = (last_holdings * latest)
-    current_values = current_values[current_values > 0]
+    ledger = _ledger(user)
+    shards = _asset_shards(user, ledger)
+    current_values = pd.Series({
+        symbol: shard["value"]
+        for symbol, shard in shards.items()
+        if shard["quantity"] > 0 and shard["value"] > 0
+    }, dtype=float)
 
     if current_values.empty:
-        return {"labels": [], "values": [], "asset_types": [], "asset_names": [], "asset_short_names": []}
+        return empty
 
     type_priority = {"ETF": 0, "STOCK": 1, "ETC": 2, "CRYPTO": 3}
     asset_metadata = _asset_metadata_map(user, current_values.index.tolist())
@@ -417,72 +430,40 @@ def asset_growth_payload(user):
     - dates: shared date index
     - series: [{symbol, asset_type, value, invested}, ...]
     """
-    df = _transactions_dataframe(user)
-    if df.empty:
+    ledger = _ledger(user)
+    shards = _asset_shards(user, ledger)
+    index = _portfolio_index(shards) if shards else None
+    if index is None:
         return {"dates": [], "series": []}
 
-    holdings = _holdings_timeseries(df)
-    if holdings.empty:
+    priced = [
+        shard for shard in shards.values()
+        if shard["has_prices"] and shard["first_trade_day"] is not None
+    ]
+    if not priced:
         return {"dates": [], "series": []}
 
-    start_date = holdings.index.min().strftime("%Y-%m-%d")
-    end_date = (timezone.now().date() + timezone.timedelta(days=1)).strftime("%Y-%m-%d")
+    values = _stack_shards(priced, "values", index)
+    invested = _stack_shards(priced, "invested", index)
+    asset_metadata = _asset_metadata_map(user, [shard["symbol"] for shard in priced])
 
-    prices = get_close_prices_cached(
-        data_symbols=holdings.columns.tolist(),
-        start_date=start_date,
-        end_date=end_date,
-        user=user,
-    )
-    if prices.empty:
-        return {"dates": [], "series": []}
-
-    prices.index = pd.to_datetime(prices.index.date)
-    prices = prices.reindex(holdings.index).ffill().bfill()
-    prices = prices.dropna(axis=1, how="all")
-    holdings = holdings.reindex(columns=prices.columns).fillna(0)
-    if holdings.empty:
-        return {"dates": [], "series": []}
-
-    values = holdings * prices
-
-    df_cash = df.copy()
-    df_cash["cashflow_asset"] = 0.0
-    is_buy = df_cash["txn_type"] == "BUY"
-    is_sell = df_cash["txn_type"] == "SELL"
-    is_div = df_cash["txn_type"] == "DIV"
-    df_cash.loc[is_buy, "cashflow_asset"] = df_cash.loc[is_buy, "quantity"] * df_cash.loc[is_buy, "unit_price"]
-    df_cash.loc[is_sell, "cashflow_asset"] = -1 * df_cash.loc[is_sell, "quantity"] * df_cash.loc[is_sell, "unit_price"]
-    df_cash.loc[is_div, "cashflow_asset"] = -1 * df_cash.loc[is_div, "div_amount"]
-
-    invested_by_asset = (
-        df_cash.groupby(["date", "data_symbol"])["cashflow_asset"]
-        .sum()
-        .unstack(fill_value=0)
-        .sort_index()
-        .cumsum()
-    )
-    invested_by_asset = invested_by_asset.reindex(holdings.index).ffill().fillna(0)
-    invested_by_asset = invested_by_asset.reindex(columns=values.columns, fill_value=0)
-
-    asset_metadata = _asset_metadata_map(user, values.columns.tolist())
+    keep = (values.max(axis=0) > 0) | (invested.max(axis=0) > 0)
 
     type_priority = {"ETF": 0, "STOCK": 1, "ETC": 2, "CRYPTO": 3}
     series = []
-    for symbol in values.columns:
-        symbol_values = values[symbol]
-        symbol_invested = invested_by_asset[symbol]
-        if float(symbol_values.max()) <= 0 and float(symbol_invested.max()) <= 0:
+    for column, shard in enumerate(priced):
+        if not keep[column]:
             continue
 
+        symbol = shard["symbol"]
         series.append({
             "symbol": symbol,
             "ticker": asset_metadata.get(symbol, {}).get("ticker", symbol),
             "asset_type": asset_metadata.get(symbol, {}).get("asset_type", "STOCK"),
             "name": asset_metadata.get(symbol, {}).get("name", symbol),
             "short_name": asset_metadata.get(symbol, {}).get("short_name", symbol),
-            "value": [float(x) for x in symbol_values.values],
-            "invested": [float(x) for x in symbol_invested.values],
+            "value": values[:, column].tolist(),
+            "invested": invested[:, column].tolist(),
         })
 
     series.sort(
@@ -492,7 +473,7 @@ def asset_growth_payload(user):
         )
     )
 
-    dates = [d.strftime("%Y-%m-%d") for d in values.index]
+    dates = [d.strftime("%Y-%m-%d") for d in index]
     return {"dates": dates, "series": series}
 
 
@@ -501,33 +482,33 @@ def dividends_monthly_payload(user):
     Returns monthly dividend totals for a bar chart:
     - dates: month-end timestamps as YYYY-MM-DD
     - dividends: monthly dividend sums
+    - cumulative: running dividend total
+    Aggregation runs in the database; only one row per month reaches Python.
     """
-    df = _transactions_dataframe(user)
-    if df.empty:
-        return {"dates": [], "dividends": []}
-
-    divs = df[df["txn_type"] == "DIV"].copy()
-    if divs.empty:
-        return {"dates": [], "dividends": []}
-
-    divs["div_amount"] = divs["div_amount"].fillna(0.0)
-    monthly = (
-        divs.groupby(pd.Grouper(key="date", freq="ME"))["div_amount"]
-        .sum()
-        .sort_index()
+    months = monthly_dividends(user)
+    if not months:
+        return {"dates": [], "dividends": [], "cumulative": []}
+
+    month_ends = pd.to_datetime([month for month, _, _ in months]).tz_localize(None).to_period("M").to_timestamp("M")
+    monthly = pd.DataFrame(
+        {
+            "dividends": [total for _, total, _ in months],
+            "cumulative": [cumulative for _, _, cumulative in months],
+        },
+        index=month_ends,
     )
 
-    if monthly.empty:
-        return {"dates": [], "dividends": []}
-
     start = monthly.index.min()
     end = pd.to_datetime(timezone.now().date()).to_period("M").to_timestamp("M")
-    full_index = pd.date_range(start, end, freq="ME")
-    monthly = monthly.reindex(full_index, fill_value=0.0)
+    full_index = pd.date_range(start, max(start, end), freq="ME")
+    monthly = monthly.reindex(full_index)
+    monthly["dividends"] = monthly["dividends"].fillna(0.0)
+    monthly["cumulative"] = monthly["cumulative"].ffill()
 
     return {
         "dates": [d.strftime("%Y-%m-%d") for d in monthly.index],
-        "dividends": [float(x) for x in monthly.values],
+        "dividends": [float(x) for x in monthly["dividends"]],
+        "cumulative": [float(x) for x in monthly["cumulative"]],
     }
 
 
@@ -540,49 +521,162 @@ def _period_start_for_label(label, earliest_timestamp):
         candidate = pd.to_datetime(today - timezone.timedelta(days=7))
     elif label == "M":
         candidate = pd.to_datetime(today - timezone.timedelta(days=30))
+    elif label == "3M":
+        candidate = pd.to_datetime(today - timezone.timedelta(days=91))
     elif label == "YTD":
         candidate = pd.Timestamp(year=today.year, month=1, day=1)
+    elif label == "1Y":
+        candidate = pd.to_datetime(today - timezone.timedelta(days=365))
+    elif label == "3Y":
+        candidate = pd.to_datetime(today - timezone.timedelta(days=3 * 365))
     else:
         candidate = earliest
 
     return candidate if candidate > earliest else earliest
 
 
-def details_payload(user):
-    from itertools import groupby as _groupby
+def _compute_returns_table(user, ledger):
+    """
+    Returns for every currently-held asset over every RETURN_PERIODS window,
+    computed in one pass over the aligned (days x symbols) price matrix.
 
-    df = _transactions_dataframe(user)
-    if df.empty:
-        return {"groups": [], "total_portfolio": 0.0}
+    - price_return_pct: close today vs. close on the period start
+    - held_return_pct: close today vs. close on the first day the asset was
+      held inside the period
 
-    holdings = _holdings_timeseries(df)
+    Returns None when nothing is held or no prices are available.
+    """
+    holdings = ChangePointHoldings.from_ledger(ledger)
     if holdings.empty:
-        return {"groups": [], "total_portfolio": 0.0}
+        return None
 
-    latest_holdings = holdings.iloc[-1]
-    open_symbols = latest_holdings[latest_holdings > 0].index.tolist()
+    today = timezone.now().date()
+    quantities = holdings.as_of(today)
+    open_symbols = quantities[quantities > 0].index.tolist()
     if not open_symbols:
-        return {"groups": [], "total_portfolio": 0.0}
+        return None
 
-    today = timezone.now().date()
-    ytd_start = f"{today.year}-01-01"
-    end_date = (today + timezone.timedelta(days=1)).strftime("%Y-%m-%d")
+    period_starts = pd.Series(
+        [_period_start_for_label(label, holdings.start) for label in RETURN_PERIODS],
+        index=list(RETURN_PERIODS),
+    )
+    index = pd.date_range(period_starts.min(), pd.to_datetime(today), freq="D")
+    if index.empty:
+        return None
 
     prices = get_close_prices_cached(
         data_symbols=open_symbols,
-        start_date=ytd_start,
-        end_date=end_date,
+        start_date=index[0].strftime("%Y-%m-%d"),
+        end_date=(today + timezone.timedelta(days=1)).strftime("%Y-%m-%d"),
         user=user,
     )
     if prices.empty:
-        return {"groups": [], "total_portfolio": 0.0}
+        return None
 
     prices.index = pd.to_datetime(prices.index.date)
-    prices = prices.ffill()
-    open_symbols = [s for s in open_symbols if s in prices.columns]
-    if not open_symbols:
+    prices = prices.reindex(index).ffill().bfill()
+    prices = prices.reindex(columns=open_symbols).dropna(axis=1, how="all")
+    if prices.empty:
+        return None
+
+    symbols = prices.columns.tolist()
+    matrix = prices.to_numpy(dtype=float)
+    latest = matrix[-1]
+    columns = np.arange(len(symbols))
+
+    period_rows = (period_starts - index[0]).dt.days.to_numpy().clip(0, len(index) - 1)
+    start_prices = matrix[period_rows, :]
+
+    held_start_prices = np.full((len(RETURN_PERIODS), len(symbols)), np.nan)
+    for row, period_start in enumerate(period_starts):
+        first_held = holdings.first_held_since(period_start).reindex(symbols)
+        held_rows = (first_held - index[0]).dt.days.to_numpy()
+        valid = ~np.isnan(held_rows) & (held_rows < len(index))
+        held_start_prices[row, valid] = matrix[held_rows[valid].astype(int), columns[valid]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_returns = np.where(start_prices > 0, (latest - start_prices) / start_prices * 100, np.nan)
+        held_returns = np.where(held_start_prices > 0, (latest - held_start_prices) / held_start_prices * 100, np.nan)
+
+    return {
+        "as_of": today,
+        "symbols": symbols,
+        "quantity": quantities.reindex(symbols),
+        "price": pd.Series(latest, index=symbols),
+        "period_starts": period_starts,
+        "start_price": pd.DataFrame(start_prices.T, index=symbols, columns=list(RETURN_PERIODS)),
+        "price_return_pct": pd.DataFrame(price_returns.T, index=symbols, columns=list(RETURN_PERIODS)),
+        "held_return_pct": pd.DataFrame(held_returns.T, index=symbols, columns=list(RETURN_PERIODS)),
+    }
+
+
+def _returns_table(user):
+    """Cached multi-period returns table shared by details, winners/losers and returns."""
+    key = analytics_cache_key(user.id, "returns")
+    version = prices_version(user.id)
+    table = priced_value(cache.get(key), version)
+    record_cache("returns", table is not None)
+    if table is None:
+        stale_before = current_stale_symbols()
+        table = _compute_returns_table(user, _ledger(user))
+        # cache "nothing to report" too, so empty portfolios don't recompute;
+        # a table built from stale prices is not cached
+        if current_stale_symbols() == stale_before:
+            cache.set(key, (version, table or {}), ANALYTICS_CACHE_TIMEOUT)
+    return table or None
+
+
+def _float_or_none(value):
+    return float(value) if value is not None and pd.notna(value) else None
+
+
+def returns_payload(user):
+    """
+    Returns every standard period for every currently-held asset:
+    - periods: RETURN_PERIODS
+    - assets: [{symbol, ..., price_return_pct: {period: pct}, held_return_pct: {...}}, ...]
+    """
+    table = _returns_table(user)
+    if table is None:
+        return {"periods": list(RETURN_PERIODS), "assets": []}
+
+    asset_metadata = _asset_metadata_map(user, table["symbols"])
+    assets = []
+    for symbol in table["symbols"]:
+        meta = asset_metadata.get(symbol, {})
+        assets.append({
+            "symbol": symbol,
+            "ticker": meta.get("ticker", symbol),
+            "asset_type": meta.get("asset_type", "STOCK"),
+            "name": meta.get("name", symbol),
+            "short_name": meta.get("short_name", symbol),
+            "price": _float_or_none(table["price"][symbol]),
+            "price_return_pct": {
+                period: _float_or_none(value)
+                for period, value in table["price_return_pct"].loc[symbol].items()
+            },
+            "held_return_pct": {
+                period: _float_or_none(value)
+                for period, value in table["held_return_pct"].loc[symbol].items()
+            },
+        })
+
+    return {
+        "as_of": table["as_of"].isoformat(),
+        "periods": list(RETURN_PERIODS),
+        "assets": assets,
+    }
+
+
+def details_payload(user):
+    from itertools import groupby as _groupby
+
+    table = _returns_table(user)
+    if table is None:
         return {"groups": [], "total_portfolio": 0.0}
 
+    open_symbols = table["symbols"]
+
     assets_qs = Asset.objects.filter(user=user, data_symbol__in=open_symbols)
     asset_info = {}
     for a in assets_qs:
@@ -594,47 +688,31 @@ def details_payload(user):
             "asset_type": a.asset_type,
         }
 
-    buy_df = df[df["txn_type"] == "BUY"].copy()
-    sell_df = df[df["txn_type"] == "SELL"].copy()
-    div_df = df[df["txn_type"] == "DIV"].copy()
-    buy_df["cost"] = buy_df["quantity"] * buy_df["unit_price"]
-    sell_df["proceeds"] = sell_df["quantity"] * sell_df["unit_price"]
-
-    total_bought = buy_df.groupby("data_symbol")["cost"].sum().reindex(open_symbols).fillna(0)
-    total_sold = sell_df.groupby("data_symbol")["proceeds"].sum().reindex(open_symbols).fillna(0)
-    total_dividends = div_df.groupby("data_symbol")["div_amount"].sum().reindex(open_symbols).fillna(0)
+    totals = ledger_totals_by_symbol(user, data_symbols=open_symbols)
 
-    prices_aligned = prices.reindex(columns=open_symbols)
-    latest_prices = prices_aligned.iloc[-1]
-    quantities = latest_holdings.reindex(open_symbols).fillna(0)
+    latest_prices = table["price"]
+    quantities = table["quantity"].fillna(0)
     market_values = quantities * latest_prices.fillna(0)
     total_portfolio = float(market_values.sum())
 
-    ytd_start_prices = prices_aligned.apply(lambda col: col.dropna().iloc[0] if not col.dropna().empty else None)
-
-    month_ago = pd.to_datetime(today - timezone.timedelta(days=30))
-    prices_up_to_month = prices_aligned[prices_aligned.index <= month_ago]
-    month_prices = prices_up_to_month.iloc[-1] if not prices_up_to_month.empty else latest_prices
+    month_prices = table["start_price"]["M"]
+    month_change_pct = table["price_return_pct"]["M"]
+    ytd_pct = table["price_return_pct"]["YTD"]
 
     type_priority = {"ETF": 0, "STOCK": 1, "ETC": 2, "CRYPTO": 3}
     rows = []
     for symbol in open_symbols:
         qty = float(quantities.get(symbol, 0))
-        cur_raw = latest_prices.get(symbol)
-        cur_price = float(cur_raw) if cur_raw is not None and pd.notna(cur_raw) else None
-        ytd_raw = ytd_start_prices.get(symbol)
-        ytd_price = float(ytd_raw) if ytd_raw is not None and pd.notna(ytd_raw) else None
-        month_raw = month_prices.get(symbol)
-        month_price = float(month_raw) if month_raw is not None and pd.notna(month_raw) else None
+        cur_price = _float_or_none(latest_prices.get(symbol))
+        month_price = _float_or_none(month_prices.get(symbol))
 
         market_val = float(market_values.get(symbol, 0))
-        bought = float(total_bought.get(symbol, 0))
-        sold = float(total_sold.get(symbol, 0))
-        dividends = float(total_dividends.get(symbol, 0))
+        symbol_totals = totals.get(symbol, {})
+        bought = symbol_totals.get("total_bought", 0.0)
+        sold = symbol_totals.get("total_sold", 0.0)
+        dividends = symbol_totals.get("total_dividends", 0.0)
 
         month_change = (cur_price - month_price) * qty if cur_price is not None and month_price is not None else None
-        month_change_pct = ((cur_price - month_price) / month_price * 100) if cur_price is not None and month_price is not None and month_price > 0 else None
-        ytd_pct = ((cur_price - ytd_price) / ytd_price * 100) if cur_price is not None and ytd_price is not None and ytd_price > 0 else None
         total_pl = market_val + sold + dividends - bought
         total_pl_pct = (total_pl / bought * 100) if bought > 0 else None
         pct_portfolio = (market_val / total_portfolio * 100) if total_portfolio > 0 else None
@@ -652,8 +730,8 @@ def details_payload(user):
             "market_value": market_val,
             "pct_portfolio": pct_portfolio,
             "month_change": month_change,
-            "month_change_pct": month_change_pct,
-            "ytd_pct": ytd_pct,
+            "month_change_pct": _float_or_none(month_change_pct.get(symbol)),
+            "ytd_pct": _float_or_none(ytd_pct.get(symbol)),
             "total_bought": bought,
             "total_sold": sold,
             "total_dividends": dividends,
@@ -675,58 +753,20 @@ def winners_losers_payload(user, period="M", limit=6):
     Returns best and worst currently-held assets over a selected period.
     Performance is measured as price return while the asset was held in the window.
     """
-    df = _transactions_dataframe(user)
-    if df.empty:
-        return {"period": str(period or "M").upper(), "winners": [], "losers": []}
-
-    holdings = _holdings_timeseries(df)
-    if holdings.empty:
-        return {"period": str(period or "M").upper(), "winners": [], "losers": []}
+    period_label = return_period(period)
+    empty = {"period": period_label, "winners": [], "losers": []}
 
-    latest_holdings = holdings.iloc[-1]
-    open_symbols = latest_holdings[latest_holdings > 0].index.tolist()
-    if not open_symbols:
-        return {"period": str(period or "M").upper(), "winners": [], "losers": []}
-
-    period_label = str(period or "M").upper()
-    start_ts = _period_start_for_label(period_label, holdings.index.min())
-    window_holdings = holdings.loc[holdings.index >= start_ts, open_symbols].copy()
-    if window_holdings.empty:
-        return {"period": period_label, "winners": [], "losers": []}
-
-    prices = get_close_prices_cached(
-        data_symbols=open_symbols,
-        start_date=window_holdings.index.min().strftime("%Y-%m-%d"),
-        end_date=(timezone.now().date() + timezone.timedelta(days=1)).strftime("%Y-%m-%d"),
-        user=user,
-    )
-    if prices.empty:
-        return {"period": period_label, "winners": [], "losers": []}
+    table = _returns_table(user)
+    if table is None:
+        return empty
 
-    prices.index = pd.to_datetime(prices.index.date)
-    prices = prices.reindex(window_holdings.index).ffill().bfill()
-    prices = prices.reindex(columns=open_symbols).dropna(axis=1, how="all")
-    if prices.empty:
-        return {"period": period_label, "winners": [], "losers": []}
-
-    window_holdings = window_holdings.reindex(columns=prices.columns).fillna(0)
-    asset_metadata = _asset_metadata_map(user, prices.columns.tolist())
+    returns = table["held_return_pct"][period_label].dropna()
+    if returns.empty:
+        return empty
 
+    asset_metadata = _asset_metadata_map(user, returns.index.tolist())
     rows = []
-    latest_date = window_holdings.index[-1]
-    for symbol in prices.columns:
-        symbol_holdings = window_holdings[symbol]
-        active_dates = symbol_holdings[symbol_holdings > 0].index
-        if active_dates.empty:
-            continue
-
-        start_date = active_dates[0]
-        start_price = pd.to_numeric(prices.at[start_date, symbol], errors="coerce")
-        end_price = pd.to_numeric(prices.at[latest_date, symbol], errors="coerce")
-        if not pd.notna(start_price) or not pd.notna(end_price) or float(start_price) <= 0:
-            continue
-
-        return_pct = ((float(end_price) - float(start_price)) / float(start_price)) * 100
+    for symbol, return_pct in returns.items():
         rows.append({
             "symbol": symbol,
             "ticker": asset_metadata.get(symbol, {}).get("ticker", symbol),
@@ -736,12 +776,107 @@ def winners_losers_payload(user, period="M", limit=6):
             "return_pct": float(return_pct),
         })
 
-    if not rows:
-        return {"period": period_label, "winners": [], "losers": []}
-
     ranked = sorted(rows, key=lambda item: item["return_pct"], reverse=True)
     return {
         "period": period_label,
         "winners": ranked[:limit],
         "losers": sorted(rows, key=lambda item: item["return_pct"])[:limit],
     }
+
+
+def valuation_payload(user, as_of=None):
+    """
+    Point-in-time portfolio valuation:
+    - positions held at the end of ``as_of`` (defaults to today)
+    - each valued at the latest close on or before that day
+    """
+    as_of = as_of or timezone.now().date()
+    empty = {"as_of": as_of.isoformat(), "total_value": 0.0, "positions": []}
+
+    ledger = _ledger(user)
+    holdings = ChangePointHoldings.from_ledger(ledger).as_of(as_of)
+    holdings = holdings[holdings > 0]
+    if holdings.empty:
+        return empty
+
+    # a short lookback is enough to bridge weekends and market holidays
+    prices = get_close_prices_cached(
+        data_symbols=holdings.index.tolist(),
+        start_date=(as_of - timezone.timedelta(days=14)).strftime("%Y-%m-%d"),
+        end_date=(as_of + timezone.timedelta(days=1)).strftime("%Y-%m-%d"),
+        user=user,
+    )
+    if prices.empty:
+        return empty
+
+    latest_prices = prices.ffill().iloc[-1].reindex(holdings.index)
+    values = (holdings * latest_prices).dropna()
+    if values.empty:
+        return empty
+
+    asset_metadata = _asset_metadata_map(user, values.index.tolist())
+    positions = []
+    for symbol, value in values.sort_values(ascending=False).items():
+        meta = asset_metadata.get(symbol, {})
+        positions.append({
+            "symbol": symbol,
+            "ticker": meta.get("ticker", symbol),
+            "asset_type": meta.get("asset_type", "STOCK"),
+            "name": meta.get("name", symbol),
+            "short_name": meta.get("short_name", symbol),
+            "quantity": float(holdings[symbol]),
+            "price": float(latest_prices[symbol]),
+            "value": float(value),
+        })
+
+    return {
+        "as_of": as_of.isoformat(),
+        "total_value": float(values.sum()),
+        "positions": positions,
+    }
+
+
+MATRIX_NAMES = ("prices", "holdings", "invested")
+
+
+def analytics_matrices(user, names=MATRIX_NAMES):
+    """
+    Aligned daily matrices (date x data_symbol) behind the analytics charts:
+    - prices: close prices, forward-filled over non-trading days (NaN before the first close)
+    - holdings: quantity held at the end of each day
+    - invested: net invested per asset (BUY adds, SELL and DIV subtract)
+
+    All share one DatetimeIndex named "date", from the first trade until
+    today. Returns {} without trades.
+    """
+    ledger = _ledger(user)
+    holdings = _holdings_timeseries(ledger)
+    if holdings.empty:
+        return {}
+
+    index = holdings.index
+    matrices = {}
+
+    if "holdings" in names:
+        matrices["holdings"] = holdings
+
+    if "prices" in names:
+        symbols = holdings.columns.tolist()
+        prices = get_close_prices_cached(
+            data_symbols=symbols,
+            start_date=index[0].strftime("%Y-%m-%d"),
+            end_date=(index[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+            user=user,
+        )
+        if not prices.empty:
+            prices.index = pd.to_datetime(prices.index.date)
+        prices = prices.reindex(index=index, columns=symbols).ffill()
+        prices.index.name = "date"
+        matrices["prices"] = prices
+
+    if "invested" in names:
+        shards = _asset_shards(user, ledger)
+        invested = _stack_shards(list(shards.values()), "invested", index)
+        matrices["invested"] = pd.DataFrame(invested, index=index, columns=list(shards))
+
+    return matrices
@@ -0,0 +1,85 @@
+# portfolio/services/analytics_cache.py
+from django.core.cache import cache
+
+from portfolio.models import Asset
+
+# Payloads and the returns table are cached as (price version, value) pairs:
+# prices stored for one of the user's assets retire them, along with the ETags
+# they were served under (see services/conditional.py).
+ANALYTICS_CACHE_TIMEOUT = 300  # 5 minutes
+
+# Payloads built from stale prices are kept just long enough to absorb a burst
+# of reloads while the background downloads finish.
+STALE_PAYLOAD_CACHE_TIMEOUT = 15
+
+# Shards are keyed by symbol and carry the day and the user's price version
+# they were built for (see services/conditional.py), so they can outlive the
+# portfolio payloads that are assembled from them: stored prices retire them.
+SHARD_CACHE_TIMEOUT = 60 * 60
+
+RETURN_PERIODS = ("W", "M", "3M", "YTD", "1Y", "3Y", "ALL")
+
+# Everything cached per user that any write makes stale. The ledger frame is
+# shared by all payloads, so it goes with them.
+ANALYTICS_CACHE_ENTRIES = (
+    "ledger",
+    "returns",
+    "growth",
+    "allocation",
+    "asset_growth",
+    "dividends_monthly",
+    *(f"winners_losers:{period}" for period in RETURN_PERIODS),
+    "details",
+    "returns_payload",
+)
+
+
+def return_period(value):
+    """The RETURN_PERIODS label for a requested range: M when missing, ALL when unknown."""
+    period = str(value or "M").upper()
+    return period if period in RETURN_PERIODS else "ALL"
+
+
+def priced_value(cached, version):
+    """The value of a cached (price version, value) pair, or None when it is missing or was built on other prices."""
+    if cached is None or cached[0] != version:
+        return None
+    return cached[1]
+
+
+def payload_cache_timeout(payload):
+    return STALE_PAYLOAD_CACHE_TIMEOUT if payload.get("stale") else ANALYTICS_CACHE_TIMEOUT
+
+
+def analytics_cache_key(user_id, endpoint):
+    return f"analytics:{user_id}:{endpoint}"
+
+
+def shard_cache_key(user_id, data_symbol):
+    return f"analytics:{user_id}:shard:{data_symbol}"
+
+
+def invalidate_analytics_cache(user, data_symbols=None, warm=True):
+    """
+    Drop the cached portfolio payloads of a user. Per-asset shards are only
+    dropped for the given data symbols, so a single write recomputes a single
+    shard. Passing None drops every shard the user owns. The user's data
+    version moves on, so their conditional GETs miss (see
+    services/conditional.py). Unless warm is False the payloads are then
+    recomputed in the background (see services/analytics_warming.py).
+    """
+    from portfolio.services.conditional import mark_user_data_changed
+
+    keys = [analytics_cache_key(user.id, endpoint) for endpoint in ANALYTICS_CACHE_ENTRIES]
+
+    if data_symbols is None:
+        data_symbols = Asset.objects.filter(user=user).values_list("data_symbol", flat=True)
+
+    keys.extend(shard_cache_key(user.id, symbol) for symbol in set(data_symbols) if symbol)
+    cache.delete_many(keys)
+    mark_user_data_changed(user)
+
+    if warm:
+        from portfolio.services.analytics_warming import schedule_analytics_warm
+
+        schedule_analytics_warm(user)
@@ -0,0 +1,152 @@
+# portfolio/services/analytics_warming.py
+"""
+Recompute a user's analytics in the background, so the dashboard they open
+after an import or an edit (or after logging in) is served from the cache.
+
+invalidate_analytics_cache() schedules a warm once the write's transaction
+commits; logging in schedules a warm of whatever is not cached. Warms run on
+a small pool in the process that scheduled them, one per user at a time: a
+write during a warm makes it run again once it finishes, since what it had
+computed so far may predate the write. `manage.py warm_analytics` warms
+every user from a process pool.
+
+Disabled with ANALYTICS_WARMING = False (the test runner does so).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db import close_old_connections, transaction as db_transaction
+from django.dispatch import receiver
+
+from portfolio.services.analytics_cache import analytics_cache_key, payload_cache_timeout, priced_value
+from portfolio.services.conditional import prices_version
+
+logger = logging.getLogger(__name__)
+
+# (cache entry, payload function, kwargs) for what the dashboard loads first;
+# winners_losers:M is its default range
+WARM_PAYLOADS = (
+    ("growth", "growth_payload", {}),
+    ("allocation", "allocation_payload", {}),
+    ("asset_growth", "asset_growth_payload", {}),
+    ("dividends_monthly", "dividends_monthly_payload", {}),
+    ("winners_losers:M", "winners_losers_payload", {"period": "M"}),
+    ("details", "details_payload", {}),
+    ("returns_payload", "returns_payload", {}),
+)
+
+_warming = ThreadPoolExecutor(
+    max_workers=getattr(settings, "ANALYTICS_WARM_WORKERS", 2),
+    thread_name_prefix="marketvault-warm",
+)
+# user id -> "queued", "running" or "rerun"
+_warms = {}
+_warms_lock = threading.Lock()
+
+
+def warm_user_analytics(user, only_missing=False):
+    """
+    Compute and cache the WARM_PAYLOADS of `user`, waiting for any price
+    downloads they need. With only_missing, cached entries are left alone.
+    Returns the entries computed.
+    """
+    from portfolio.services import analytics
+
+    computed = []
+    for entry, function_name, kwargs in WARM_PAYLOADS:
+        key = analytics_cache_key(user.id, entry)
+        version = prices_version(user.id)
+        if only_missing and priced_value(cache.get(key), version) is not None:
+            continue
+        payload = getattr(analytics, function_name)(user, **kwargs)
+        cache.set(key, (version, payload), payload_cache_timeout(payload))
+        computed.append(entry)
+    return computed
+
+
+def _warm_in_worker(user_id, only_missing):
+    from portfolio.models import User
+
+    while True:
+        with _warms_lock:
+            _warms[user_id] = "running"
+        close_old_connections()
+        try:
+            user = User.objects.filter(id=user_id).first()
+            if user is not None:
+                warm_user_analytics(user, only_missing=only_missing)
+        except ModuleNotFoundError:
+            # no pandas, no analytics to warm
+            pass
+        except Exception:
+            logger.exception("Warming analytics for user %s failed", user_id)
+        finally:
+            close_old_connections()
+
+        with _warms_lock:
+            if _warms.get(user_id) != "rerun":
+                _warms.pop(user_id, None)
+                return
+        # written to during the warm: recompute everything
+        only_missing = False
+
+
+def _enqueue(user_id, only_missing):
+    with _warms_lock:
+        state = _warms.get(user_id)
+        if state in ("queued", "rerun"):
+            return
+        if state == "running":
+            _warms[user_id] = "rerun"
+            return
+        _warms[user_id] = "queued"
+    _warming.submit(_warm_in_worker, user_id, only_missing)
+
+
+def schedule_analytics_warm(user, only_missing=False):
+    """Warm the user's analytics in the background once the current transaction (if any) commits."""
+    if getattr(settings, "ANALYTICS_WARMING", True):
+        db_transaction.on_commit(lambda: _enqueue(user.id, only_missing))
+
+
+def wait_for_analytics_warms(timeout=None):
+    """Block until every scheduled warm has finished. Returns False on timeout."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _warms_lock:
+            if not _warms:
+                return True
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+
+
+@receiver(user_logged_in)
+def _warm_on_login(sender, request, user, **kwargs):
+    schedule_analytics_warm(user, only_missing=True)
+
+
+def warm_user_in_process(user_id, only_missing=False):
+    """
+    warm_user_analytics() for a process pool worker: returns (user_id,
+    computed entries, seconds, error message or None).
+    """
+    import django
+
+    django.setup()
+    from portfolio.models import User
+
+    started = time.perf_counter()
+    try:
+        computed = warm_user_analytics(User.objects.get(id=user_id), only_missing=only_missing)
+        return user_id, computed, time.perf_counter() - started, None
+    except Exception as exc:
+        logger.exception("Warming analytics for user %s failed", user_id)
+        return user_id, [], time.perf_counter() - started, str(exc)
+    finally:
+        close_old_connections()
@@ -0,0 +1,54 @@
+# portfolio/services/arrow_export.py
+import numpy as np
+
+# format -> (content type, file extension)
+ARROW_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def matrix_table(frame, name, as_of=None):
+    """
+    A (date x data_symbol) matrix as an Arrow table: a date32 "date" column
+    followed by one float64 column per symbol. Missing values become nulls.
+    """
+    import pyarrow as pa
+
+    columns = {
+        "date": pa.array(frame.index.to_numpy().astype("datetime64[D]"), type=pa.date32()),
+    }
+    for symbol in frame.columns:
+        columns[str(symbol)] = pa.array(frame[symbol].to_numpy(dtype=np.float64), from_pandas=True)
+
+    metadata = {"matrix": name}
+    if as_of is not None:
+        metadata["as_of"] = as_of.isoformat()
+    return pa.table(columns, metadata=metadata)
+
+
+def _write(table, sink, export_format):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if export_format == "arrow":
+        # Uncompressed IPC file: readers can memory-map it without copying.
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+
+
+def table_bytes(table, export_format):
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    _write(table, sink, export_format)
+    return sink.getvalue().to_pybytes()
+
+
+def write_table_file(table, path, export_format):
+    import pyarrow as pa
+
+    with pa.OSFile(str(path), "wb") as sink:
+        _write(table, sink, export_format)
@@ -0,0 +1,188 @@
+# portfolio/services/async_analytics.py
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from portfolio.models import PricePoint, Transaction
+from portfolio.services.analytics_cache import ANALYTICS_CACHE_TIMEOUT, analytics_cache_key, shard_cache_key
+from portfolio.services.ledger import LEDGER_FIELDS, build_ledger
+from portfolio.services.analytics import budgeted_payload
+from portfolio.services.prices_cache import PRICE_REFRESH_AFTER_DAYS, get_close_prices_cached, price_budget
+from portfolio.services.profiling import current_profile
+from portfolio.services.request_timing import record_cache, stage
+
+logger = logging.getLogger(__name__)
+
+# pandas work is CPU bound, so it gets a small pool; a request waiting for a
+# slot does not hold up the event loop. Price downloads mostly wait on the
+# network and get their own, wider pool.
+_executors = {}
+
+
+def _executor(name):
+    if name not in _executors:
+        workers = {
+            "analytics": getattr(settings, "ANALYTICS_EXECUTOR_WORKERS", 4),
+            "downloads": getattr(settings, "PRICE_DOWNLOAD_CONCURRENCY", 8),
+        }[name]
+        _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"marketvault-{name}")
+    return _executors[name]
+
+
+def _call_in_worker(func, *args, **kwargs):
+    # Executor threads outlive requests, so they follow the same connection
+    # lifecycle as request threads (CONN_MAX_AGE, broken connections).
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_executor(name, func, *args, **kwargs):
+    """Run blocking func on the "analytics" or "downloads" pool and await the result."""
+    loop = asyncio.get_running_loop()
+    # with the caller's context, so request timings and budgets follow the work
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor(name), functools.partial(context.run, _call_in_worker, func, *args, **kwargs),
+    )
+
+
+def _timed_build_ledger(rows):
+    with stage("ledger"):
+        return build_ledger(rows)
+
+
+async def aledger(user):
+    """Async counterpart of analytics._ledger(): cache first, then an async queryset."""
+    key = analytics_cache_key(user.id, "ledger")
+    ledger = await cache.aget(key)
+    record_cache("ledger", ledger is not None)
+    if ledger is None:
+        rows = [
+            row async for row in
+            Transaction.objects.filter(user=user).order_by("timestamp", "id").values_list(*LEDGER_FIELDS)
+        ]
+        ledger = await run_in_executor("analytics", _timed_build_ledger, rows)
+        await cache.aset(key, ledger, ANALYTICS_CACHE_TIMEOUT)
+    return ledger
+
+
+# The dashboard requests its charts in parallel; downloads already running for
+# one of them are awaited by the others instead of being started again.
+_downloads_in_flight = {}
+
+
+def _prefetch_symbol(user, symbol, start_date, end_date, seconds):
+    with price_budget(seconds):
+        get_close_prices_cached(data_symbols=[symbol], start_date=start_date, end_date=end_date, user=user)
+
+
+def _shared_download(user, symbol, start_date, end_date, seconds):
+    key = (user.id, symbol)
+    task = _downloads_in_flight.get(key)
+    if task is None or task.done():
+        task = asyncio.ensure_future(
+            run_in_executor("downloads", _prefetch_symbol, user, symbol, start_date, end_date, seconds)
+        )
+        _downloads_in_flight[key] = task
+        task.add_done_callback(lambda _task: _downloads_in_flight.pop(key, None))
+    return task
+
+
+async def aprefetch_prices(user, ledger, seconds=None):
+    """
+    Download the prices the payloads are about to need, all symbols at once.
+
+    Symbols whose shard is cached for today, or whose cached closes are recent
+    enough, are skipped. The others are fetched concurrently on the download
+    pool; get_close_prices_cached stores them, so the payload computation that
+    follows reads them from the database instead of calling Yahoo one symbol
+    after the other. Each download is waited for at most `seconds` (see
+    price_budget()); slower ones finish in the background.
+    """
+    if ledger.empty:
+        return
+
+    today = timezone.now().date()
+    trades = ledger[ledger["txn_type"].isin(["BUY", "SELL"])]
+    first_trade_dates = trades.groupby("data_symbol", observed=True)["date"].min()
+    if first_trade_dates.empty:
+        return
+
+    symbols = list(first_trade_dates.index)
+    keys = {symbol: shard_cache_key(user.id, symbol) for symbol in symbols}
+    cached = await cache.aget_many(list(keys.values()))
+    symbols = [
+        symbol for symbol in symbols
+        if cached.get(keys[symbol]) is None or cached[keys[symbol]]["as_of"] != today
+    ]
+    if not symbols:
+        return
+
+    latest = {
+        symbol: latest_date
+        async for symbol, latest_date in
+        PricePoint.objects
+        .filter(asset__user=user, asset__data_symbol__in=symbols)
+        .values("asset__data_symbol")
+        .annotate(latest=Max("date"))
+        .values_list("asset__data_symbol", "latest")
+    }
+
+    end = today + timedelta(days=1)
+    refresh_if_older_than = end - timedelta(days=PRICE_REFRESH_AFTER_DAYS)
+    stale = [symbol for symbol in symbols if latest.get(symbol) is None or latest[symbol] < refresh_if_older_than]
+    if not stale:
+        return
+
+    results = await asyncio.gather(
+        *(
+            # shielded: a request that goes away must not cancel a download others wait on
+            asyncio.shield(_shared_download(
+                user, symbol, first_trade_dates[symbol].strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), seconds,
+            ))
+            for symbol in stale
+        ),
+        return_exceptions=True,
+    )
+    for symbol, result in zip(stale, results):
+        if isinstance(result, Exception):
+            # the payload computation retries this symbol on its own
+            logger.warning("Price prefetch for %s failed: %s", symbol, result)
+
+
+async def analytics_payload(user, payload_function, *args, **kwargs):
+    """
+    Build an analytics payload without blocking the event loop: the ledger and
+    prices are loaded first (async ORM, concurrent downloads), then the pandas
+    work runs on the bounded analytics pool. Price downloads share one
+    PRICE_FETCH_DEADLINE_SECONDS budget (see analytics.budgeted_payload()).
+    """
+    seconds = getattr(settings, "PRICE_FETCH_DEADLINE_SECONDS", None) or None
+    started = time.monotonic()
+
+    ledger = await aledger(user)
+    await aprefetch_prices(user, ledger, seconds)
+
+    # whatever is left of the price budget applies to the payload itself
+    if seconds is not None:
+        seconds = max(0.0, seconds - (time.monotonic() - started))
+    profile = current_profile()
+    if profile is not None:
+        # the event loop thread only awaits; profile the pandas work where it runs
+        return await run_in_executor(
+            "analytics", profile.run, budgeted_payload, payload_function, user, *args, seconds=seconds, **kwargs,
+        )
+    return await run_in_executor("analytics", budgeted_payload, payload_function, user, *args, seconds=seconds, **kwargs)
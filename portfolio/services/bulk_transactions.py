@@ -0,0 +1,186 @@
+# portfolio/services/bulk_transactions.py
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from django.utils.dateparse import parse_datetime
+
+from portfolio.models import Asset, Transaction
+from portfolio.services.analytics_cache import invalidate_analytics_cache
+
+MAX_BULK_OPERATIONS = 1000
+
+OPERATIONS = ("create", "update", "delete")
+
+EDITABLE_FIELDS = ("txn_type", "quantity", "unit_price", "div_amount")
+
+BULK_UPDATE_FIELDS = ["txn_type", "asset", "quantity", "unit_price", "div_amount", "timestamp", "row_hash"]
+
+
+class BulkTransactionError(Exception):
+    """The batch was rejected; nothing was written. errors lists the offending operations."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _error(op, index, errors):
+    return {"op": op, "index": index, "errors": errors}
+
+
+def _id_list(values, op, errors):
+    ids = []
+    for index, value in enumerate(values):
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            errors.append(_error(op, index, {"id": ["A transaction id is required."]}))
+            ids.append(None)
+    return ids
+
+
+def _apply_fields(transaction, data, assets):
+    """Copy request fields onto a transaction. Returns field errors for values that cannot be assigned."""
+    for field in EDITABLE_FIELDS:
+        if field in data:
+            setattr(transaction, field, data[field])
+
+    if "asset_id" in data:
+        asset = assets.get(str(data["asset_id"]))
+        if asset is None:
+            return {"asset_id": ["Asset not found."]}
+        transaction.asset = asset
+
+    if data.get("timestamp"):
+        try:
+            timestamp = parse_datetime(data["timestamp"])
+        except (TypeError, ValueError):
+            timestamp = None
+        if timestamp is None:
+            return {"timestamp": ["Invalid timestamp."]}
+        transaction.timestamp = timestamp
+
+    return None
+
+
+def _validate(transaction):
+    # user and asset were resolved against the user's own rows already; skipping
+    # them keeps full_clean from running one foreign key query per row
+    transaction.full_clean(exclude=["user", "asset"], validate_unique=False)
+    transaction.row_hash = transaction.compute_row_hash()
+
+
+def apply_bulk_transactions(user, creates=(), updates=(), deletes=()):
+    """
+    Validate and apply a batch of transaction creates, updates (dicts with an
+    id) and deletes (ids) as one unit.
+
+    Every operation is validated before anything is written; any error rejects
+    the whole batch with BulkTransactionError. The writes then run in one
+    atomic block: a single DELETE, bulk_update and bulk_create. The analytics
+    cache is invalidated once, for every data symbol the batch touched.
+    """
+    creates, updates, deletes = list(creates), list(updates), list(deletes)
+    if len(creates) + len(updates) + len(deletes) > MAX_BULK_OPERATIONS:
+        raise BulkTransactionError(
+            [{"op": None, "index": None, "errors": {"__all__": [f"At most {MAX_BULK_OPERATIONS} operations per request."]}}]
+        )
+
+    errors = []
+    update_ids = _id_list([data.get("id") if isinstance(data, dict) else None for data in updates], "update", errors)
+    delete_ids = _id_list(deletes, "delete", errors)
+
+    asset_ids = {
+        str(data["asset_id"])
+        for data in creates + updates
+        if isinstance(data, dict) and data.get("asset_id") not in (None, "")
+    }
+    asset_ids = {asset_id for asset_id in asset_ids if asset_id.isdigit()}
+    assets = {str(asset.id): asset for asset in Asset.objects.filter(user=user, id__in=asset_ids)}
+
+    known_ids = {txn_id for txn_id in update_ids + delete_ids if txn_id is not None}
+    existing = {
+        txn.id: txn
+        for txn in Transaction.objects.filter(user=user, id__in=known_ids).select_related("asset")
+    }
+    for txn in existing.values():
+        txn.user = user
+    deleting = set(delete_ids)
+    touched_symbols = set()
+
+    for index, txn_id in enumerate(delete_ids):
+        if txn_id is None:
+            continue
+        if txn_id not in existing:
+            errors.append(_error("delete", index, {"id": ["Transaction not found."]}))
+            continue
+        touched_symbols.add(existing[txn_id].asset.data_symbol)
+
+    to_update = []
+    for index, (data, txn_id) in enumerate(zip(updates, update_ids)):
+        if txn_id is None:
+            continue
+        transaction = existing.get(txn_id)
+        if transaction is None:
+            errors.append(_error("update", index, {"id": ["Transaction not found."]}))
+            continue
+        if txn_id in deleting:
+            errors.append(_error("update", index, {"id": ["Transaction is also being deleted."]}))
+            continue
+
+        touched_symbols.add(transaction.asset.data_symbol)
+        field_errors = _apply_fields(transaction, data, assets)
+        if field_errors:
+            errors.append(_error("update", index, field_errors))
+            continue
+        try:
+            _validate(transaction)
+        except ValidationError as error:
+            errors.append(_error("update", index, error.message_dict))
+            continue
+        touched_symbols.add(transaction.asset.data_symbol)
+        to_update.append((index, transaction))
+
+    to_create = []
+    for index, data in enumerate(creates):
+        if not isinstance(data, dict):
+            errors.append(_error("create", index, {"__all__": ["Expected an object."]}))
+            continue
+        if not data.get("asset_id"):
+            errors.append(_error("create", index, {"asset_id": ["asset_id is required."]}))
+            continue
+
+        transaction = Transaction(user=user)
+        field_errors = _apply_fields(transaction, data, assets)
+        if field_errors:
+            errors.append(_error("create", index, field_errors))
+            continue
+        try:
+            _validate(transaction)
+        except ValidationError as error:
+            errors.append(_error("create", index, error.message_dict))
+            continue
+        touched_symbols.add(transaction.asset.data_symbol)
+        to_create.append((index, transaction))
+
+    if errors:
+        errors.sort(key=lambda error: (OPERATIONS.index(error["op"]), error["index"]))
+        raise BulkTransactionError(errors)
+
+    created = [transaction for _index, transaction in to_create]
+    updated = [transaction for _index, transaction in to_update]
+    with db_transaction.atomic():
+        if deleting:
+            Transaction.objects.filter(user=user, id__in=deleting).delete()
+        if updated:
+            Transaction.objects.bulk_update(updated, BULK_UPDATE_FIELDS, batch_size=500)
+        if created:
+            Transaction.objects.bulk_create(created, batch_size=500)
+
+    if touched_symbols:
+        invalidate_analytics_cache(user, sorted(touched_symbols))
+
+    return {
+        "created": [transaction.serialize() for transaction in created],
+        "updated": [transaction.serialize() for transaction in updated],
+        "deleted": sorted(deleting),
+    }
@@ -0,0 +1,145 @@
+# portfolio/services/conditional.py
+"""
+Conditional GETs for the analytics, transaction and asset endpoints.
+
+Every user has a data version, replaced once a write to their transactions
+or assets commits (invalidate_analytics_cache() and mark_user_data_changed()),
+and a price version, replaced once downloaded prices are stored for one of
+their assets. A response's weak ETag hashes the URL with the versions it
+depends on (and, for analytics, today's date); Last-Modified is when the
+newest of them was replaced, and for analytics no earlier than the start of
+today, so a client revalidating by date alone does not keep yesterday's.
+@conditional_get answers a matching If-None-Match or If-Modified-Since with
+a 304 before the view runs.
+
+Versions live in the cache without a timeout. One that is missing (evicted,
+or a fresh cache) is recreated as new, so the worst a lost version costs is
+a full response.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from portfolio.services.analytics_cache import analytics_cache_key
+from portfolio.services.request_timing import stage
+
+DATA_VERSION = "data_version"
+PRICES_VERSION = "prices_version"
+
+
+def _new_version():
+    # whole seconds, as If-Modified-Since compares them
+    return uuid.uuid4().hex[:16], int(time.time())
+
+
+def _replace_versions(user_ids, name):
+    version = _new_version()
+    cache.set_many({analytics_cache_key(user_id, name): version for user_id in user_ids}, None)
+
+
+def mark_user_data_changed(user):
+    """Give `user` a new data version once the current transaction (if any) commits."""
+    db_transaction.on_commit(lambda: _replace_versions([user.id], DATA_VERSION))
+
+
+def mark_prices_changed(user_ids):
+    """Give the owners of assets whose prices were just stored a new price version."""
+    user_ids = set(user_ids)
+    if user_ids:
+        db_transaction.on_commit(lambda: _replace_versions(user_ids, PRICES_VERSION))
+
+
+def _versions(user_id, names):
+    keys = [analytics_cache_key(user_id, name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # lose a race to another worker recreating it rather than overwrite theirs
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key) or _new_version()
+    return [versions[key] for key in keys]
+
+
+def prices_version(user_id):
+    """The token of the user's current price version."""
+    [(token, _)] = _versions(user_id, (PRICES_VERSION,))
+    return token
+
+
+def validators(request, user_id, prices=False):
+    """The (weak ETag, Last-Modified timestamp) of the response to `request`."""
+    names = (DATA_VERSION, PRICES_VERSION) if prices else (DATA_VERSION,)
+    versions = _versions(user_id, names)
+    parts = [request.get_full_path(), *(token for token, _ in versions)]
+    modified = [modified for _, modified in versions]
+    if prices:
+        # payloads extend to today, so yesterday's are not today's
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        parts.append(today.date().isoformat())
+        modified.append(int(today.timestamp()))
+    digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"', max(modified)
+
+
+def _respond(response, etag, last_modified):
+    if response.status_code not in (200, 304) or "no-store" in response.get("Cache-Control", ""):
+        return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # revalidate on every use and keep it out of shared caches
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(prices=False):
+    """
+    Answer GETs of the decorated view conditionally. Goes under
+    @login_required. With prices, the ETag also covers the user's price version
+    and today's date, for responses computed from prices.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def _view(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                user = await request.auser()
+                etag, last_modified = await sync_to_async(validators)(request, user.id, prices)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _respond(response, etag, last_modified)
+        else:
+            @wraps(view)
+            def _view(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return view(request, *args, **kwargs)
+                etag, last_modified = validators(request, request.user.id, prices)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return _respond(response, etag, last_modified)
+        return _view
+    return decorator
+
+
+def payload_response(payload):
+    """
+    JSON response for an analytics payload. One built while price downloads
+    were still running is not to be stored, so it gets no validators and is
+    fetched in full until it is complete.
+    """
+    with stage("json"):
+        response = JsonResponse(payload)
+    if payload.get("stale"):
+        add_never_cache_headers(response)
+    return response
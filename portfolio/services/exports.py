@@ -0,0 +1,82 @@
+# portfolio/services/exports.py
+import csv
+import tempfile
+from datetime import timezone as dt_timezone
+
+from portfolio.models import Transaction
+
+EXPORT_HEADERS = ["data_symbol", "txn_type", "quantity", "unit_price", "div_amount", "timestamp"]
+
+EXPORT_QUERY_CHUNK_SIZE = 2000
+CSV_ROWS_PER_YIELD = 500
+
+
+def export_rows(user, chunk_size=EXPORT_QUERY_CHUNK_SIZE):
+    """
+    Transaction rows in export/import column order, oldest first.
+    Streams plain tuples from the database; no model instances are built.
+    """
+    rows = (
+        Transaction.objects
+        .filter(user=user)
+        .order_by("timestamp", "id")
+        .values_list("asset__data_symbol", "txn_type", "quantity", "unit_price", "div_amount", "timestamp")
+        .iterator(chunk_size=chunk_size)
+    )
+    for data_symbol, txn_type, quantity, unit_price, div_amount, timestamp in rows:
+        yield [
+            data_symbol,
+            txn_type,
+            str(quantity) if quantity is not None else "",
+            str(unit_price) if unit_price is not None else "",
+            str(div_amount) if div_amount is not None else "",
+            int(timestamp.astimezone(dt_timezone.utc).timestamp()),
+        ]
+
+
+class _LineBuffer:
+    """File-like target for csv.writer that keeps only the pending lines."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+    def drain(self):
+        text = "".join(self.lines)
+        self.lines = []
+        return text
+
+
+def iter_csv_export(user):
+    """The CSV export as text pieces, a few hundred rows at a time."""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+
+    for count, row in enumerate(export_rows(user), start=1):
+        writer.writerow(row)
+        if count % CSV_ROWS_PER_YIELD == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def write_xlsx_export(user):
+    """
+    Write the .xlsx export to an anonymous temporary file and return it,
+    rewound. openpyxl's write-only mode flushes rows as they are appended, so
+    memory does not grow with the ledger. The file is deleted once closed.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("transactions")
+    sheet.append(EXPORT_HEADERS)
+    for row in export_rows(user):
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
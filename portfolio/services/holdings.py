@@ -0,0 +1,95 @@
+# portfolio/services/holdings.py
+import numpy as np
+import pandas as pd
+
+
+class ChangePointHoldings:
+    """
+    Cumulative quantity per data_symbol, stored only on the days it changes.
+
+    Each symbol keeps two NumPy arrays: the sorted change-point days and the
+    cumulative quantity from that day on. "Holdings as of D" is a binary search
+    per symbol, so memory scales with the number of trades instead of
+    days x symbols.
+
+    BUY  -> +quantity
+    SELL -> -quantity
+    DIV  -> ignored for holdings
+    """
+
+    def __init__(self, change_points):
+        self._change_points = change_points
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """Build from the canonical ledger frame (see portfolio.services.ledger)."""
+        trades = ledger[ledger["txn_type"].isin(["BUY", "SELL"])]
+        if trades.empty:
+            return cls({})
+
+        daily = trades.groupby(["data_symbol", "day"], observed=True)["signed_qty"].sum()
+        cumulative = daily.groupby(level=0, observed=True).cumsum()
+
+        change_points = {}
+        for symbol, series in cumulative.groupby(level=0, observed=True):
+            days = series.index.get_level_values(1).to_numpy().astype("datetime64[D]")
+            change_points[symbol] = (days, series.to_numpy(dtype=float))
+        return cls(change_points)
+
+    @staticmethod
+    def _day(value):
+        return np.datetime64(pd.Timestamp(value).date(), "D")
+
+    @property
+    def symbols(self):
+        return sorted(self._change_points)
+
+    @property
+    def empty(self):
+        return not self._change_points
+
+    @property
+    def start(self):
+        """First day any position changed, or None without trades."""
+        if self.empty:
+            return None
+        return pd.Timestamp(min(days[0] for days, _ in self._change_points.values()))
+
+    def as_of(self, date):
+        """Series of quantities held at the end of ``date``, indexed by data_symbol."""
+        day = self._day(date)
+        quantities = {}
+        for symbol in self.symbols:
+            days, cumulative = self._change_points[symbol]
+            position = np.searchsorted(days, day, side="right") - 1
+            quantities[symbol] = float(cumulative[position]) if position >= 0 else 0.0
+        return pd.Series(quantities, dtype=float)
+
+    def first_held_since(self, date):
+        """
+        First day on or after ``date`` each symbol had a positive position,
+        indexed by data_symbol. Symbols never held in that window are omitted.
+        """
+        day = self._day(date)
+        first_days = {}
+        for symbol in self.symbols:
+            days, cumulative = self._change_points[symbol]
+            position = np.searchsorted(days, day, side="right") - 1
+            if position >= 0 and cumulative[position] > 0:
+                first_days[symbol] = pd.Timestamp(day)
+                continue
+
+            later = np.flatnonzero(cumulative[position + 1:] > 0)
+            if later.size:
+                first_days[symbol] = pd.Timestamp(days[position + 1 + later[0]])
+        return pd.Series(first_days, dtype="datetime64[ns]")
+
+    def dense(self, index):
+        """Daily (index x symbols) DataFrame, for callers that need full series."""
+        index_days = pd.DatetimeIndex(index).to_numpy().astype("datetime64[D]")
+        columns = {}
+        for symbol in self.symbols:
+            days, cumulative = self._change_points[symbol]
+            positions = np.searchsorted(days, index_days, side="right") - 1
+            columns[symbol] = np.where(positions >= 0, cumulative[positions.clip(min=0)], 0.0)
+        return pd.DataFrame(columns, index=index, dtype=float)
@@ -0,0 +1,135 @@
+# portfolio/services/import_jobs.py
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from portfolio.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# A RUNNING job whose progress has not moved for this long was most likely
+# abandoned by a dead worker and is queued again. Imports skip rows that are
+# already in the ledger, so running it again only adds the missing rows.
+STALE_JOB_SECONDS = 15 * 60
+
+PROGRESS_FIELDS = (
+    "rows_processed",
+    "created_transactions",
+    "created_assets",
+    "skipped_existing",
+    "skipped_duplicates",
+    "row_error_count",
+    "row_errors",
+)
+
+
+def enqueue_import(user, uploaded_file, extension):
+    """
+    Queue an upload as an ImportJob. The file is copied chunk by chunk to
+    IMPORT_UPLOAD_STORAGE (moved, when Django already spooled it to disk), so
+    it is never held in memory whole. With IMPORT_JOBS_INLINE (no worker
+    running, e.g. local dev and tests) the job is processed right away.
+    """
+    job = ImportJob(user=user, file_name=(uploaded_file.name or "")[:255], extension=extension)
+    job.upload.save(f"{uuid.uuid4().hex}{extension}", uploaded_file, save=False)
+    job.save()
+
+    if getattr(settings, "IMPORT_JOBS_INLINE", False) and claim_job(job.id):
+        run_import_job(job)
+        job.refresh_from_db()
+
+    return job
+
+
+def claim_job(job_id):
+    """Move a queued job to RUNNING. Returns False if another worker got it first."""
+    now = timezone.now()
+    claimed = (
+        ImportJob.objects
+        .filter(id=job_id, status=ImportJob.Status.QUEUED)
+        .update(status=ImportJob.Status.RUNNING, started_at=now, updated_at=now)
+    )
+    return claimed == 1
+
+
+def claim_next_job():
+    """The oldest queued job, claimed for this worker, or None."""
+    queued = (
+        ImportJob.objects
+        .filter(status=ImportJob.Status.QUEUED)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)
+    )
+    for job_id in queued[:10]:
+        if claim_job(job_id):
+            return ImportJob.objects.select_related("user").get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs():
+    now = timezone.now()
+    return (
+        ImportJob.objects
+        .filter(status=ImportJob.Status.RUNNING, updated_at__lt=now - timedelta(seconds=STALE_JOB_SECONDS))
+        .update(status=ImportJob.Status.QUEUED, updated_at=now)
+    )
+
+
+def _progress(summary):
+    return {field: summary[field] for field in PROGRESS_FIELDS}
+
+
+def _failure(error, progress):
+    """A FAILED job's error, noting the rows its committed chunks kept."""
+    created = progress.get("created_transactions", 0)
+    if created:
+        error += (
+            f" after importing {created} transactions. They were kept; uploading the file again"
+            " imports the rest."
+        )
+    return error
+
+
+def run_import_job(job):
+    """
+    Process a claimed job. Every chunk commits on its own and progress is saved
+    after each, so a job that fails partway keeps the rows of its committed
+    chunks; uploading the file again skips them and imports the rest.
+    """
+    from portfolio.services.imports import ImportFormatError, import_transactions
+
+    progress = {}
+
+    def save_progress(summary):
+        progress.update(_progress(summary))
+        ImportJob.objects.filter(id=job.id).update(updated_at=timezone.now(), **progress)
+
+    fields = {"status": ImportJob.Status.DONE}
+    try:
+        # streamed from storage; the readers only hold a chunk of rows at a time
+        with job.upload.open("rb") as upload:
+            summary = import_transactions(job.user, upload, job.extension, progress=save_progress)
+        fields.update(_progress(summary))
+    except ImportFormatError as error:
+        fields.update(status=ImportJob.Status.FAILED, error=_failure(str(error), progress))
+    except FileNotFoundError:
+        logger.error(
+            "Import job %s: %s is not in IMPORT_UPLOAD_STORAGE; the web and worker processes must share it",
+            job.id, job.upload.name,
+        )
+        fields.update(status=ImportJob.Status.FAILED, error="The uploaded file could not be found; please upload it again")
+    except ModuleNotFoundError as error:
+        fields.update(
+            status=ImportJob.Status.FAILED,
+            error=f"{job.extension} import is unavailable because {error.name} is not installed",
+        )
+    except Exception:
+        logger.exception("Import job %s failed", job.id)
+        fields.update(status=ImportJob.Status.FAILED, error=_failure("Import failed unexpectedly", progress))
+
+    job.upload.delete(save=False)
+    now = timezone.now()
+    ImportJob.objects.filter(id=job.id).update(upload="", finished_at=now, updated_at=now, **fields)
@@ -0,0 +1,451 @@
+# portfolio/services/imports.py
+import os
+import re
+from decimal import Decimal
+from itertools import islice
+
+import pandas as pd
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+
+from portfolio.models import Asset, Transaction, User, transaction_row_hash
+from portfolio.services.analytics_cache import invalidate_analytics_cache
+
+IMPORT_CHUNK_SIZE = 5000
+BULK_CREATE_BATCH_SIZE = 1000
+MAX_REPORTED_ROW_ERRORS = 500
+
+REQUIRED_COLUMNS = {"data_symbol", "txn_type", "timestamp"}
+IMPORT_COLUMNS = ["data_symbol", "txn_type", "timestamp", "quantity", "unit_price", "div_amount"]
+DECIMAL_COLUMNS = ["quantity", "unit_price", "div_amount"]
+
+# Largest unix timestamp a pandas datetime can hold (year 2262).
+_MAX_UNIX_SECONDS = int(pd.Timestamp.max.timestamp())
+_EPOCH = pd.Timestamp(0, tz="UTC")
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be imported at all, as opposed to individual bad rows."""
+
+
+def _normalize_header(value):
+    if value is None:
+        return ""
+    text = str(value).strip().lower()
+    text = re.sub(r"\s+", "_", text)  # all whitespace -> underscore
+    return text
+
+
+def _derive_ticker(data_symbol):
+    return data_symbol.split(".")[0].strip().upper()
+
+
+### Column-wise cleaning (vectorized versions of the per-cell rules)
+
+def _clean_text(column):
+    return column.astype("string").str.strip().fillna("")
+
+
+def _clean_decimal(column):
+    """
+    Takes Excel values like '€415.10' or '415,10' and returns strings like '415.10'.
+    Empty values become <NA>.
+    """
+    text = column.astype("string").str.strip()
+
+    # most cells are already plain numbers; only rewrite the others
+    dirty = text.str.contains(r"[€$£ ,]", regex=True).fillna(False)
+    if dirty.any():
+        text[dirty] = _strip_number_formatting(text[dirty])
+
+    return text.mask(text == "")
+
+
+def _strip_number_formatting(text):
+    text = text.str.replace(r"[€$£ ]", "", regex=True)
+
+    has_comma = text.str.contains(",", regex=False)
+    has_dot = text.str.contains(".", regex=False)
+
+    # comma decimal (EU) -> dot
+    text = text.mask(has_comma & ~has_dot, text.str.replace(",", ".", regex=False))
+    # thousand separators
+    text = text.mask(has_comma & has_dot, text.str.replace(",", "", regex=False))
+    return text
+
+
+def _parse_unix_timestamp(column):
+    """Unix seconds -> UTC datetimes; anything else (including floats) -> NaT."""
+    text = column.astype("string").str.strip()
+    is_digits = text.str.fullmatch(r"\d+").fillna(False)
+    seconds = pd.to_numeric(text.where(is_digits), errors="coerce")
+    seconds = seconds.where(seconds <= _MAX_UNIX_SECONDS)
+    return pd.to_datetime(seconds, unit="s", utc=True)
+
+
+def _invalid_decimals(text, field_name):
+    """
+    Mask of non-empty values the Transaction DecimalField would reject.
+    Plain decimals are checked with string lengths; anything else (exponents,
+    stray characters) falls back to the field's own clean().
+    """
+    field = Transaction._meta.get_field(field_name)
+    max_whole_digits = field.max_digits - field.decimal_places
+
+    parts = text.str.extract(r"^[+-]?(\d*)(?:\.(\d*))?$")
+    whole = parts[0].str.lstrip("0").str.len()
+    decimals = parts[1].fillna("").str.len()
+    is_plain = (parts[0].notna() & (parts[0].str.len() + decimals > 0)).fillna(False)
+
+    is_valid = (is_plain & (whole <= max_whole_digits) & (decimals <= field.decimal_places)).fillna(False)
+
+    other = text.notna() & ~is_plain
+    if other.any():
+        is_valid[other] = text[other].map(lambda value: _field_accepts(field, value)).astype(bool)
+
+    return text.notna() & ~is_valid
+
+
+def _field_accepts(field, value):
+    try:
+        field.clean(value, None)
+    except ValidationError:
+        return False
+    return True
+
+
+def _decimal_objects(text):
+    """Validated decimal strings -> object Series of Decimal / None."""
+    return pd.Series(
+        [None if pd.isna(value) else Decimal(value) for value in text.astype(object)],
+        index=text.index,
+        dtype=object,
+    )
+
+
+def _row_hashes(valid):
+    seconds = (valid["timestamp"] - _EPOCH) // pd.Timedelta(seconds=1)
+    return [
+        transaction_row_hash(*values)
+        for values in zip(
+            valid["data_symbol"],
+            valid["txn_type"],
+            seconds,
+            valid["quantity"],
+            valid["unit_price"],
+            valid["div_amount"],
+        )
+    ]
+
+
+def _normalize_chunk(frame):
+    """
+    Clean a chunk of raw import rows column-wise.
+    Returns a frame with data_symbol, txn_type, timestamp, quantity, unit_price
+    and div_amount, plus an ``error`` column (<NA> for valid rows).
+    """
+    frame = frame.reindex(columns=IMPORT_COLUMNS)
+    clean = pd.DataFrame({
+        "row": frame.index,
+        "data_symbol": _clean_text(frame["data_symbol"]),
+        "txn_type": _clean_text(frame["txn_type"]).str.upper(),
+        "timestamp": _parse_unix_timestamp(frame["timestamp"]),
+    }, index=frame.index)
+    for name in DECIMAL_COLUMNS:
+        clean[name] = _clean_decimal(frame[name])
+
+    error = pd.Series(pd.NA, index=frame.index, dtype="string")
+
+    def flag(mask, message):
+        nonlocal error
+        error = error.mask(error.isna() & mask.fillna(False), message)
+
+    is_div = clean["txn_type"] == Transaction.TransactionType.DIVIDEND
+    is_trade = clean["txn_type"].isin([Transaction.TransactionType.BUY, Transaction.TransactionType.SELL])
+    present = {name: clean[name].notna() for name in DECIMAL_COLUMNS}
+    symbol_max_length = Asset._meta.get_field("data_symbol").max_length
+
+    flag((clean["data_symbol"] == "") | (clean["txn_type"] == ""), "data_symbol and txn_type are required")
+    flag(clean["timestamp"].isna(), "timestamp must be unix seconds (e.g. 1610323200)")
+    flag(~is_div & ~is_trade, "txn_type must be one of BUY, SELL, DIV")
+    flag(clean["data_symbol"].str.len() > symbol_max_length, f"data_symbol must be at most {symbol_max_length} characters")
+    for name in DECIMAL_COLUMNS:
+        flag(_invalid_decimals(clean[name], name), f"{name} must be a decimal number")
+
+    # Same rules as Transaction.clean()
+    flag(is_div & ~present["div_amount"], "div_amount: Dividend transactions require a dividend amount.")
+    flag(is_div & (present["quantity"] | present["unit_price"]), "Dividend transactions cannot include quantity or unit price.")
+    flag(is_trade & ~present["quantity"], "quantity: Buy/Sell transactions require quantity.")
+    flag(is_trade & ~present["unit_price"], "unit_price: Buy/Sell transactions require unit price.")
+    flag(is_trade & present["div_amount"], "div_amount: Buy/Sell transactions cannot include a dividend amount.")
+
+    clean["error"] = error
+    return clean
+
+
+### Readers
+# Each reader yields DataFrames of raw values under the file's own column
+# names. An empty file still yields one (empty) frame so the header can be
+# checked.
+
+def _xlsx_frames(uploaded_file, chunk_size):
+    """Stream the active sheet of an .xlsx file in read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ImportFormatError("The uploaded file is empty")
+
+        width = len(header_row)
+        while True:
+            chunk = [row[:width] + (None,) * (width - len(row)) for row in islice(rows, chunk_size)]
+            frame = pd.DataFrame(chunk, columns=range(width), dtype=object)
+            frame.columns = list(header_row)
+            yield frame
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        workbook.close()
+
+
+def _csv_frames(uploaded_file, chunk_size):
+    """Parse a CSV file in chunks. Every value is kept as text."""
+    try:
+        reader = pd.read_csv(
+            uploaded_file,
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8-sig",
+            chunksize=chunk_size,
+        )
+    except pd.errors.EmptyDataError:
+        raise ImportFormatError("The uploaded file is empty")
+    except (pd.errors.ParserError, UnicodeDecodeError) as error:
+        raise ImportFormatError(f"Could not parse the CSV file: {error}")
+
+    with reader:
+        try:
+            yield from reader
+        except (pd.errors.ParserError, UnicodeDecodeError) as error:
+            raise ImportFormatError(f"Could not parse the CSV file: {error}")
+
+
+def _parquet_frames(uploaded_file, chunk_size):
+    """Read the import columns of a Parquet file in record batches."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        parquet_file = pq.ParquetFile(uploaded_file)
+    except pa.ArrowException as error:
+        raise ImportFormatError(f"Could not read the Parquet file: {error}")
+
+    names = parquet_file.schema_arrow.names
+    columns = [name for name in names if _normalize_header(name) in IMPORT_COLUMNS]
+
+    yielded = False
+    for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+        yielded = True
+        # keep integer columns with nulls as Python ints, not floats
+        yield batch.to_pandas(integer_object_nulls=True)
+    if not yielded:
+        yield pd.DataFrame(columns=names)
+
+
+IMPORT_READERS = {
+    ".xlsx": _xlsx_frames,
+    ".csv": _csv_frames,
+    ".parquet": _parquet_frames,
+}
+SUPPORTED_IMPORT_EXTENSIONS = tuple(IMPORT_READERS)
+
+
+def import_extension(filename):
+    """The import format of a file name (e.g. ".csv"), or None if unsupported."""
+    extension = os.path.splitext((filename or "").lower())[1]
+    return extension if extension in IMPORT_READERS else None
+
+
+def _check_required_columns(headers):
+    missing = REQUIRED_COLUMNS - {h for h in headers if h}
+    if missing:
+        raise ImportFormatError(f"Missing required columns: {sorted(list(missing))}")
+
+
+def import_chunks(uploaded_file, extension, chunk_size=None):
+    """
+    Raw import chunks of any supported format, with normalized headers and
+    indexed by file row number (the header is row 1).
+    """
+    frames = IMPORT_READERS[extension](uploaded_file, chunk_size or IMPORT_CHUNK_SIZE)
+
+    next_row_number = 2
+    for position, frame in enumerate(frames):
+        frame.columns = [_normalize_header(column) for column in frame.columns]
+        if position == 0:
+            _check_required_columns(frame.columns)
+        # like a dict built from the row, the last duplicate header wins
+        frame = frame.loc[:, ~frame.columns.duplicated(keep="last")]
+        frame.index = pd.RangeIndex(next_row_number, next_row_number + len(frame))
+        next_row_number += len(frame)
+        if len(frame):
+            yield frame
+
+
+### Writers
+
+def _ensure_assets(user, data_symbols, known_assets, taken_tickers):
+    """
+    Bulk-create assets for symbols that are not known yet.
+    Updates known_assets ({data_symbol: asset_id}) in place and returns the
+    number of created assets plus the symbols that could not be created.
+    """
+    new_assets = []
+    failed = set()
+    for data_symbol in sorted(set(data_symbols) - set(known_assets)):
+        ticker = next(
+            (
+                candidate for candidate in (_derive_ticker(data_symbol), data_symbol.upper()[:20])
+                if candidate and candidate not in taken_tickers
+            ),
+            None,
+        )
+        if ticker is None:
+            failed.add(data_symbol)
+            continue
+
+        taken_tickers.add(ticker)
+        new_assets.append(Asset(
+            user=user,
+            data_symbol=data_symbol,
+            ticker=ticker,
+            name="",
+            exchange="",
+            currency="EUR",
+            asset_type=Asset.AssetType.STOCK,
+        ))
+
+    if new_assets:
+        Asset.objects.bulk_create(new_assets)
+        known_assets.update(
+            Asset.objects
+            .filter(user=user, data_symbol__in=[asset.data_symbol for asset in new_assets])
+            .values_list("data_symbol", "id")
+        )
+
+    return len(new_assets), failed
+
+
+def import_transactions(user, uploaded_file, extension=None, chunk_size=None, progress=None):
+    """
+    Import a transaction file (.xlsx, .csv or .parquet) for ``user``.
+
+    The file is streamed in chunks; every chunk is validated column-wise and
+    written with bulk_create in its own database transaction. The import is
+    therefore not all-or-nothing: when a chunk fails, the chunks before it stay
+    committed. Rows whose content hash is already in the user's ledger are
+    skipped, so re-uploading the file resumes after them (as does re-uploading
+    an overlapping export).
+
+    ``progress`` is called with the running summary after every committed
+    chunk. The analytics cache is invalidated once at the end.
+    Raises ImportFormatError when the file itself is unusable.
+    """
+    extension = extension or import_extension(uploaded_file.name)
+    if extension is None:
+        raise ImportFormatError(f"Supported file types: {', '.join(SUPPORTED_IMPORT_EXTENSIONS)}")
+
+    known_assets = {}
+    taken_tickers = set()
+    for data_symbol, asset_id, ticker, exchange in (
+        Asset.objects.filter(user=user).values_list("data_symbol", "id", "ticker", "exchange")
+    ):
+        known_assets[data_symbol] = asset_id
+        if not exchange:
+            taken_tickers.add(ticker)
+
+    summary = {
+        "rows_processed": 0,
+        "created_transactions": 0,
+        "created_assets": 0,
+        "skipped_existing": 0,
+        "skipped_duplicates": 0,
+        "row_errors": [],
+        "row_error_count": 0,
+    }
+
+    try:
+        for chunk in import_chunks(uploaded_file, extension, chunk_size):
+            with db_transaction.atomic():
+                _import_chunk(user, chunk, known_assets, taken_tickers, summary)
+            if progress is not None:
+                progress(summary)
+    finally:
+        if summary["created_transactions"] or summary["created_assets"]:
+            invalidate_analytics_cache(user)
+
+    return summary
+
+
+def _import_chunk(user, chunk, known_assets, taken_tickers, summary):
+    """Validate and write one chunk, adding its counts to ``summary``."""
+    clean = _normalize_chunk(chunk)
+
+    valid = clean[clean["error"].isna()]
+    created_assets, failed_symbols = _ensure_assets(
+        user, valid["data_symbol"].unique(), known_assets, taken_tickers,
+    )
+    if failed_symbols:
+        failed = valid["data_symbol"].isin(failed_symbols)
+        clean.loc[failed[failed].index, "error"] = "could not create an asset for this data_symbol"
+        valid = valid[~failed]
+
+    valid = valid.assign(**{name: _decimal_objects(valid[name]) for name in DECIMAL_COLUMNS})
+    valid = valid.assign(row_hash=_row_hashes(valid))
+
+    # One lookup per chunk: rows already in the ledger (from an earlier
+    # upload or an earlier chunk) and repeats within the chunk are skipped.
+    # row_hash is not unique, so concurrent imports for the user are serialized
+    # on their row (a no-op on SQLite, which serializes writes anyway).
+    list(User.objects.select_for_update().filter(id=user.id).values_list("id", flat=True))
+    existing = set(
+        Transaction.objects
+        .filter(user=user, row_hash__in=set(valid["row_hash"]))
+        .values_list("row_hash", flat=True)
+    )
+    is_existing = valid["row_hash"].isin(existing)
+    is_repeat = valid["row_hash"].duplicated() & ~is_existing
+    valid = valid[~(is_existing | is_repeat)]
+
+    transactions = [
+        Transaction(
+            user=user,
+            asset_id=known_assets[row.data_symbol],
+            txn_type=row.txn_type,
+            quantity=row.quantity,
+            unit_price=row.unit_price,
+            div_amount=row.div_amount,
+            timestamp=row.timestamp.to_pydatetime(),
+            row_hash=row.row_hash,
+        )
+        for row in valid.itertuples(index=False)
+    ]
+    Transaction.objects.bulk_create(transactions, batch_size=BULK_CREATE_BATCH_SIZE)
+
+    errors = clean.loc[clean["error"].notna(), ["row", "error"]]
+    remaining = MAX_REPORTED_ROW_ERRORS - len(summary["row_errors"])
+    if remaining > 0:
+        summary["row_errors"].extend(
+            {"row": int(row), "error": str(error)}
+            for row, error in errors.head(remaining).itertuples(index=False)
+        )
+
+    summary["rows_processed"] += len(clean)
+    summary["created_transactions"] += len(transactions)
+    summary["created_assets"] += created_assets
+    summary["skipped_existing"] += int(is_existing.sum())
+    summary["skipped_duplicates"] += int(is_repeat.sum())
+    summary["row_error_count"] += len(errors)
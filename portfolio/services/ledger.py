@@ -0,0 +1,178 @@
+# portfolio/services/ledger.py
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum, Window
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from portfolio.models import Transaction
+
+TXN_TYPE_DTYPE = pd.CategoricalDtype(["BUY", "SELL", "DIV"])
+
+LEDGER_FIELDS = ("timestamp", "asset__data_symbol", "txn_type", "quantity", "unit_price", "div_amount")
+
+LEDGER_COLUMNS = [
+    "timestamp",
+    "date",
+    "day",
+    "data_symbol",
+    "txn_type",
+    "quantity",
+    "unit_price",
+    "div_amount",
+    "signed_qty",
+    "cashflow",
+]
+
+
+def build_ledger(rows):
+    """
+    Build the canonical ledger frame from (timestamp, data_symbol, txn_type,
+    quantity, unit_price, div_amount) tuples, oldest first.
+
+    Columns:
+      timestamp   datetime64 (UTC)
+      date        datetime64, the UTC calendar day of the transaction
+      day         int32 days since 1970-01-01, for integer day arithmetic
+      data_symbol category
+      txn_type    category (BUY, SELL, DIV)
+      quantity, unit_price, div_amount  float64
+      signed_qty  float64: +quantity for BUY, -quantity for SELL, 0 for DIV
+      cashflow    float64 net invested delta:
+                    BUY: cash outflow  -> invested increases (+)
+                    SELL: cash inflow  -> invested decreases (-)
+                    DIV: cash inflow   -> invested decreases (-)
+    """
+    raw = pd.DataFrame.from_records(
+        list(rows),
+        columns=["timestamp", "data_symbol", "txn_type", "quantity", "unit_price", "div_amount"],
+    )
+
+    timestamp = pd.to_datetime(raw["timestamp"], utc=True)
+    date = timestamp.dt.tz_localize(None).dt.normalize().astype("datetime64[ns]")
+    quantity = raw["quantity"].astype("float64")
+    unit_price = raw["unit_price"].astype("float64")
+    div_amount = raw["div_amount"].astype("float64")
+    txn_type = raw["txn_type"].astype(TXN_TYPE_DTYPE)
+
+    is_buy = (txn_type == "BUY").to_numpy()
+    is_sell = (txn_type == "SELL").to_numpy()
+    is_div = (txn_type == "DIV").to_numpy()
+    trade_value = (quantity * unit_price).to_numpy()
+
+    ledger = pd.DataFrame({
+        "timestamp": timestamp,
+        "date": date,
+        "day": date.to_numpy().astype("datetime64[D]").astype(np.int32),
+        "data_symbol": raw["data_symbol"].astype("category"),
+        "txn_type": txn_type,
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "div_amount": div_amount,
+        "signed_qty": np.select([is_buy, is_sell], [quantity, -quantity], default=0.0),
+        "cashflow": np.select(
+            [is_buy, is_sell, is_div],
+            [trade_value, -trade_value, -div_amount.to_numpy()],
+            default=0.0,
+        ),
+    }, columns=LEDGER_COLUMNS)
+    return ledger
+
+
+def load_ledger(user):
+    """Load a user's transactions as the canonical ledger frame, without model instances."""
+    rows = (
+        Transaction.objects
+        .filter(user=user)
+        .order_by("timestamp", "id")
+        .values_list(*LEDGER_FIELDS)
+    )
+    return build_ledger(rows)
+
+
+def day_number(value):
+    """int32 day index (days since 1970-01-01) of a date-like value."""
+    return np.int32(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def day_to_timestamp(day):
+    """Inverse of day_number()."""
+    return pd.Timestamp(np.datetime64(int(day), "D"))
+
+
+# ---- Aggregations computed in the database
+# These are served by the (user, asset, txn_type, timestamp) index and never
+# load individual transactions into Python.
+
+_TRADE_VALUE = ExpressionWrapper(
+    F("quantity") * F("unit_price"),
+    output_field=DecimalField(max_digits=40, decimal_places=16),
+)
+
+
+def _as_float(value):
+    return float(value) if value is not None else 0.0
+
+
+def ledger_totals_by_symbol(user, data_symbols=None, ttm_since=None):
+    """
+    Per-symbol ledger totals:
+    {data_symbol: {"total_bought", "total_sold", "total_dividends", "dividends_ttm"}}
+
+    ``dividends_ttm`` sums dividends paid on or after the ``ttm_since`` date
+    (defaults to 365 days ago).
+    """
+    if ttm_since is None:
+        ttm_since = (timezone.now() - timedelta(days=365)).date()
+    ttm_start = datetime.combine(ttm_since, time.min, tzinfo=dt_timezone.utc)
+
+    transactions = Transaction.objects.filter(user=user)
+    if data_symbols is not None:
+        transactions = transactions.filter(asset__data_symbol__in=list(data_symbols))
+
+    is_div = Q(txn_type=Transaction.TransactionType.DIVIDEND)
+    rows = (
+        transactions
+        .values("asset__data_symbol")
+        .annotate(
+            total_bought=Sum(_TRADE_VALUE, filter=Q(txn_type=Transaction.TransactionType.BUY)),
+            total_sold=Sum(_TRADE_VALUE, filter=Q(txn_type=Transaction.TransactionType.SELL)),
+            total_dividends=Sum("div_amount", filter=is_div),
+            dividends_ttm=Sum("div_amount", filter=is_div & Q(timestamp__gte=ttm_start)),
+        )
+        .order_by()
+    )
+
+    return {
+        row["asset__data_symbol"]: {
+            "total_bought": _as_float(row["total_bought"]),
+            "total_sold": _as_float(row["total_sold"]),
+            "total_dividends": _as_float(row["total_dividends"]),
+            "dividends_ttm": _as_float(row["dividends_ttm"]),
+        }
+        for row in rows
+    }
+
+
+def monthly_dividends(user):
+    """
+    Dividend totals per calendar month, oldest first, with a running total:
+    [(month_start, total, cumulative), ...]
+    Months without dividends are not included.
+    """
+    month = TruncMonth("timestamp")
+    rows = (
+        Transaction.objects
+        .filter(user=user, txn_type=Transaction.TransactionType.DIVIDEND)
+        .annotate(month=month)
+        .annotate(
+            total=Window(Sum("div_amount"), partition_by=[F("month")]),
+            cumulative=Window(Sum("div_amount"), order_by=F("month").asc()),
+        )
+        .values_list("month", "total", "cumulative")
+        .distinct()
+        .order_by("month")
+    )
+    return [(month_start, _as_float(total), _as_float(cumulative)) for month_start, total, cumulative in rows]
@@ -0,0 +1,229 @@
+# portfolio/services/metrics.py
+"""
+Operational metrics: analytics cache hits, price fetches and downloads,
+payload compute times.
+
+Every process counts in memory and adds its counts to a shared SQLite file
+(settings.METRICS_DB_PATH) at most every METRICS_FLUSH_SECONDS, so
+`GET /metrics` reports the sum over all gunicorn workers. All series are
+counters or histograms, so adding per-process deltas is enough to aggregate
+them. With METRICS_DB_PATH empty the counts stay in the process.
+
+Metrics never fail the code they measure: store errors are logged and the
+pending counts kept for the next flush.
+"""
+import atexit
+import logging
+import math
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COMPUTE_SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "marketvault_analytics_cache_requests_total": (
+        "counter", "Analytics cache lookups by endpoint and result (hit or miss).", None,
+    ),
+    "marketvault_price_fetch_triggers_total": (
+        "counter", "Symbols get_close_prices_cached() decided to download, by reason.", None,
+    ),
+    "marketvault_price_download_seconds": (
+        "histogram", "Duration of one price download attempt per symbol.", DOWNLOAD_SECONDS_BUCKETS,
+    ),
+    "marketvault_price_download_failures_total": (
+        "counter", "Price downloads that returned nothing after every retry, per symbol.", None,
+    ),
+    "marketvault_price_download_retries_total": (
+        "counter", "Price download attempts retried after an error or an empty result, per symbol.", None,
+    ),
+    "marketvault_pricepoints_written_total": (
+        "counter", "PricePoint rows written by price downloads.", None,
+    ),
+    "marketvault_payload_compute_seconds": (
+        "histogram", "Time to build an analytics payload, by payload.", COMPUTE_SECONDS_BUCKETS,
+    ),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric_samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+"""
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _label_string(labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _add(name, labels, amount):
+    global _last_flush
+    key = (name, _label_string(labels))
+    with _pending_lock:
+        _pending[key] = _pending.get(key, 0.0) + amount
+        due = time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_SECONDS", 5)
+    if due:
+        flush()
+
+
+def inc(name, amount=1, **labels):
+    """Add amount to the counter `name` with the given labels."""
+    _add(name, labels, amount)
+
+
+def observe(name, value, **labels):
+    """Record value in the histogram `name` (cumulative buckets, _sum and _count)."""
+    for bound in METRICS[name][2]:
+        # empty buckets are stored too: a histogram lists all of them
+        _add(f"{name}_bucket", {**labels, "le": str(bound)}, 1 if value <= bound else 0)
+    _add(f"{name}_bucket", {**labels, "le": "+Inf"}, 1)
+    _add(f"{name}_sum", labels, value)
+    _add(f"{name}_count", labels, 1)
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(_SCHEMA)
+    return connection
+
+
+def flush():
+    """Add this process's pending counts to the shared store."""
+    global _last_flush
+    path = getattr(settings, "METRICS_DB_PATH", "")
+    with _pending_lock:
+        _last_flush = time.monotonic()
+        if not path or not _pending:
+            return
+        batch = dict(_pending)
+        _pending.clear()
+
+    try:
+        connection = _connect(path)
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO metric_samples (name, labels, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                    [(name, labels, value) for (name, labels), value in batch.items()],
+                )
+        finally:
+            connection.close()
+    except sqlite3.Error as exc:
+        logger.warning("Could not write metrics to %s: %s", path, exc)
+        with _pending_lock:
+            for key, value in batch.items():
+                _pending[key] = _pending.get(key, 0.0) + value
+
+
+atexit.register(flush)
+
+
+def samples():
+    """{(name, labels): value} for every process that shares the store, this one included."""
+    flush()
+    path = getattr(settings, "METRICS_DB_PATH", "")
+    if not path:
+        with _pending_lock:
+            return dict(_pending)
+
+    connection = _connect(path)
+    try:
+        return {(name, labels): value for name, labels, value in connection.execute(
+            "SELECT name, labels, value FROM metric_samples"
+        )}
+    finally:
+        connection.close()
+
+
+def reset():
+    """Forget every count, pending and stored."""
+    with _pending_lock:
+        _pending.clear()
+    path = getattr(settings, "METRICS_DB_PATH", "")
+    if path:
+        connection = _connect(path)
+        try:
+            with connection:
+                connection.execute("DELETE FROM metric_samples")
+        finally:
+            connection.close()
+
+
+def _family(sample_name):
+    if sample_name in METRICS:
+        return sample_name
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in METRICS:
+            return sample_name[:-len(suffix)]
+    return None
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _bucket_order(labels):
+    # histogram buckets sorted by their bound, +Inf last
+    for part in labels.split(","):
+        if part.startswith('le="'):
+            bound = part[4:-1]
+            return (labels.replace(part, ""), math.inf if bound == "+Inf" else float(bound))
+    return (labels, 0.0)
+
+
+def render_prometheus():
+    """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+    by_family = {}
+    for (name, labels), value in samples().items():
+        family = _family(name)
+        if family is not None:
+            by_family.setdefault(family, []).append((name, labels, value))
+
+    lines = []
+    for family, (metric_type, help_text, _buckets) in METRICS.items():
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        rows = sorted(by_family.get(family, []), key=lambda row: (row[0], _bucket_order(row[1])))
+        for name, labels, value in rows:
+            lines.append(f"{name}{{{labels}}} {_format_value(value)}" if labels else f"{name} {_format_value(value)}")
+
+    lines.extend(_cache_hit_ratio_lines(by_family.get("marketvault_analytics_cache_requests_total", [])))
+    return "\n".join(lines) + "\n"
+
+
+def _cache_hit_ratio_lines(rows):
+    totals = {}
+    for _name, labels, value in rows:
+        parts = dict(part.split("=", 1) for part in labels.split(","))
+        hits, lookups = totals.get(parts["endpoint"], (0.0, 0.0))
+        totals[parts["endpoint"]] = (hits + (value if parts["result"] == '"hit"' else 0.0), lookups + value)
+
+    lines = [
+        "# HELP marketvault_analytics_cache_hit_ratio Share of analytics cache lookups that hit, by endpoint.",
+        "# TYPE marketvault_analytics_cache_hit_ratio gauge",
+    ]
+    for endpoint, (hits, lookups) in sorted(totals.items()):
+        if lookups:
+            lines.append(f"marketvault_analytics_cache_hit_ratio{{endpoint={endpoint}}} {_format_value(hits / lookups)}")
+    return lines
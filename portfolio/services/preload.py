@@ -0,0 +1,34 @@
+# portfolio/services/preload.py
+"""
+The analytics stack (pandas, NumPy, yfinance) is imported on first use, so a
+worker that never builds a chart never pays for it. Under gunicorn --preload
+(GUNICORN_PRELOAD, see gunicorn.conf.py) the opposite trade is better: with
+PRELOAD_HEAVY_MODULES on, marketvault/wsgi.py imports the stack once in the
+master, and the forked workers share those pages instead of importing it
+again each.
+"""
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+HEAVY_MODULES = (
+    "numpy",
+    "pandas",
+    "portfolio.services.analytics",
+    "portfolio.services.prices_yahoo",
+)
+
+
+def preload_heavy_modules(modules=HEAVY_MODULES):
+    """Import `modules`, skipping missing optional dependencies; returns the seconds spent."""
+    started = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ModuleNotFoundError as exc:
+            logger.info("Not preloading %s: %s", name, exc)
+    seconds = time.perf_counter() - started
+    logger.info("Preloaded %s in %.2f s", ", ".join(modules), seconds)
+    return seconds
@@ -0,0 +1,140 @@
+# portfolio/services/price_explain.py
+"""
+Why get_close_prices_cached() would (or would not) download a symbol, computed
+from the cache alone: nothing is fetched and nothing is written.
+
+Used by `manage.py explain_prices` and the staff-only `GET /debug/prices`.
+"""
+from datetime import timedelta
+
+import pandas as pd
+from django.utils import timezone
+
+from portfolio.models import Asset, PricePoint, Transaction
+from portfolio.services import metrics
+from portfolio.services.price_providers import get_price_provider
+from portfolio.services.prices_cache import (
+    DOWNLOAD_ATTEMPTS,
+    PRICE_REFRESH_AFTER_DAYS,
+    _fetch_reason,
+    _fetches_in_flight,
+    _first_suspicious_jump,
+    _series_from_cached_dates,
+    _series_matches_other_symbol,
+)
+
+
+def default_window(user):
+    """The window a cold dashboard load asks for: the first trade up to and including today."""
+    first_trade = (
+        Transaction.objects
+        .filter(user=user, txn_type__in=["BUY", "SELL"])
+        .order_by("timestamp")
+        .values_list("timestamp", flat=True)
+        .first()
+    )
+    today = timezone.now().date()
+    return (first_trade.date() if first_trade else today), today + timedelta(days=1)
+
+
+def _expected_rows(asset, start, end):
+    """Closes a complete download would hold: every day for crypto, weekdays otherwise."""
+    if end <= start:
+        return 0
+    if asset.asset_type == Asset.AssetType.CRYPTO:
+        return (end - start).days
+    return len(pd.bdate_range(start, end - timedelta(days=1)))
+
+
+def _download_history(samples, data_symbol):
+    label = f'symbol="{data_symbol}"'
+    attempts = samples.get(("marketvault_price_download_seconds_count", label), 0)
+    seconds = samples.get(("marketvault_price_download_seconds_sum", label), 0.0)
+    return {
+        "attempts": int(attempts),
+        "average_attempt_seconds": round(seconds / attempts, 3) if attempts else None,
+        "failures": int(samples.get(("marketvault_price_download_failures_total", label), 0)),
+    }
+
+
+def explain_price_decisions(user, data_symbols=None, start_date=None, end_date=None, force_refresh_symbols=None):
+    """
+    One report per symbol of `user` (all of them by default) for the window
+    [start_date, end_date), which defaults to default_window(user):
+
+    - decision: "fetch" or "cached", and the reason get_close_prices_cached() would give
+    - the cached coverage of the window and its latest date
+    - the anomaly checks: a suspicious jump in the cached closes, or cached
+      closes identical to another symbol's (such a download would be discarded)
+    - the symbols the provider would try, in order, and whether a download
+      is already running
+    - the estimated download cost, from the metrics recorded for the symbol
+    """
+    default_start, default_end = default_window(user)
+    start = pd.to_datetime(start_date).date() if start_date else default_start
+    end = pd.to_datetime(end_date).date() if end_date else default_end
+    force_refresh_symbols = set(force_refresh_symbols or [])
+    refresh_if_older_than = end - timedelta(days=PRICE_REFRESH_AFTER_DAYS)
+
+    user_assets = list(Asset.objects.filter(user=user).order_by("data_symbol"))
+    assets = [asset for asset in user_assets if data_symbols is None or asset.data_symbol in data_symbols]
+
+    cached = {asset.id: {} for asset in user_assets}
+    for asset_id, date, close in (
+        PricePoint.objects
+        .filter(asset__in=user_assets, date__gte=start, date__lt=end)
+        .values_list("asset_id", "date", "close")
+    ):
+        cached[asset_id][date] = float(close)
+    cached_series = {asset.data_symbol: _series_from_cached_dates(cached[asset.id]) for asset in user_assets}
+
+    provider = get_price_provider()
+    samples = metrics.samples()
+    reports = []
+    for asset in assets:
+        dates_to_close = cached[asset.id]
+        reason = _fetch_reason(asset.data_symbol, dates_to_close, force_refresh_symbols, refresh_if_older_than)
+        expected_rows = _expected_rows(asset, start, end)
+        jump = _first_suspicious_jump(dates_to_close)
+        duplicate_of = next(
+            (
+                other for other, series in cached_series.items()
+                if other != asset.data_symbol and _series_matches_other_symbol(cached_series[asset.data_symbol], series)
+            ),
+            None,
+        )
+        candidates = provider.symbol_candidates(asset.data_symbol)
+        history = _download_history(samples, asset.data_symbol)
+
+        reports.append({
+            "data_symbol": asset.data_symbol,
+            "asset_id": asset.id,
+            "decision": "cached" if reason is None else "fetch",
+            "reason": reason,
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "cache": {
+                "rows": len(dates_to_close),
+                "expected_rows": expected_rows,
+                "coverage": round(min(1.0, len(dates_to_close) / expected_rows), 3) if expected_rows else None,
+                "first_date": min(dates_to_close).isoformat() if dates_to_close else None,
+                "latest_date": max(dates_to_close).isoformat() if dates_to_close else None,
+                "refresh_if_older_than": refresh_if_older_than.isoformat(),
+            },
+            "anomalies": {
+                "suspicious_jump": None if jump is None else {
+                    "date": jump[0].isoformat(), "previous_close": jump[1], "close": jump[2],
+                },
+                "duplicate_of": duplicate_of,
+            },
+            "provider": provider.name,
+            "symbol_candidates": candidates,
+            "fallback_symbols": candidates[1:],
+            "download_in_flight": asset.id in _fetches_in_flight,
+            "estimated_download": None if reason is None else {
+                "rows": expected_rows,
+                "max_requests": len(candidates) * DOWNLOAD_ATTEMPTS,
+                "seconds": history["average_attempt_seconds"],
+            },
+            "download_history": history,
+        })
+    return reports
@@ -0,0 +1,183 @@
+# portfolio/services/price_providers.py
+"""
+Where historical close prices come from.
+
+prices_cache asks the provider configured in settings.PRICE_PROVIDER for the
+closes it does not have yet. "yahoo" downloads them from Yahoo Finance; "local"
+serves <data_symbol>.parquet / <data_symbol>.csv files from a directory, so
+tests, benchmarks and air-gapped deployments run the same refresh path without
+network access, optionally with injected latency and failures.
+"""
+import random
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol, runtime_checkable
+
+import pandas as pd
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+PROVIDER_ALIASES = {
+    "yahoo": "portfolio.services.price_providers.YahooPriceProvider",
+    "local": "portfolio.services.price_providers.LocalFilePriceProvider",
+}
+
+
+class PriceProviderError(Exception):
+    """A download failed as a whole (network error, rate limit). Callers may retry."""
+
+
+@runtime_checkable
+class PriceProvider(Protocol):
+    name: str
+
+    def download_close_prices(self, data_symbols, start_date, end_date):
+        """
+        Closes for data_symbols in [start_date, end_date) as a DataFrame with a
+        daily DatetimeIndex and one float column per symbol that has data.
+        Symbols the provider does not know are left out; a failure of the
+        whole batch raises PriceProviderError.
+        """
+
+    def symbol_candidates(self, data_symbol):
+        """data_symbol followed by the listings to try when it has no data."""
+
+
+class YahooPriceProvider:
+    """
+    Closes from Yahoo Finance through yfinance. yfinance reports most failures
+    of a single symbol as missing data, so those look like unknown symbols;
+    the errors it does raise become PriceProviderError.
+    """
+
+    name = "yahoo"
+
+    def download_close_prices(self, data_symbols, start_date, end_date):
+        from portfolio.services import prices_yahoo
+
+        try:
+            return prices_yahoo.download_close_prices(data_symbols, start_date, end_date)
+        except Exception as error:
+            raise PriceProviderError(f"Yahoo Finance download failed: {error}") from error
+
+    def symbol_candidates(self, data_symbol):
+        from portfolio.services import prices_yahoo
+
+        return prices_yahoo._symbol_candidates(data_symbol)
+
+
+class LocalFilePriceProvider:
+    """
+    Closes from files in `directory`: one <data_symbol>.parquet or
+    <data_symbol>.csv per symbol with a date column and a close column (any
+    capitalization). `fallbacks` maps a symbol to the symbols to serve in its
+    place.
+
+    `latency` seconds are slept per download call and `failure_rate` is the
+    probability that a call raises PriceProviderError, to exercise refresh
+    throughput and retries the way a remote provider would.
+    """
+
+    name = "local"
+
+    def __init__(self, directory, latency=0.0, failure_rate=0.0, fallbacks=None, seed=None):
+        if not 0 <= failure_rate <= 1:
+            raise ValueError("failure_rate must be between 0 and 1")
+        self.directory = Path(directory)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fallbacks = {str(symbol).upper(): list(candidates) for symbol, candidates in (fallbacks or {}).items()}
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _path(self, data_symbol):
+        for extension in (".parquet", ".csv"):
+            path = self.directory / f"{data_symbol}{extension}"
+            if path.is_file():
+                return path
+        return None
+
+    def _series(self, data_symbol):
+        path = self._path(data_symbol)
+        if path is None:
+            return None
+        return _read_series(str(path), path.stat().st_mtime_ns)
+
+    def symbol_candidates(self, data_symbol):
+        candidates = [data_symbol, *self.fallbacks.get(str(data_symbol).upper(), [])]
+        return list(dict.fromkeys(candidate.strip() for candidate in candidates if candidate.strip()))
+
+    def download_close_prices(self, data_symbols, start_date, end_date):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate:
+            with self._random_lock:
+                failed = self._random.random() < self.failure_rate
+            if failed:
+                raise PriceProviderError(f"Injected failure for {', '.join(data_symbols)}")
+
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        columns = {}
+        for symbol in data_symbols:
+            for candidate in self.symbol_candidates(symbol):
+                series = self._series(candidate)
+                if series is None:
+                    continue
+                series = series[(series.index >= start) & (series.index < end)]
+                if not series.empty:
+                    columns[symbol] = series
+                    break
+
+        if not columns:
+            return pd.DataFrame()
+        return pd.DataFrame(columns).sort_index().ffill()
+
+
+# Fixture files are re-read only when they change on disk.
+@lru_cache(maxsize=1024)
+def _read_series(path, _mtime_ns):
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+    frame.columns = [str(column).strip().lower() for column in frame.columns]
+    if "date" not in frame.columns or "close" not in frame.columns:
+        raise PriceProviderError(f"{path} needs a date and a close column")
+
+    series = pd.Series(
+        pd.to_numeric(frame["close"], errors="coerce").to_numpy(dtype=float),
+        index=pd.to_datetime(frame["date"]).dt.tz_localize(None).dt.normalize(),
+    )
+    return series.dropna().sort_index()
+
+
+def build_price_provider(config):
+    """A provider from a {"BACKEND": ..., "OPTIONS": {...}} dict; BACKEND is an alias or a dotted path."""
+    backend = config.get("BACKEND", "yahoo")
+    provider_class = import_string(PROVIDER_ALIASES.get(backend, backend))
+    return provider_class(**config.get("OPTIONS", {}))
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_price_provider():
+    """The provider configured in settings.PRICE_PROVIDER (Yahoo when unset), built once per process."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = build_price_provider(getattr(settings, "PRICE_PROVIDER", {"BACKEND": "yahoo"}))
+        return _provider
+
+
+@receiver(setting_changed)
+def _reset_price_provider(setting, **kwargs):
+    global _provider
+    if setting == "PRICE_PROVIDER":
+        with _provider_lock:
+            _provider = None
@@ -1,20 +1,43 @@
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import timedelta
+import contextvars
 import logging
+import threading
 import time
-from django.db import transaction as db_transaction
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
 from django.utils import timezone
 
 from portfolio.models import Asset, PricePoint
-from portfolio.services.prices_yahoo import download_close_prices
+from portfolio.services import metrics
+from portfolio.services.conditional import mark_prices_changed
+from portfolio.services.price_providers import get_price_provider
+from portfolio.services.request_timing import stage
 
 logger = logging.getLogger(__name__)
 
+# Cached prices are refreshed once the latest cached close is this many days
+# older than the end of the requested window.
+PRICE_REFRESH_AFTER_DAYS = 2
 
-def _download_with_retries(symbols, start_date, end_date, retries=3):
+# Attempts per download, with exponential backoff between them, before it is
+# given up on.
+DOWNLOAD_ATTEMPTS = 3
+
+
+def download_close_prices(symbols, start_date, end_date):
+    """Closes from the configured price provider (see price_providers.get_price_provider())."""
+    return get_price_provider().download_close_prices(symbols, start_date, end_date)
+
+
+@stage("download")
+def _download_with_retries(symbols, start_date, end_date, retries=DOWNLOAD_ATTEMPTS):
     last = pd.DataFrame()
 
     for attempt in range(retries):
+        started = time.perf_counter()
         try:
             df = download_close_prices(symbols, start_date=start_date, end_date=end_date)
             if df is not None and not df.empty:
@@ -22,21 +45,30 @@ def _download_with_retries(symbols, start_date, end_date, retries=3):
             last = df
         except Exception:
             pass
+        finally:
+            for symbol in symbols:
+                metrics.observe("marketvault_price_download_seconds", time.perf_counter() - started, symbol=symbol)
 
+        if attempt + 1 < retries:
+            for symbol in symbols:
+                metrics.inc("marketvault_price_download_retries_total", symbol=symbol)
         # backoff: 0.5s, 1s, 2s ...
         time.sleep(0.5 * (2 ** attempt))
 
+    for symbol in symbols:
+        metrics.inc("marketvault_price_download_failures_total", symbol=symbol)
     return last
 
 
-def _has_suspicious_jump(cached_dates_to_close):
+def _first_suspicious_jump(cached_dates_to_close):
     """
     Detect obviously broken cached history, typically caused by mixing differently
     adjusted Yahoo series across refreshes. Real overnight moves of this size are
     rare for the assets in this app, so a large ratio is a good repair trigger.
+    Returns (date, previous close, close) of the first such jump, or None.
     """
     if not cached_dates_to_close or len(cached_dates_to_close) < 2:
-        return False
+        return None
 
     dates = sorted(cached_dates_to_close.keys())
     prev_close = None
@@ -45,10 +77,28 @@ def _has_suspicious_jump(cached_dates_to_close):
         if prev_close and prev_close > 0:
             ratio = close / prev_close
             if ratio >= 1.8 or ratio <= 0.55:
-                return True
+                return dt, prev_close, close
         prev_close = close
 
-    return False
+    return None
+
+
+def _fetch_reason(data_symbol, cached_dates_to_close, force_refresh_symbols, refresh_if_older_than):
+    """
+    Why get_close_prices_cached() downloads data_symbol: "forced", "missing",
+    "suspicious_jump" or "stale"; None when the cached closes are used as they are.
+    """
+    if data_symbol in force_refresh_symbols:
+        return "forced"
+    if not cached_dates_to_close:
+        return "missing"
+    if _first_suspicious_jump(cached_dates_to_close) is not None:
+        return "suspicious_jump"
+    if max(cached_dates_to_close) < refresh_if_older_than:
+        # Refresh the full requested window so cached rows remain on one
+        # consistent price basis instead of mixing old and new downloads.
+        return "stale"
+    return None
 
 
 def _series_from_cached_dates(cached_dates_to_close):
@@ -77,6 +127,230 @@ def _series_matches_other_symbol(series, other_series, min_overlap=5, tolerance=
     return bool(((left[valid_mask] - right[valid_mask]).abs() <= tolerance).all())
 
 
+# Downloads run on several threads at once but SQLite takes one writer at a
+# time, so this process stores their prices one batch after the other.
+_price_writes_lock = threading.Lock()
+
+
+def _fetch_and_store(fetch_jobs, symbol_to_asset, cached_series_by_symbol, start, end):
+    """
+    Download (symbol, start_date, end_date) fetch jobs and replace the cached
+    rows of each window with the result. Downloads that look like another
+    symbol's prices are dropped.
+    """
+    downloaded_series = {}
+    download_metadata = {}
+    rows_to_create = []
+    delete_ranges = []
+    for symbol, job_start, job_end in fetch_jobs:
+        downloaded = _download_with_retries([symbol], job_start, job_end)
+        if downloaded is None or downloaded.empty:
+            continue
+
+        downloaded.index = pd.to_datetime(downloaded.index.date)
+        if symbol not in downloaded.columns:
+            continue
+
+        series = downloaded[symbol].dropna()
+        asset = symbol_to_asset.get(symbol)
+        if not asset:
+            continue
+
+        downloaded_series[symbol] = series.astype(float)
+        download_metadata[symbol] = (
+            asset,
+            pd.to_datetime(job_start).date(),
+            pd.to_datetime(job_end).date(),
+        )
+
+    invalid_symbols = set()
+
+    for symbol, series in downloaded_series.items():
+        for other_symbol, other_series in cached_series_by_symbol.items():
+            if other_symbol == symbol:
+                continue
+            if _series_matches_other_symbol(series, other_series):
+                invalid_symbols.add(symbol)
+                logger.warning(
+                    "Skipping cache refresh for %s because the downloaded series matches cached prices for %s",
+                    symbol,
+                    other_symbol,
+                )
+                break
+
+    downloaded_symbols = sorted(downloaded_series.keys())
+    for idx, symbol in enumerate(downloaded_symbols):
+        if symbol in invalid_symbols:
+            continue
+        for other_symbol in downloaded_symbols[idx + 1:]:
+            if other_symbol in invalid_symbols:
+                continue
+            if _series_matches_other_symbol(downloaded_series[symbol], downloaded_series[other_symbol]):
+                invalid_symbols.add(symbol)
+                invalid_symbols.add(other_symbol)
+                logger.warning(
+                    "Skipping cache refresh for %s and %s because the downloaded series are identical",
+                    symbol,
+                    other_symbol,
+                )
+
+    for symbol, series in downloaded_series.items():
+        if symbol in invalid_symbols:
+            continue
+
+        asset, delete_start, delete_end = download_metadata[symbol]
+        delete_ranges.append((asset, delete_start, delete_end))
+
+        for dt, close in series.items():
+            d = pd.to_datetime(dt).date()
+            if d < start or d >= end:
+                continue
+            rows_to_create.append(PricePoint(asset=asset, date=d, close=close))
+
+    # bulk insert ignoring duplicates (fast + safe)
+    if rows_to_create:
+        with _price_writes_lock, db_transaction.atomic():
+            for asset, delete_start, delete_end in delete_ranges:
+                PricePoint.objects.filter(
+                    asset=asset,
+                    date__gte=delete_start,
+                    date__lt=delete_end,
+                ).delete()
+            PricePoint.objects.bulk_create(
+                rows_to_create,
+                update_conflicts=True,
+                update_fields=["close"],
+                unique_fields=["asset", "date"],
+            )
+        metrics.inc("marketvault_pricepoints_written_total", len(rows_to_create))
+        mark_prices_changed(asset.user_id for asset, _, _ in delete_ranges)
+
+
+class PriceBudget:
+    """
+    Time allowed for price downloads while serving one request. Symbols that
+    were still downloading when it ran out are collected in stale_symbols.
+    """
+
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.stale_symbols = set()
+
+    def remaining(self):
+        return max(0.0, self.deadline - time.monotonic())
+
+
+_price_budget = contextvars.ContextVar("price_budget", default=None)
+
+
+@contextmanager
+def price_budget(seconds=None):
+    """
+    Bound the time get_close_prices_cached() waits for downloads in this block.
+
+    Downloads that miss the deadline keep running in the background and store
+    their prices when they finish; until then callers get what is already in
+    PricePoint and the symbols are listed in the yielded budget's
+    stale_symbols. seconds defaults to settings.PRICE_FETCH_DEADLINE_SECONDS;
+    a setting of 0 or None waits for every download as before.
+    """
+    if seconds is None:
+        seconds = getattr(settings, "PRICE_FETCH_DEADLINE_SECONDS", None) or None
+    budget = PriceBudget(seconds)
+    token = _price_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _price_budget.reset(token)
+
+
+def current_stale_symbols():
+    """Symbols served from stale cache so far in the current price_budget() block."""
+    budget = _price_budget.get()
+    return set(budget.stale_symbols) if budget is not None else set()
+
+
+# Downloads outlive the request that started them, so they run on their own
+# pool. Downloads in flight are tracked per asset with their window, so a second
+# request waits for one that covers its own window instead of downloading the
+# same symbol again; a request for a wider window starts its own download.
+_background_fetches = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PRICE_DOWNLOAD_CONCURRENCY", 8),
+    thread_name_prefix="marketvault-prices",
+)
+# asset id -> [(start, end, future), ...]
+_fetches_in_flight = {}
+_fetches_lock = threading.Lock()
+
+
+def _fetch_and_store_in_worker(*args):
+    close_old_connections()
+    try:
+        _fetch_and_store(*args)
+    except Exception:
+        logger.exception("Background price download failed")
+    finally:
+        close_old_connections()
+
+
+def _fetch_in_background(fetch_jobs, symbol_to_asset, cached_series_by_symbol, start, end, budget):
+    """Run fetch_jobs on the background pool, wait until the budget runs out and return the symbols still pending."""
+    futures = {}
+    future = None
+    with _fetches_lock:
+        new_jobs = []
+        for job in fetch_jobs:
+            covering = next(
+                (
+                    in_flight
+                    for fetch_start, fetch_end, in_flight in _fetches_in_flight.get(symbol_to_asset[job[0]].id, ())
+                    if fetch_start <= start and end <= fetch_end
+                ),
+                None,
+            )
+            if covering is not None:
+                futures[job[0]] = covering
+            else:
+                new_jobs.append(job)
+
+        if new_jobs:
+            # the download is timed as part of the request that started it
+            future = _background_fetches.submit(
+                contextvars.copy_context().run,
+                _fetch_and_store_in_worker, new_jobs, symbol_to_asset, cached_series_by_symbol, start, end,
+            )
+            asset_ids = [symbol_to_asset[job[0]].id for job in new_jobs]
+            for job, asset_id in zip(new_jobs, asset_ids):
+                _fetches_in_flight.setdefault(asset_id, []).append((start, end, future))
+                futures[job[0]] = future
+
+    if future is not None:
+        # outside the lock: a download that already finished runs the callback right here
+        future.add_done_callback(lambda done: _forget_fetches(asset_ids, done))
+
+    wait(set(futures.values()), timeout=budget.remaining())
+    return {symbol for symbol, future in futures.items() if not future.done()}
+
+
+def _forget_fetches(asset_ids, future):
+    with _fetches_lock:
+        for asset_id in asset_ids:
+            remaining = [fetch for fetch in _fetches_in_flight.get(asset_id, ()) if fetch[2] is not future]
+            if remaining:
+                _fetches_in_flight[asset_id] = remaining
+            else:
+                _fetches_in_flight.pop(asset_id, None)
+
+
+def wait_for_background_fetches(timeout=None):
+    """Block until the downloads that outlived their request have finished. Returns False on timeout."""
+    with _fetches_lock:
+        futures = {future for fetches in _fetches_in_flight.values() for _start, _end, future in fetches}
+    _done, pending = wait(futures, timeout=timeout)
+    return not pending
+
+
+@stage("prices")
 def get_close_prices_cached(data_symbols, start_date, end_date, user=None, force_refresh_symbols=None):
     """
     Returns DataFrame with:
@@ -87,7 +361,7 @@ def get_close_prices_cached(data_symbols, start_date, end_date, user=None, force
     Strategy:
       1) Load cached PricePoints from DB for assets in data_symbols within [start_date, end_date)
       2) Find missing dates per asset
-      3) Download missing via yfinance (batched by symbols), save to DB
+      3) Download missing from the price provider (batched by symbols), save to DB
       4) Re-load all and return as a complete dataframe
     """
     if not data_symbols:
@@ -144,114 +418,25 @@ def get_close_prices_cached(data_symbols, start_date, end_date, user=None, force
     # Never require "all calendar dates" because markets are closed on many days.
     # Instead, fetch only when symbol has no cache or its latest cached close is stale.
     fetch_jobs = []
-    refresh_if_older_than = end - timedelta(days=2)
+    refresh_if_older_than = end - timedelta(days=PRICE_REFRESH_AFTER_DAYS)
     for a in assets:
-        have_dates = sorted(cached_map.get(a.id, {}).keys())
-        if a.data_symbol in force_refresh_symbols:
-            fetch_jobs.append((a.data_symbol, start_date, end_date))
+        reason = _fetch_reason(a.data_symbol, cached_map.get(a.id, {}), force_refresh_symbols, refresh_if_older_than)
+        if reason is None:
             continue
 
-        if not have_dates:
-            fetch_jobs.append((a.data_symbol, start_date, end_date))
-            continue
-
-        latest = have_dates[-1]
-        if _has_suspicious_jump(cached_map.get(a.id, {})):
-            fetch_jobs.append((a.data_symbol, start_date, end_date))
-            continue
-
-        if latest < refresh_if_older_than:
-            # Refresh the full requested window so cached rows remain on one
-            # consistent price basis instead of mixing old and new downloads.
-            fetch_jobs.append((a.data_symbol, start_date, end_date))
+        fetch_jobs.append((a.data_symbol, start_date, end_date))
+        metrics.inc("marketvault_price_fetch_triggers_total", reason=reason)
 
     # ---- 3) Fetch missing/stale symbols and save
     if fetch_jobs:
-        downloaded_series = {}
-        download_metadata = {}
-        rows_to_create = []
-        delete_ranges = []
-        for symbol, job_start, job_end in fetch_jobs:
-            downloaded = _download_with_retries([symbol], job_start, job_end, retries=3)
-            if downloaded is None or downloaded.empty:
-                continue
-
-            downloaded.index = pd.to_datetime(downloaded.index.date)
-            if symbol not in downloaded.columns:
-                continue
-
-            series = downloaded[symbol].dropna()
-            asset = symbol_to_asset.get(symbol)
-            if not asset:
-                continue
-
-            downloaded_series[symbol] = series.astype(float)
-            download_metadata[symbol] = (
-                asset,
-                pd.to_datetime(job_start).date(),
-                pd.to_datetime(job_end).date(),
+        budget = _price_budget.get()
+        if budget is None or budget.deadline is None:
+            _fetch_and_store(fetch_jobs, symbol_to_asset, cached_series_by_symbol, start, end)
+        else:
+            budget.stale_symbols.update(
+                _fetch_in_background(fetch_jobs, symbol_to_asset, cached_series_by_symbol, start, end, budget)
             )
 
-        invalid_symbols = set()
-
-        for symbol, series in downloaded_series.items():
-            for other_symbol, other_series in cached_series_by_symbol.items():
-                if other_symbol == symbol:
-                    continue
-                if _series_matches_other_symbol(series, other_series):
-                    invalid_symbols.add(symbol)
-                    logger.warning(
-                        "Skipping cache refresh for %s because the downloaded series matches cached prices for %s",
-                        symbol,
-                        other_symbol,
-                    )
-                    break
-
-        downloaded_symbols = sorted(downloaded_series.keys())
-        for idx, symbol in enumerate(downloaded_symbols):
-            if symbol in invalid_symbols:
-                continue
-            for other_symbol in downloaded_symbols[idx + 1:]:
-                if other_symbol in invalid_symbols:
-                    continue
-                if _series_matches_other_symbol(downloaded_series[symbol], downloaded_series[other_symbol]):
-                    invalid_symbols.add(symbol)
-                    invalid_symbols.add(other_symbol)
-                    logger.warning(
-                        "Skipping cache refresh for %s and %s because the downloaded series are identical",
-                        symbol,
-                        other_symbol,
-                    )
-
-        for symbol, series in downloaded_series.items():
-            if symbol in invalid_symbols:
-                continue
-
-            asset, delete_start, delete_end = download_metadata[symbol]
-            delete_ranges.append((asset, delete_start, delete_end))
-
-            for dt, close in series.items():
-                d = pd.to_datetime(dt).date()
-                if d < start or d >= end:
-                    continue
-                rows_to_create.append(PricePoint(asset=asset, date=d, close=close))
-
-        # bulk insert ignoring duplicates (fast + safe)
-        if rows_to_create:
-            with db_transaction.atomic():
-                for asset, delete_start, delete_end in delete_ranges:
-                    PricePoint.objects.filter(
-                        asset=asset,
-                        date__gte=delete_start,
-                        date__lt=delete_end,
-                    ).delete()
-                PricePoint.objects.bulk_create(
-                    rows_to_create,
-                    update_conflicts=True,
-                    update_fields=["close"],
-                    unique_fields=["asset", "date"],
-                )
-
     # ---- 4) Re-load everything from DB and build the final DF
     final_points = (
         PricePoint.objects
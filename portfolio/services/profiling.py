@@ -0,0 +1,214 @@
+# portfolio/services/profiling.py
+"""
+Profiles of single requests and payload computations.
+
+Two recorders:
+
+- "cprofile": deterministic cProfile, written as a .prof file (pstats,
+  snakeviz, `python -m pstats`)
+- "speedscope": a low-overhead stack sampler, written as speedscope JSON
+  (https://www.speedscope.app)
+
+Each profile gets a <name>.meta.json next to it with what was profiled. See
+portfolio/middleware.py for how requests are picked and
+`manage.py profile_analytics` for payloads.
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMATS = ("cprofile", "speedscope")
+PROFILE_EXTENSIONS = {"cprofile": ".prof", "speedscope": ".speedscope.json"}
+
+_current = contextvars.ContextVar("profile_request", default=None)
+
+
+class CProfileRecorder:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def run(self, func, *args, **kwargs):
+        return self.profile.runcall(func, *args, **kwargs)
+
+
+class SamplingRecorder:
+    """Samples the calling thread's stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.frames = []
+        self._frame_indexes = {}
+        self.samples = []
+        self.weights = []
+        self.duration = 0.0
+
+    def run(self, func, *args, **kwargs):
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, args=(threading.get_ident(), stop), name="marketvault-sampler", daemon=True,
+        )
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stop.set()
+            sampler.join()
+            self.duration = time.perf_counter() - started
+
+    def _frame_index(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        if key not in self._frame_indexes:
+            self._frame_indexes[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return self._frame_indexes[key]
+
+    def _sample(self, thread_id, stop):
+        last = time.perf_counter()
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+
+def _new_recorder(profile_format):
+    if profile_format == "cprofile":
+        return CProfileRecorder()
+    return SamplingRecorder(getattr(settings, "PROFILE_SAMPLING_INTERVAL", 0.005))
+
+
+def _speedscope_document(name, recorders):
+    # the recorders each keep their own frame table; merge them into one
+    frames, frame_indexes, profiles = [], {}, []
+    for number, recorder in enumerate(recorders):
+        remap = []
+        for frame in recorder.frames:
+            key = (frame["name"], frame["file"], frame["line"])
+            if key not in frame_indexes:
+                frame_indexes[key] = len(frames)
+                frames.append(frame)
+            remap.append(frame_indexes[key])
+        profiles.append({
+            "type": "sampled",
+            "name": name if len(recorders) == 1 else f"{name} #{number + 1}",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": recorder.duration,
+            "samples": [[remap[index] for index in stack] for stack in recorder.samples],
+            "weights": recorder.weights,
+        })
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "marketvault",
+    }
+
+
+class Profile:
+    """
+    Collects one or more profiled calls in one format and writes them as a
+    single file: cProfile stats are added together, sampled stacks become one
+    speedscope profile per call.
+    """
+
+    def __init__(self, profile_format=None, explicit=False):
+        self.format = profile_format or getattr(settings, "PROFILE_FORMAT", "cprofile")
+        if self.format not in PROFILE_FORMATS:
+            raise ValueError(f"profile format must be one of: {', '.join(PROFILE_FORMATS)}")
+        self.explicit = explicit
+        self.recorders = []
+
+    def run(self, func, *args, **kwargs):
+        recorder = _new_recorder(self.format)
+        if isinstance(recorder, CProfileRecorder):
+            try:
+                recorder.profile.enable()
+                recorder.profile.disable()
+            except ValueError:
+                # another profiler is active in this interpreter; run unprofiled
+                logger.warning("Skipping profile: another profiler is active")
+                return func(*args, **kwargs)
+        self.recorders.append(recorder)
+        return recorder.run(func, *args, **kwargs)
+
+    def write(self, name, metadata, directory=None):
+        """Write the profile and its .meta.json to `directory` (PROFILE_DIR); returns the profile's path or None."""
+        if not self.recorders:
+            return None
+
+        directory = Path(directory or getattr(settings, "PROFILE_DIR", "/tmp/marketvault_profiles"))
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = "-".join([
+            timezone.now().strftime("%Y%m%dT%H%M%S"),
+            re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")[:60] or "profile",
+            uuid.uuid4().hex[:8],
+        ])
+        path = directory / f"{stem}{PROFILE_EXTENSIONS[self.format]}"
+
+        if self.format == "cprofile":
+            stats = pstats.Stats(self.recorders[0].profile)
+            for recorder in self.recorders[1:]:
+                stats.add(recorder.profile)
+            stats.dump_stats(path)
+        else:
+            with open(path, "w") as handle:
+                json.dump(_speedscope_document(name, self.recorders), handle)
+
+        with open(directory / f"{stem}.meta.json", "w") as handle:
+            json.dump({
+                "name": name,
+                "format": self.format,
+                "profile": path.name,
+                "created_at": timezone.now().isoformat(),
+                "pid": os.getpid(),
+                **metadata,
+            }, handle, indent=2, default=str)
+        return path
+
+
+def current_profile():
+    """The Profile collecting the current request, if it is being profiled."""
+    return _current.get()
+
+
+def bypass_cache():
+    """True while a staff-requested profile runs: the cached payload would leave nothing to profile."""
+    profile = _current.get()
+    return profile is not None and profile.explicit
+
+
+@contextmanager
+def profiling(profile):
+    """Make `profile` the current one for the block (and for work it hands to threads with its context)."""
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
@@ -0,0 +1,120 @@
+# portfolio/services/query_budget.py
+"""
+Query budgets and N+1 detection.
+
+A request (or any block of code) breaks its budget when it runs more queries
+than allowed for its endpoint (QUERY_BUDGETS by URL name, else
+QUERY_BUDGET_DEFAULT), or when one SELECT template runs more than its
+endpoint's repeat limit (QUERY_REPEAT_LIMITS by URL name, else
+QUERY_REPEAT_LIMIT) times: the signature of a lazy load in a loop, such as
+reading `transaction.user` for every row. Templates ignore parameter values
+and the length of IN lists, so `WHERE id IN (%s, %s)` and `WHERE id IN (%s)`
+count as the same query.
+
+Violations are logged on the "portfolio.queries" logger. With
+QUERY_BUDGET_STRICT (on in the test runner and the benchmark suite) they
+raise QueryBudgetExceeded instead.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("portfolio.queries")
+
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+# find_problems() and query_budget() default to QUERY_REPEAT_LIMIT; None means no limit
+_SETTING = object()
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label, problems):
+        self.label = label
+        self.problems = problems
+        super().__init__(f"{label}: " + "; ".join(problems))
+
+
+def sql_template(sql):
+    """The SQL with literals and IN list lengths removed, to compare queries by shape."""
+    sql = _IN_LIST.sub("(...)", sql)
+    sql = _NUMBER.sub("N", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def budget_for(url_name):
+    """Maximum queries for the endpoint named url_name; None means unlimited."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if url_name in budgets:
+        return budgets[url_name]
+    return getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+
+
+def repeat_limit_for(url_name):
+    """Maximum runs of one SELECT template for the endpoint named url_name; None means unlimited."""
+    limits = getattr(settings, "QUERY_REPEAT_LIMITS", {})
+    if url_name in limits:
+        return limits[url_name]
+    return getattr(settings, "QUERY_REPEAT_LIMIT", None)
+
+
+def find_problems(query_count, templates, budget=None, repeat_limit=_SETTING):
+    """
+    Human-readable budget violations for query_count queries whose templates
+    are counted in `templates` ({template: count}).
+    """
+    if repeat_limit is _SETTING:
+        repeat_limit = getattr(settings, "QUERY_REPEAT_LIMIT", None)
+
+    problems = []
+    if budget is not None and query_count > budget:
+        problems.append(f"{query_count} queries, budget {budget}")
+    if repeat_limit is not None:
+        for template, count in sorted(templates.items(), key=lambda item: -item[1]):
+            if count > repeat_limit and template.upper().startswith("SELECT"):
+                problems.append(f"possible N+1, {count} x {template[:200]}")
+    return problems
+
+
+def report(label, problems):
+    """Log the problems, or raise them under QUERY_BUDGET_STRICT."""
+    if not problems:
+        return
+    if getattr(settings, "QUERY_BUDGET_STRICT", False):
+        raise QueryBudgetExceeded(label, problems)
+    logger.warning("%s: %s", label, "; ".join(problems))
+
+
+@contextmanager
+def count_queries(using=connection):
+    """Count the queries run in the block on `using` (this thread only): yields {template: count}."""
+    templates = Counter()
+
+    def count(execute, sql, params, many, context):
+        templates[sql_template(sql)] += 1
+        return execute(sql, params, many, context)
+
+    with using.execute_wrapper(count):
+        yield templates
+
+
+@contextmanager
+def query_budget(budget=None, repeat_limit=_SETTING, label="block", using=connection):
+    """
+    Check the queries run in the block against a budget, for tests:
+
+        with query_budget(3):
+            client.get("/transactions")
+
+    Always raises QueryBudgetExceeded on a violation, strict mode or not.
+    """
+    with count_queries(using) as templates:
+        yield templates
+    problems = find_problems(sum(templates.values()), templates, budget, repeat_limit)
+    if problems:
+        raise QueryBudgetExceeded(label, problems)
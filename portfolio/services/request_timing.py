@@ -0,0 +1,156 @@
+# portfolio/services/request_timing.py
+"""
+Per-request timing breakdown: where a slow request spent its time.
+
+portfolio.middleware opens a RequestTimings for every request. Code on the
+request path marks its stages with `with stage("prices"):`, and analytics
+cache lookups are recorded with record_cache(). Every database query is
+counted, by SQL template, through an execute wrapper installed on each
+connection, whichever thread runs it. Stage times exclude the stages nested in them (a payload's
+"compute" time is the pandas work left after its ledger and price stages), so
+the stages add up to the request. Query time overlaps the stages it ran in.
+
+Outside a request (commands, workers) all of this is a no-op.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from portfolio.services import metrics
+from portfolio.services.query_budget import sql_template
+
+_current = contextvars.ContextVar("request_timings", default=None)
+_open_stage = contextvars.ContextVar("open_stage", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.query_templates = Counter()
+        self.cache_hits = []
+        self.cache_misses = []
+        # downloads and executor work report from other threads
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            total, count = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + max(0.0, seconds), count + 1)
+
+    def add_query(self, seconds, sql):
+        template = sql_template(sql)
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+            self.query_templates[template] += 1
+
+    def add_cache(self, entry, hit):
+        with self._lock:
+            (self.cache_hits if hit else self.cache_misses).append(entry)
+
+    def server_timing(self):
+        """The Server-Timing header value, durations in milliseconds."""
+        parts = [f"total;dur={self.elapsed() * 1000:.1f}"]
+        parts.append(f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries"')
+        for name, (seconds, _count) in self.stages.items():
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        if self.cache_hits or self.cache_misses:
+            parts.append(f'cache;desc="{len(self.cache_hits)} hit, {len(self.cache_misses)} miss"')
+        return ", ".join(parts)
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.elapsed() * 1000, 1),
+            "db_queries": self.queries,
+            "db_ms": round(self.query_seconds * 1000, 1),
+            "stages": {
+                name: {"ms": round(seconds * 1000, 1), "count": count}
+                for name, (seconds, count) in self.stages.items()
+            },
+            "cache_hits": sorted(self.cache_hits),
+            "cache_misses": sorted(self.cache_misses),
+        }
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def request_timings():
+    """Collect timings for the code run in this block (and in work it hands to threads with its context)."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    open_token = _open_stage.set(None)
+    try:
+        yield timings
+    finally:
+        _open_stage.reset(open_token)
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time the block as `name`, less the stages nested in it."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    parent = _open_stage.get()
+    nested = [0.0]
+    token = _open_stage.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _open_stage.reset(token)
+        if parent is not None:
+            with timings._lock:
+                parent[0] += elapsed
+        timings.add_stage(name, elapsed - nested[0])
+
+
+def record_cache(entry, hit):
+    """
+    Note an analytics cache lookup; entry is the key without the user part
+    ("growth", "shard:AAA.AS"). Lookups are also counted in the metrics, per
+    endpoint ("growth", "shard"), inside requests or not.
+    """
+    metrics.inc(
+        "marketvault_analytics_cache_requests_total", endpoint=entry.split(":")[0], result="hit" if hit else "miss",
+    )
+    timings = _current.get()
+    if timings is not None:
+        timings.add_cache(entry, hit)
+
+
+def _count_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started, sql)
+
+
+@receiver(connection_created)
+def _install_query_counter(sender, connection, **kwargs):
+    # the same wrapper object survives reconnects of a thread's connection
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
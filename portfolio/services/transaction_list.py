@@ -0,0 +1,121 @@
+# portfolio/services/transaction_list.py
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+from portfolio.models import Transaction
+
+# Public field name -> ORM path. The names match Transaction.serialize().
+TRANSACTION_LIST_FIELDS = {
+    "id": "id",
+    "user": "user__username",
+    "txn_type": "txn_type",
+    "asset_id": "asset_id",
+    "asset": "asset__ticker",
+    "asset_name": "asset__name",
+    "asset_type": "asset__asset_type",
+    "asset_currency": "asset__currency",
+    "data_symbol": "asset__data_symbol",
+    "quantity": "quantity",
+    "unit_price": "unit_price",
+    "div_amount": "div_amount",
+    "timestamp": "timestamp",
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class TransactionListError(ValueError):
+    """A query parameter of the transaction list could not be used."""
+
+
+def parse_fields(value):
+    """The requested fields= names, in TRANSACTION_LIST_FIELDS order."""
+    if not value:
+        return list(TRANSACTION_LIST_FIELDS)
+
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - TRANSACTION_LIST_FIELDS.keys()
+    if unknown:
+        raise TransactionListError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [name for name in TRANSACTION_LIST_FIELDS if name in requested]
+
+
+def encode_cursor(timestamp, txn_id):
+    raw = json.dumps([timestamp.isoformat(), txn_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, txn_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(txn_id)
+    except (ValueError, TypeError):
+        raise TransactionListError("Invalid cursor")
+
+
+def _serialize_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+def transaction_page(user, fields=None, cursor=None, limit=DEFAULT_PAGE_SIZE, filters=None):
+    """
+    One page of the user's transactions, newest first.
+
+    Rows are keyset-paginated on (timestamp, id): the cursor holds the last
+    row of the previous page, so every page is an index range scan no matter
+    how deep it is. Rows come from values_list() and are returned as plain
+    dicts of the requested fields; no model instances are built.
+
+    filters may hold asset_id, txn_type, date_from and date_to (aware
+    datetimes, date_to exclusive).
+    """
+    fields = fields or list(TRANSACTION_LIST_FIELDS)
+    filters = filters or {}
+
+    queryset = Transaction.objects.filter(user=user)
+    if filters.get("asset_id") is not None:
+        queryset = queryset.filter(asset_id=filters["asset_id"])
+    if filters.get("txn_type"):
+        queryset = queryset.filter(txn_type=filters["txn_type"])
+    if filters.get("date_from") is not None:
+        queryset = queryset.filter(timestamp__gte=filters["date_from"])
+    if filters.get("date_to") is not None:
+        queryset = queryset.filter(timestamp__lt=filters["date_to"])
+
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(timestamp__lt=last_timestamp) | Q(timestamp=last_timestamp, id__lt=last_id)
+        )
+
+    # timestamp and id are always fetched, they make up the next cursor
+    paths = ["timestamp", "id"] + [TRANSACTION_LIST_FIELDS[name] for name in fields]
+    rows = list(
+        queryset
+        .order_by("-timestamp", "-id")
+        .values_list(*paths)[: limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1])
+
+    return {
+        "transactions": [
+            {name: _serialize_value(value) for name, value in zip(fields, row[2:])}
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+    }
@@ -119,7 +119,7 @@ document.addEventListener("DOMContentLoaded", function () {
         importButton.addEventListener("click", () => {
             const file = getElement("#xlsx").files[0];
             if (!file) {
-                alert("Pick an .xlsx file first");
+                alert("Pick an .xlsx, .csv or .parquet file first");
                 return;
             }
             uploadXlsx(file);
@@ -16,6 +16,27 @@ function getCookie(name) {
     return cookieValue ? decodeURIComponent(cookieValue.split("=").slice(1).join("=")) : null;
 }
 
+// url -> {etag, body} of GET responses that came with an ETag. The body is kept
+// as text so a 304 hands every caller its own freshly parsed copy.
+const validatedResponses = new Map();
+const MAX_VALIDATED_RESPONSES = 100;
+
+function rememberValidatedResponse(url, etag, body) {
+    validatedResponses.delete(url);
+    validatedResponses.set(url, { etag: etag, body: body });
+    if (validatedResponses.size > MAX_VALIDATED_RESPONSES) {
+        validatedResponses.delete(validatedResponses.keys().next().value);
+    }
+}
+
+function parseJson(body) {
+    try {
+        return JSON.parse(body);
+    } catch (err) {
+        return null;
+    }
+}
+
 async function apiRequest(url, options = {}) {
     const method = (options.method || "GET").toUpperCase();
     const headers = new Headers(options.headers || {});
@@ -25,20 +46,49 @@ async function apiRequest(url, options = {}) {
         if (csrfToken) headers.set("X-CSRFToken", csrfToken);
     }
 
+    // Revalidate what we already have instead of downloading it again; the
+    // server answers 304 when nothing it depends on has changed.
+    const conditional = method === "GET" && !headers.has("If-None-Match");
+    const validated = conditional ? validatedResponses.get(url) : null;
+    if (validated) headers.set("If-None-Match", validated.etag);
+
     const requestOptions = {
         credentials: "same-origin",
+        // we keep the validators ourselves, so the browser's cache must not answer for the server
+        ...(conditional ? { cache: "no-store" } : {}),
         ...options,
         method: method,
         headers: headers,
     };
 
     const response = await fetch(url, requestOptions);
-    let data = null;
 
+    if (validated && response.status === 304) {
+        rememberValidatedResponse(url, validated.etag, validated.body);
+        return {
+            response: response,
+            data: parseJson(validated.body),
+            ok: true,
+            status: 200,
+            notModified: true,
+        };
+    }
+
+    let body = "";
     try {
-        data = await response.json();
+        body = await response.text();
     } catch (err) {
-        data = null;
+        body = "";
+    }
+    const data = parseJson(body);
+
+    if (conditional) {
+        const etag = response.headers.get("ETag");
+        if (response.ok && etag && data !== null) {
+            rememberValidatedResponse(url, etag, body);
+        } else {
+            validatedResponses.delete(url);
+        }
     }
 
     return {
@@ -46,6 +96,7 @@ async function apiRequest(url, options = {}) {
         data: data,
         ok: response.ok,
         status: response.status,
+        notModified: false,
     };
 }
 
@@ -1311,7 +1311,9 @@ async function loadWinnersLosersCard() {
     const controls = [
         { label: "W" },
         { label: "M" },
+        { label: "3M" },
         { label: "YTD" },
+        { label: "1Y" },
         { label: "ALL" },
     ];
 
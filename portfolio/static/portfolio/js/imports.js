@@ -1,9 +1,11 @@
+const IMPORT_POLL_INTERVAL_MS = 1000;
+
 function view_import() {
     navigate("#view-import", "#nav-transactions");
 }
 
 async function uploadXlsx(file) {
-    setText("#import-status", "Importing...");
+    setText("#import-status", "Uploading...");
 
     const formData = new FormData();
     formData.append("file", file);
@@ -19,11 +21,48 @@ async function uploadXlsx(file) {
         return;
     }
 
+    // The upload is processed by a background job; poll it until it finishes.
+    let job = data;
+    while (job.status === "QUEUED" || job.status === "RUNNING") {
+        showImportProgress(job);
+        await new Promise((resolve) => setTimeout(resolve, IMPORT_POLL_INTERVAL_MS));
+
+        const poll = await apiRequest(`/import/${job.job_id}`);
+        if (!poll.ok) {
+            console.log(poll.data);
+            setText("#import-status", "Lost track of the import. Check console.");
+            return;
+        }
+        job = poll.data;
+    }
+
+    if (job.status === "FAILED") {
+        console.log(job);
+        setText("#import-status", `Import failed: ${job.error}`);
+        alert("Import failed");
+        return;
+    }
+
+    const skipped = (job.skipped_existing || 0) + (job.skipped_duplicates || 0);
     setText(
         "#import-status",
-        `Imported ${data.created_transactions} transactions. Created ${data.created_assets} new assets.`
+        `Imported ${job.created_transactions} transactions. Created ${job.created_assets} new assets.` +
+        (skipped ? ` Skipped ${skipped} rows that were already imported.` : "") +
+        (job.row_error_count ? ` ${job.row_error_count} rows had errors.` : "")
     );
+    if (job.row_errors && job.row_errors.length) console.log(job.row_errors);
 
     refreshDashboardCharts();
     view_dashboard();
 }
+
+function showImportProgress(job) {
+    if (job.status === "QUEUED") {
+        setText("#import-status", "Waiting for the import to start...");
+        return;
+    }
+
+    const speed = job.rows_per_second ? ` (${Math.round(job.rows_per_second)} rows/s)` : "";
+    const errors = job.row_error_count ? `, ${job.row_error_count} errors so far` : "";
+    setText("#import-status", `Importing... ${job.rows_processed} rows processed${speed}${errors}`);
+}
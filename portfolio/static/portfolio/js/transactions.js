@@ -95,52 +95,131 @@ function formatMoneyAmount(amount) {
     return value.toFixed(2);
 }
 
+// The list asks the API for one page at a time and only keeps the rows that
+// are on screen in the DOM. Rows have a fixed height so the scroll offset maps
+// straight to a row index.
+const TXN_PAGE_SIZE = 100;
+const TXN_ROW_HEIGHT = 104;
+const TXN_OVERSCAN_ROWS = 6;
+const TXN_LIST_FIELDS = [
+    "id", "txn_type", "asset_id", "asset", "asset_name", "asset_type", "asset_currency",
+    "data_symbol", "quantity", "unit_price", "div_amount", "timestamp",
+].join(",");
+
+const txnList = {
+    rows: [],
+    nextCursor: null,
+    loading: false,
+    generation: 0,
+    renderedRange: "",
+};
+
 async function loadTransactions() {
     setText("#transactions-status", "Loading...");
 
-    const { ok, data } = await apiRequest("/transactions");
+    txnList.generation += 1;
+    txnList.rows = [];
+    txnList.nextCursor = null;
+    txnList.loading = false;
+    txnList.renderedRange = "";
+
+    const list = getElement("#transactions-list");
+    if (list) {
+        list.classList.add("txn-virtual-list");
+        list.innerHTML = "<div class='txn-virtual-spacer'><div class='txn-virtual-window'></div></div>";
+        list.scrollTop = 0;
+        list.onscroll = () => renderTransactionWindow();
+        bindTransactionListActions(list);
+    }
+
+    await loadTransactionPage();
+}
+
+async function loadTransactionPage() {
+    if (txnList.loading) return;
+    txnList.loading = true;
+    const generation = txnList.generation;
+
+    const params = new URLSearchParams({ limit: String(TXN_PAGE_SIZE), fields: TXN_LIST_FIELDS });
+    if (activeTransactionAssetFilterId) params.set("asset_id", activeTransactionAssetFilterId);
+    if (txnList.nextCursor) params.set("cursor", txnList.nextCursor);
+
+    const { ok, data } = await apiRequest(`/transactions?${params}`);
+    if (generation !== txnList.generation) return; // the filter changed meanwhile
+    txnList.loading = false;
+
     if (!ok) {
         console.log(data);
         setText("#transactions-status", "Failed to load transactions. Check console.");
         return;
     }
 
+    txnList.rows.push(...(data.transactions || []));
+    txnList.nextCursor = data.next_cursor || null;
+
+    const count = txnList.rows.length;
+    setText("#transactions-status", `${count}${txnList.nextCursor ? "+" : ""} transaction(s).`);
+
     const list = getElement("#transactions-list");
-    const txns = data.transactions || [];
-    const filteredTxns = activeTransactionAssetFilterId
-        ? txns.filter((txn) => String(txn.asset_id) === String(activeTransactionAssetFilterId))
-        : txns;
-
-    const statusText = activeTransactionAssetFilterId
-        ? `${filteredTxns.length} of ${txns.length} transaction(s).`
-        : `${txns.length} transaction(s).`;
-    setText("#transactions-status", statusText);
     if (!list) return;
 
-    if (filteredTxns.length === 0) {
+    if (count === 0) {
         list.innerHTML = activeTransactionAssetFilterId
             ? "<div class='surface-card'>No transactions for selected asset.</div>"
             : "<div class='surface-card'>No transactions yet.</div>";
         return;
     }
 
-    list.innerHTML = filteredTxns
-        .map((t) => {
-            const displayName = (t.asset_name || "").trim() || t.asset;
-            const symbol = currencySymbol(t.asset_currency);
-            const quantity = Number(t.quantity);
-            const unitPrice = Number(t.unit_price);
-            const total = quantity * unitPrice;
-            const headlineAmount = t.txn_type === "DIV"
-                ? `${symbol}${formatMoneyAmount(t.div_amount)}`
-                : `${symbol}${formatMoneyAmount(total)}`;
-            const rightDetails = t.txn_type === "DIV"
-                ? ""
-                : `${formatTxnQuantity(t.quantity)} @ ${formatMoneyAmount(unitPrice)}`;
-            const dateOnly = t.timestamp ? t.timestamp.slice(0, 10) : "";
-            const typeClass = `transaction-item-${String(t.txn_type || "").toLowerCase()}`;
-
-            return `
+    renderTransactionWindow();
+}
+
+function renderTransactionWindow() {
+    const list = getElement("#transactions-list");
+    const spacer = list ? list.querySelector(".txn-virtual-spacer") : null;
+    const windowEl = list ? list.querySelector(".txn-virtual-window") : null;
+    if (!spacer || !windowEl) return;
+
+    const rows = txnList.rows;
+    const first = Math.max(0, Math.floor(list.scrollTop / TXN_ROW_HEIGHT) - TXN_OVERSCAN_ROWS);
+    const last = Math.min(
+        rows.length,
+        Math.ceil((list.scrollTop + list.clientHeight) / TXN_ROW_HEIGHT) + TXN_OVERSCAN_ROWS
+    );
+
+    // scroll events inside the rows already on screen need no re-render
+    const range = `${first}:${last}:${rows.length}`;
+    if (range === txnList.renderedRange) return;
+    txnList.renderedRange = range;
+
+    spacer.style.height = `${rows.length * TXN_ROW_HEIGHT}px`;
+    windowEl.style.transform = `translateY(${first * TXN_ROW_HEIGHT}px)`;
+    windowEl.innerHTML = rows.slice(first, last).map(renderTransactionRow).join("");
+
+    bindTransactionMenuDismiss();
+
+    // fetch the next page before the user reaches the end of what is loaded
+    if (txnList.nextCursor && last >= rows.length - TXN_OVERSCAN_ROWS) {
+        loadTransactionPage();
+    }
+}
+
+function renderTransactionRow(t) {
+    const displayName = (t.asset_name || "").trim() || t.asset;
+    const symbol = currencySymbol(t.asset_currency);
+    const quantity = Number(t.quantity);
+    const unitPrice = Number(t.unit_price);
+    const total = quantity * unitPrice;
+    const headlineAmount = t.txn_type === "DIV"
+        ? `${symbol}${formatMoneyAmount(t.div_amount)}`
+        : `${symbol}${formatMoneyAmount(total)}`;
+    const rightDetails = t.txn_type === "DIV"
+        ? ""
+        : `${formatTxnQuantity(t.quantity)} @ ${formatMoneyAmount(unitPrice)}`;
+    const dateOnly = t.timestamp ? t.timestamp.slice(0, 10) : "";
+    const typeClass = `transaction-item-${String(t.txn_type || "").toLowerCase()}`;
+
+    return `
+    <div class="txn-virtual-row" style="height:${TXN_ROW_HEIGHT}px">
         <div class="transaction-item ${typeClass}">
             <div class="transaction-item-head">
                 <div class="transaction-item-meta">
@@ -172,12 +251,11 @@ async function loadTransactions() {
                 </div>
             </div>
         </div>
+    </div>
     `;
-        })
-        .join("");
-
-    bindTransactionMenuDismiss();
+}
 
+function bindTransactionListActions(list) {
     list.onclick = async (e) => {
         const button = e.target.closest("button");
         if (!button) return;
@@ -197,7 +275,7 @@ async function loadTransactions() {
         }
 
         if (action === "edit") {
-            const txn = filteredTxns.find((x) => String(x.id) === String(id));
+            const txn = txnList.rows.find((x) => String(x.id) === String(id));
             if (txn) view_transaction_form("edit", txn);
             closeAllTransactionMenus();
         }
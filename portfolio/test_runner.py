@@ -0,0 +1,20 @@
+# portfolio/test_runner.py
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class PortfolioTestRunner(DiscoverRunner):
+    """
+    The default runner, except that a request breaking its query budget fails
+    the test, and analytics warming stays off unless a test turns it on (its
+    background threads would race the test's own transaction).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._settings = override_settings(QUERY_BUDGET_STRICT=True, ANALYTICS_WARMING=False)
+        self._settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.disable()
+        super().teardown_test_environment(**kwargs)
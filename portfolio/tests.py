@@ -1,11 +1,44 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
+import json
+import os
+import tempfile
+import threading
+import time
+
 import pandas as pd
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings, tag
+from django.utils import timezone
+from openpyxl import Workbook
 
-from portfolio.models import Asset, PricePoint
-from portfolio.services.prices_cache import get_close_prices_cached
+from portfolio.benchmarks import measure_startup
+from portfolio.models import Asset, ImportJob, PricePoint, Transaction
+from portfolio.services.analytics import (
+    analytics_matrices,
+    details_payload,
+    dividends_monthly_payload,
+    growth_payload,
+    returns_payload,
+    winners_losers_payload,
+)
+from portfolio.services import imports as import_service, metrics
+from portfolio.services.analytics_cache import analytics_cache_key, invalidate_analytics_cache
+from portfolio.services.analytics_warming import wait_for_analytics_warms
+from portfolio.services.async_analytics import analytics_payload
+from portfolio.services.conditional import mark_prices_changed
+from portfolio.services.holdings import ChangePointHoldings
+from portfolio.services.imports import import_transactions
+from portfolio.services.ledger import build_ledger, ledger_totals_by_symbol
+from portfolio.services.price_providers import PriceProvider, PriceProviderError, get_price_provider
+from portfolio.services.prices_cache import get_close_prices_cached, price_budget, wait_for_background_fetches
+from portfolio.services.query_budget import QueryBudgetExceeded, query_budget
 
 
 class PriceCacheGuardTests(TestCase):
@@ -84,3 +117,829 @@ class PriceCacheGuardTests(TestCase):
         self.assertEqual(PricePoint.objects.filter(asset=self.asset_b).count(), 5)
         self.assertIn("BBB.AS", df.columns)
         self.assertEqual(float(df["BBB.AS"].dropna().iloc[-1]), 24.0)
+
+    def test_local_price_provider_serves_fixtures_and_injected_failures(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pd.DataFrame({"Date": self.index, "Close": [20, 21, 22, 23, 24]}).to_csv(
+                os.path.join(directory, "BBB.MI.csv"), index=False,
+            )
+
+            options = {"directory": directory, "fallbacks": {"BBB.AS": ["BBB.MI"]}}
+            with override_settings(PRICE_PROVIDER={"BACKEND": "local", "OPTIONS": options}):
+                provider = get_price_provider()
+                self.assertIsInstance(provider, PriceProvider)
+
+                df = get_close_prices_cached(["BBB.AS"], "2026-03-10", "2026-03-18", user=self.user)
+                self.assertEqual(PricePoint.objects.filter(asset=self.asset_b).count(), 5)
+                self.assertEqual(float(df["BBB.AS"].dropna().iloc[-1]), 24.0)
+
+            failing = {"directory": directory, "failure_rate": 1.0}
+            with override_settings(PRICE_PROVIDER={"BACKEND": "local", "OPTIONS": failing}), \
+                    patch("portfolio.services.prices_cache.time.sleep") as backoff:
+                with self.assertRaises(PriceProviderError):
+                    get_price_provider().download_close_prices(["BBB.MI"], "2026-03-10", "2026-03-18")
+                df = get_close_prices_cached(
+                    ["BBB.AS"], "2026-03-10", "2026-03-18", user=self.user, force_refresh_symbols={"BBB.AS"},
+                )
+            self.assertEqual(backoff.call_count, 3)
+            self.assertEqual(float(df["BBB.AS"].dropna().iloc[-1]), 24.0)
+
+        # errors yfinance raises reach prices_cache as the provider's own
+        with override_settings(PRICE_PROVIDER={"BACKEND": "yahoo"}), \
+                patch("portfolio.services.prices_yahoo.yf.download", side_effect=ConnectionError("offline")):
+            with self.assertRaisesRegex(PriceProviderError, "offline"):
+                get_price_provider().download_close_prices(["BBB.AS"], "2026-03-10", "2026-03-18")
+
+    @patch("portfolio.services.prices_cache.download_close_prices")
+    def test_explain_reports_decisions_without_fetching(self, download):
+        output = StringIO()
+        call_command(
+            "explain_prices", "alice", "--start", "2026-03-10", "--end", "2026-03-18", "--json", stdout=output,
+        )
+        reports = {report["data_symbol"]: report for report in json.loads(output.getvalue())}
+
+        self.assertEqual((reports["AAA.AS"]["decision"], reports["AAA.AS"]["reason"]), ("cached", None))
+        self.assertEqual(reports["AAA.AS"]["cache"]["latest_date"], "2026-03-16")
+        self.assertEqual(reports["AAA.AS"]["cache"]["coverage"], 0.833)
+        self.assertEqual((reports["BBB.AS"]["decision"], reports["BBB.AS"]["reason"]), ("fetch", "missing"))
+        self.assertEqual(reports["BBB.AS"]["estimated_download"]["rows"], 6)
+
+        PricePoint.objects.filter(asset=self.asset_a, date="2026-03-13").update(close=30)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get("/debug/prices", {"symbols": "AAA.AS", "start": "2026-03-10", "end": "2026-03-18"})
+        [report] = response.json()["symbols"]
+        self.assertEqual(report["reason"], "suspicious_jump")
+        self.assertEqual(report["anomalies"]["suspicious_jump"]["date"], "2026-03-13")
+        download.assert_not_called()
+
+
+class AnalyticsShardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="bob",
+            password="password123",
+        )
+        self.today = timezone.now().date()
+        self.assets = {}
+        for ticker, close in (("AAA", 10.0), ("BBB", 20.0)):
+            asset = Asset.objects.create(
+                user=self.user,
+                ticker=ticker,
+                name=f"Asset {ticker}",
+                asset_type=Asset.AssetType.STOCK,
+                currency="EUR",
+                exchange="Euronext",
+                data_symbol=f"{ticker}.AS",
+            )
+            self.assets[ticker] = asset
+            for offset in range(10, -1, -1):
+                PricePoint.objects.create(
+                    asset=asset,
+                    date=self.today - timedelta(days=offset),
+                    close=close,
+                )
+            Transaction.objects.create(
+                user=self.user,
+                asset=asset,
+                txn_type=Transaction.TransactionType.BUY,
+                quantity=2,
+                unit_price=close,
+                timestamp=timezone.now() - timedelta(days=10),
+            )
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_growth_sums_asset_shards(self, _mock_download):
+        payload = growth_payload(self.user)
+
+        self.assertEqual(len(payload["dates"]), 11)
+        self.assertEqual(payload["portfolio_value"][-1], 60.0)
+        self.assertEqual(payload["invested"][-1], 60.0)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_write_only_recomputes_affected_shard(self, _mock_download):
+        growth_payload(self.user)
+
+        Transaction.objects.create(
+            user=self.user,
+            asset=self.assets["AAA"],
+            txn_type=Transaction.TransactionType.BUY,
+            quantity=1,
+            unit_price=10,
+            timestamp=timezone.now() - timedelta(days=2),
+        )
+        invalidate_analytics_cache(self.user, [self.assets["AAA"].data_symbol])
+
+        with patch(
+            "portfolio.services.analytics.get_close_prices_cached",
+            wraps=get_close_prices_cached,
+        ) as mock_prices:
+            payload = growth_payload(self.user)
+
+        self.assertEqual(mock_prices.call_count, 1)
+        self.assertEqual(mock_prices.call_args.kwargs["data_symbols"], ["AAA.AS"])
+        self.assertEqual(payload["portfolio_value"][-1], 70.0)
+
+        # stored prices retire every shard of their owner, however recently built
+        PricePoint.objects.filter(asset=self.assets["BBB"], date=self.today).update(close=25)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_prices_changed([self.user.id])
+        cache.delete(analytics_cache_key(self.user.id, "growth"))
+        self.assertEqual(growth_payload(self.user)["portfolio_value"][-1], 80.0)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_details_and_winners_share_one_returns_table(self, _mock_download):
+        with patch(
+            "portfolio.services.analytics.get_close_prices_cached",
+            wraps=get_close_prices_cached,
+        ) as mock_prices:
+            details = details_payload(self.user)
+            winners = winners_losers_payload(self.user, period="W")
+            returns = returns_payload(self.user)
+
+        self.assertEqual(mock_prices.call_count, 1)
+        self.assertEqual(details["total_portfolio"], 60.0)
+        self.assertEqual([row["symbol"] for row in winners["losers"]], ["AAA.AS", "BBB.AS"])
+        self.assertEqual(returns["periods"], ["W", "M", "3M", "YTD", "1Y", "3Y", "ALL"])
+        self.assertEqual(returns["assets"][0]["held_return_pct"]["W"], 0.0)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_winners_losers_ranges_share_canonical_cache_entries(self, _mock_download):
+        self.client.force_login(self.user)
+        for value, period in (("m", "M"), ("ytd", "YTD"), ("bogus", "ALL"), ("", "M")):
+            self.assertEqual(self.client.get("/analytics/winners-losers", {"range": value}).json()["period"], period)
+        self.assertIsNotNone(cache.get(analytics_cache_key(self.user.id, "winners_losers:ALL")))
+        self.assertIsNone(cache.get(analytics_cache_key(self.user.id, "winners_losers:bogus")))
+
+        invalidate_analytics_cache(self.user, warm=False)
+        self.assertEqual(cache.get_many([analytics_cache_key(self.user.id, f"winners_losers:{p}") for p in ("M", "YTD", "ALL")]), {})
+
+    def test_ledger_aggregates_run_in_the_database(self):
+        for months_ago, amount in ((14, 1), (2, 3), (1, 4)):
+            Transaction.objects.create(
+                user=self.user,
+                asset=self.assets["AAA"],
+                txn_type=Transaction.TransactionType.DIVIDEND,
+                div_amount=amount,
+                timestamp=timezone.now() - timedelta(days=31 * months_ago),
+            )
+
+        with patch("portfolio.services.analytics.load_ledger") as mock_ledger:
+            payload = dividends_monthly_payload(self.user)
+        totals = ledger_totals_by_symbol(self.user)
+
+        mock_ledger.assert_not_called()
+        self.assertEqual(sum(payload["dividends"]), 8.0)
+        self.assertEqual(payload["cumulative"][-1], 8.0)
+        self.assertEqual(totals["AAA.AS"], {
+            "total_bought": 20.0,
+            "total_sold": 0.0,
+            "total_dividends": 8.0,
+            "dividends_ttm": 7.0,
+        })
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_valuation_endpoint_values_holdings_as_of_date(self, _mock_download):
+        self.client.force_login(self.user)
+
+        before = self.client.get("/analytics/valuation", {"as_of": (self.today - timedelta(days=11)).isoformat()})
+        current = self.client.get("/analytics/valuation")
+        invalid = self.client.get("/analytics/valuation", {"as_of": "not-a-date"})
+
+        self.assertEqual(before.json()["positions"], [])
+        self.assertEqual(current.json()["total_value"], 60.0)
+        self.assertEqual(invalid.status_code, 400)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_matrices_share_one_date_index(self, _mock_download):
+        matrices = analytics_matrices(self.user)
+
+        self.assertEqual(set(matrices), {"prices", "holdings", "invested"})
+        for frame in matrices.values():
+            self.assertEqual(len(frame.index), 11)
+            self.assertEqual(frame.index.name, "date")
+            self.assertEqual(sorted(frame.columns), ["AAA.AS", "BBB.AS"])
+        self.assertEqual(matrices["prices"]["BBB.AS"].iloc[-1], 20.0)
+        self.assertEqual(matrices["holdings"]["AAA.AS"].iloc[-1], 2.0)
+        self.assertEqual(matrices["invested"]["BBB.AS"].iloc[-1], 40.0)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/analytics/matrices/nope").status_code, 404)
+        self.assertEqual(self.client.get("/analytics/matrices/prices", {"format": "csv"}).status_code, 400)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_responses_carry_server_timing_breakdown(self, _mock_download):
+        self.client.force_login(self.user)
+
+        with self.assertLogs("portfolio.timing", "INFO") as logs:
+            first = self.client.get("/analytics/growth")
+            second = self.client.get("/analytics/growth")
+
+        metrics = {metric.split(";")[0] for metric in first["Server-Timing"].split(", ")}
+        self.assertTrue({"total", "db", "ledger", "prices", "compute", "json", "cache"} <= metrics)
+        self.assertRegex(first["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+        first_log, second_log = (json.loads(line.split(":", 2)[2]) for line in logs.output)
+        self.assertEqual(first_log["path"], "/analytics/growth")
+        self.assertGreater(first_log["db_queries"], 0)
+        self.assertEqual(set(first_log["cache_misses"]), {"growth", "ledger", "shard:AAA.AS", "shard:BBB.AS"})
+        self.assertEqual(second_log["cache_hits"], ["growth"])
+        self.assertNotIn("compute", second_log["stages"])
+        self.assertIn('cache;desc="1 hit, 0 miss"', second["Server-Timing"])
+
+    @patch("portfolio.services.prices_cache.time.sleep")
+    @patch("portfolio.services.prices_cache.download_close_prices", side_effect=OSError("offline"))
+    def test_metrics_endpoint_reports_shared_counts(self, _download, _backoff):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            METRICS_DB_PATH=os.path.join(directory, "metrics.sqlite3"), METRICS_FLUSH_SECONDS=0, METRICS_TOKEN="s3cret",
+        ):
+            metrics.reset()
+            self.client.force_login(self.user)
+            self.client.get("/analytics/growth")
+            self.client.get("/analytics/growth")
+            get_close_prices_cached(["AAA.AS"], self.today, self.today + timedelta(days=1), user=self.user,
+                                    force_refresh_symbols={"AAA.AS"})
+
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            self.user.is_staff = True
+            self.user.save()
+            text = self.client.get("/metrics").content.decode()
+            self.client.logout()
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode(), text)
+
+        self.assertIn('marketvault_analytics_cache_requests_total{endpoint="growth",result="hit"} 1\n', text)
+        self.assertIn('marketvault_analytics_cache_hit_ratio{endpoint="growth"} 0.5\n', text)
+        self.assertIn('marketvault_payload_compute_seconds_count{payload="growth_payload"} 1\n', text)
+        self.assertIn('marketvault_price_fetch_triggers_total{reason="forced"} 1\n', text)
+        self.assertIn('marketvault_price_download_seconds_count{symbol="AAA.AS"} 3\n', text)
+        self.assertIn('marketvault_price_download_retries_total{symbol="AAA.AS"} 2\n', text)
+        self.assertIn('marketvault_price_download_failures_total{symbol="AAA.AS"} 1\n', text)
+        self.assertIn("# TYPE marketvault_pricepoints_written_total counter\n", text)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_staff_can_profile_a_request_and_a_payload(self, _mock_download):
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILE_DIR=directory):
+            self.client.force_login(self.user)
+            self.client.get("/analytics/growth")
+            self.assertNotIn("X-Profile", self.client.get("/analytics/growth", {"profile": "1"}))
+            self.assertEqual(os.listdir(directory), [])
+
+            self.user.is_staff = True
+            self.user.save()
+            response = self.client.get("/analytics/growth", {"profile": "speedscope"})
+            self.assertEqual(response.status_code, 200)
+            with open(os.path.join(directory, response["X-Profile"])) as handle:
+                document = json.load(handle)
+            with open(os.path.join(directory, response["X-Profile"].replace(".speedscope.json", ".meta.json"))) as handle:
+                meta = json.load(handle)
+
+            call_command("profile_analytics", user="bob", payload=["growth"], cold=True, top=0, stdout=StringIO())
+            written = sorted(name for name in os.listdir(directory) if name.endswith(".prof"))
+
+        self.assertEqual(document["profiles"][0]["type"], "sampled")
+        self.assertEqual(len(document["profiles"][0]["samples"]), len(document["profiles"][0]["weights"]))
+        self.assertEqual(meta["path"], "/analytics/growth")
+        self.assertEqual(meta["trigger"], "staff")
+        # a staff profile skips the cached payload, so it profiles the computation
+        self.assertEqual(meta["payload_cache"], "bypassed")
+        self.assertEqual(len(written), 1)
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_unchanged_responses_are_not_modified(self, _mock_download):
+        self.client.force_login(self.user)
+        growth = self.client.get("/analytics/growth")
+        assets = self.client.get("/assets")
+        self.assertTrue(growth["ETag"].startswith('W/"'))
+        self.assertIn("Last-Modified", growth)
+
+        # answered before the view runs: nothing is computed, not even from the cache
+        cache.delete(analytics_cache_key(self.user.id, "growth"))
+        with patch("portfolio.services.analytics.growth_payload") as payload:
+            response = self.client.get("/analytics/growth", HTTP_IF_NONE_MATCH=growth["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], growth["ETag"])
+        payload.assert_not_called()
+        self.assertEqual(self.client.get("/analytics/growth", {"x": 1}, HTTP_IF_NONE_MATCH=growth["ETag"]).status_code, 200)
+
+        # after midnight the analytics are modified by date too, the asset list is not
+        self.assertEqual(self.client.get("/analytics/growth", HTTP_IF_MODIFIED_SINCE=growth["Last-Modified"]).status_code, 304)
+        with patch("portfolio.services.conditional.timezone.now", return_value=timezone.now() + timedelta(days=1)):
+            since_yesterday = self.client.get("/analytics/growth", HTTP_IF_MODIFIED_SINCE=growth["Last-Modified"])
+            self.assertEqual(since_yesterday.status_code, 200)
+            self.assertEqual(self.client.get("/assets", HTTP_IF_MODIFIED_SINCE=assets["Last-Modified"]).status_code, 304)
+
+        # stored prices change the analytics, body included, but not the asset list
+        self.assertEqual(growth.json()["portfolio_value"][-1], 60.0)
+        PricePoint.objects.filter(asset=self.assets["BBB"], date=self.today).update(close=25)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_prices_changed([self.user.id])
+        repriced = self.client.get("/analytics/growth", HTTP_IF_NONE_MATCH=growth["ETag"])
+        self.assertEqual(repriced.status_code, 200)
+        self.assertEqual(repriced.json()["portfolio_value"][-1], 70.0)
+        self.assertEqual(self.client.get("/assets", HTTP_IF_NONE_MATCH=assets["ETag"]).status_code, 304)
+
+        # a write changes both, once it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/transactions", {
+                "txn_type": "BUY", "asset_id": self.assets["AAA"].id, "quantity": "1", "unit_price": "10",
+            }, content_type="application/json")
+        self.assertEqual(self.client.get("/assets", HTTP_IF_NONE_MATCH=assets["ETag"]).status_code, 200)
+
+        # payloads built from stale prices are never validated
+        stale = self.client.get("/analytics/growth")
+        with patch("portfolio.services.analytics.growth_payload", lambda user: {"stale": True}):
+            cache.delete(analytics_cache_key(self.user.id, "growth"))
+            response = self.client.get("/analytics/growth", HTTP_IF_NONE_MATCH='W/"other"')
+        self.assertNotIn("ETag", response)
+        self.assertEqual(self.client.get("/analytics/growth", HTTP_IF_NONE_MATCH=stale["ETag"]).status_code, 304)
+
+
+class AsyncAnalyticsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="erin", password="password123")
+        for ticker in ("AAA", "BBB", "CCC"):
+            asset = Asset.objects.create(user=self.user, ticker=ticker, data_symbol=f"{ticker}.AS")
+            Transaction.objects.create(
+                user=self.user, asset=asset, txn_type="BUY", quantity=1, unit_price=10,
+                timestamp=timezone.now() - timedelta(days=10),
+            )
+
+    def test_symbols_are_downloaded_concurrently_off_the_event_loop(self):
+        lock = threading.Lock()
+        running = {"now": 0, "max": 0}
+
+        def slow_download(symbols, start_date, end_date):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            time.sleep(0.2)
+            with lock:
+                running["now"] -= 1
+            index = pd.date_range(start_date, end_date, freq="D")
+            return pd.DataFrame({symbol: [float(ord(symbol[0]))] * len(index) for symbol in symbols}, index=index)
+
+        with patch("portfolio.services.prices_cache.download_close_prices", side_effect=slow_download) as download:
+            payload = async_to_sync(analytics_payload)(self.user, growth_payload)
+            self.assertEqual(download.call_count, 3)
+            self.assertEqual(running["max"], 3)
+
+            cache.clear()
+            self.assertEqual(payload, growth_payload(self.user))
+            self.assertEqual(download.call_count, 3)  # prices were stored by the prefetch
+
+    @override_settings(PRICE_FETCH_DEADLINE_SECONDS=0.2)
+    def test_slow_downloads_are_served_stale_and_finish_in_background(self):
+        release = threading.Event()
+
+        def blocked_download(symbols, start_date, end_date):
+            release.wait(5)
+            index = pd.date_range(start_date, end_date, freq="D")
+            return pd.DataFrame({symbol: [float(ord(symbol[0]))] * len(index) for symbol in symbols}, index=index)
+
+        self.client.force_login(self.user)
+        with patch("portfolio.services.prices_cache.download_close_prices", side_effect=blocked_download):
+            started = time.monotonic()
+            payload = self.client.get("/analytics/growth").json()
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertTrue(payload["stale"])
+            self.assertEqual(payload["stale_symbols"], ["AAA.AS", "BBB.AS", "CCC.AS"])
+
+            release.set()
+            self.assertTrue(wait_for_background_fetches(timeout=5))
+
+            cache.clear()
+            payload = self.client.get("/analytics/growth").json()
+            self.assertNotIn("stale", payload)
+            self.assertEqual(PricePoint.objects.filter(asset__user=self.user).values("asset").distinct().count(), 3)
+
+    @override_settings(PRICE_FETCH_DEADLINE_SECONDS=0.2)
+    def test_downloads_in_flight_are_reused_only_for_windows_they_cover(self):
+        release = threading.Event()
+
+        def blocked_download(symbols, start_date, end_date):
+            release.wait(5)
+            index = pd.date_range(start_date, end_date, freq="D")
+            return pd.DataFrame({symbol: [1.0] * len(index) for symbol in symbols}, index=index)
+
+        with patch("portfolio.services.prices_cache.download_close_prices", side_effect=blocked_download) as download:
+            with price_budget():
+                get_close_prices_cached(["AAA.AS"], "2026-03-10", "2026-03-15", user=self.user)
+            with price_budget():
+                get_close_prices_cached(["AAA.AS"], "2026-03-11", "2026-03-14", user=self.user)
+            self.assertEqual(download.call_count, 1)
+
+            with price_budget():
+                get_close_prices_cached(["AAA.AS"], "2026-03-01", "2026-03-15", user=self.user)
+            self.assertEqual(download.call_count, 2)
+            self.assertEqual(str(download.call_args.kwargs["start_date"])[:10], "2026-03-01")
+
+            release.set()
+            self.assertTrue(wait_for_background_fetches(timeout=5))
+
+    @override_settings(ANALYTICS_WARMING=True)
+    def test_logins_and_writes_warm_the_analytics_cache(self):
+        def download(symbols, start_date, end_date):
+            index = pd.date_range(start_date, end_date, freq="D")
+            return pd.DataFrame({symbol: [float(ord(symbol[0]))] * len(index) for symbol in symbols}, index=index)
+
+        growth_key = analytics_cache_key(self.user.id, "growth")
+        with patch("portfolio.services.prices_cache.download_close_prices", side_effect=download):
+            self.client.login(username="erin", password="password123")
+            self.assertTrue(wait_for_analytics_warms(timeout=10))
+            self.assertIsNotNone(cache.get(growth_key))
+
+            sold = Transaction.objects.filter(user=self.user, asset__ticker="CCC").get()
+            self.assertEqual(self.client.delete(f"/transactions/{sold.id}").status_code, 200)
+            self.assertTrue(wait_for_analytics_warms(timeout=10))
+            response = self.client.get("/analytics/growth")
+            self.assertIn('cache;desc="1 hit, 0 miss"', response["Server-Timing"])
+            self.assertEqual(response.json(), growth_payload(self.user))
+
+            cache.clear()
+            output = StringIO()
+            call_command("warm_analytics", "erin", "--processes", "1", stdout=output, stderr=StringIO())
+            self.assertIn("erin: 7 payloads", output.getvalue())
+            self.assertIsNotNone(cache.get(growth_key))
+
+
+class LedgerHoldingsTests(TestCase):
+    def test_as_of_uses_latest_change_point(self):
+        ledger = build_ledger([
+            (datetime(2026, 1, 5, 9, tzinfo=dt_timezone.utc), "AAA.AS", "BUY", 3, 10, None),
+            (datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc), "BBB.AS", "BUY", 1, 20, None),
+            (datetime(2026, 2, 10, 9, tzinfo=dt_timezone.utc), "AAA.AS", "SELL", 1, 12, None),
+            (datetime(2026, 2, 20, 9, tzinfo=dt_timezone.utc), "AAA.AS", "DIV", None, None, 2),
+            (datetime(2026, 3, 1, 9, tzinfo=dt_timezone.utc), "BBB.AS", "SELL", 1, 25, None),
+        ])
+        holdings = ChangePointHoldings.from_ledger(ledger)
+
+        self.assertEqual(holdings.as_of("2026-01-04").to_dict(), {"AAA.AS": 0.0, "BBB.AS": 0.0})
+        self.assertEqual(holdings.as_of("2026-02-09").to_dict(), {"AAA.AS": 3.0, "BBB.AS": 1.0})
+        self.assertEqual(holdings.as_of("2026-03-01").to_dict(), {"AAA.AS": 2.0, "BBB.AS": 0.0})
+        self.assertEqual(
+            holdings.first_held_since("2026-02-01").to_dict(),
+            {"AAA.AS": pd.Timestamp("2026-02-01"), "BBB.AS": pd.Timestamp("2026-02-01")},
+        )
+        self.assertEqual(holdings.start, pd.Timestamp("2026-01-05"))
+        self.assertEqual(ledger["cashflow"].tolist(), [30.0, 20.0, -12.0, -2.0, -25.0])
+        self.assertEqual(ledger["signed_qty"].tolist(), [3.0, 1.0, -1.0, 0.0, -1.0])
+        self.assertEqual(str(ledger["day"].dtype), "int32")
+
+
+class StreamingImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="carol", password="password123")
+        self.client.force_login(self.user)
+        Asset.objects.create(
+            user=self.user,
+            ticker="AAA",
+            name="Asset A",
+            asset_type=Asset.AssetType.STOCK,
+            currency="EUR",
+            exchange="",
+            data_symbol="AAA.AS",
+        )
+
+    def _upload(self, rows):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Data Symbol", "txn_type", "quantity", "unit_price", "div_amount", "timestamp"])
+        for row in rows:
+            sheet.append(row)
+        output = BytesIO()
+        workbook.save(output)
+        return SimpleUploadedFile("transactions.xlsx", output.getvalue())
+
+    def test_import_validates_chunks_and_bulk_writes(self):
+        rows = [["AAA.AS", "buy", 2, "€10,50", None, 1610323200 + day * 86400] for day in range(30)]
+        rows += [
+            ["AAA.DE", "BUY", "1", "20", None, 1610323200],   # ticker AAA is taken -> falls back to AAA.DE
+            ["BBB.AS", "DIV", None, None, "1.25", 1610323200],
+            ["BBB.AS", "DIV", "1", None, "1.25", 1610323200],
+            ["BBB.AS", "SELL", "1", None, None, 1610323200],
+            ["BBB.AS", "BUY", "1", "1.123456789", None, 1610323200],
+            ["BBB.AS", "BUY", "1", "1", None, "2021-01-11"],
+            ["", "BUY", "1", "1", None, 1610323200],
+        ]
+
+        progress = []
+        with patch("portfolio.services.imports.invalidate_analytics_cache") as mock_invalidate, \
+                self.assertNumQueries(16):
+            data = import_transactions(
+                self.user,
+                self._upload(rows),
+                ".xlsx",
+                chunk_size=16,
+                progress=lambda summary: progress.append(summary["rows_processed"]),
+            )
+
+        self.assertEqual(progress, [16, 32, 37])
+        self.assertEqual(data["created_transactions"], 32)
+        self.assertEqual(data["created_assets"], 2)
+        self.assertEqual(data["row_error_count"], 5)
+        self.assertEqual([error["row"] for error in data["row_errors"]], [34, 35, 36, 37, 38])
+        self.assertEqual(
+            data["row_errors"][0]["error"],
+            "Dividend transactions cannot include quantity or unit price.",
+        )
+        mock_invalidate.assert_called_once_with(self.user)
+
+        self.assertEqual(
+            Asset.objects.get(user=self.user, data_symbol="AAA.DE").ticker,
+            "AAA.DE",
+        )
+        first = Transaction.objects.filter(user=self.user, asset__data_symbol="AAA.AS").order_by("timestamp").first()
+        self.assertEqual(str(first.unit_price), "10.50000000")
+        self.assertEqual(first.timestamp, datetime(2021, 1, 11, tzinfo=dt_timezone.utc))
+
+    def test_missing_columns_are_rejected(self):
+        workbook = Workbook()
+        workbook.active.append(["data_symbol", "quantity"])
+        output = BytesIO()
+        workbook.save(output)
+
+        response = self.client.post("/import", {"file": SimpleUploadedFile("t.xlsx", output.getvalue())})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], ImportJob.Status.FAILED)
+        self.assertIn("timestamp", response.json()["error"])
+
+    @override_settings(IMPORT_JOBS_INLINE=False)
+    def test_upload_is_queued_for_the_worker(self):
+        content = "data_symbol,txn_type,quantity,unit_price,div_amount,timestamp\nAAA.AS,BUY,1,10,,1610323200\n"
+        response = self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())})
+
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job["status"], ImportJob.Status.QUEUED)
+        self.assertEqual(response["Location"], f"/import/{job['job_id']}")
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+        # the upload waits in storage, not in the job row
+        upload = ImportJob.objects.get(id=job["job_id"]).upload
+        self.assertTrue(upload.storage.exists(upload.name))
+        with upload.open("rb") as handle:
+            self.assertEqual(handle.read(), content.encode())
+
+        call_command("run_import_worker", "--once", stdout=StringIO())
+
+        job = self.client.get(f"/import/{job['job_id']}").json()
+        self.assertEqual(job["status"], ImportJob.Status.DONE)
+        self.assertEqual(job["created_transactions"], 1)
+        self.assertFalse(ImportJob.objects.get(id=job["job_id"]).upload)
+        self.assertFalse(upload.storage.exists(upload.name))
+
+    def test_csv_import_shares_the_chunked_pipeline(self):
+        content = (
+            "Data Symbol,TXN_TYPE,quantity,unit_price,div_amount,timestamp\n"
+            "AAA.AS,BUY,\"1,5\",€10,,1610323200\n"
+            "NA.AS,SELL,1,12.00,,1610409600\n"
+            "AAA.AS,DIV,,,0.75,1610496000\n"
+            "AAA.AS,BUY,1,10,,2021-01-11\n"
+        )
+        upload = SimpleUploadedFile("transactions.csv", content.encode("utf-8"))
+
+        with patch("portfolio.services.imports.IMPORT_CHUNK_SIZE", 2):
+            response = self.client.post("/import", {"file": upload})
+
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertEqual(data["status"], ImportJob.Status.DONE)
+        self.assertEqual(data["created_transactions"], 3)
+        self.assertEqual(data["created_assets"], 1)
+        self.assertEqual(data["row_errors"], [{"row": 5, "error": "timestamp must be unix seconds (e.g. 1610323200)"}])
+        self.assertEqual(
+            str(Transaction.objects.get(user=self.user, txn_type="BUY").quantity),
+            "1.50000000",
+        )
+
+    def test_failed_import_keeps_committed_chunks_and_resumes(self):
+        content = "data_symbol,txn_type,quantity,unit_price,div_amount,timestamp\n" + "".join(
+            f"AAA.AS,BUY,1,10,,{1610323200 + day * 86400}\n" for day in range(5)
+        )
+        import_chunk = import_service._import_chunk
+        chunks = []
+
+        def fail_third_chunk(*args):
+            chunks.append(args)
+            if len(chunks) == 3:
+                raise RuntimeError("disk full")
+            return import_chunk(*args)
+
+        with patch("portfolio.services.imports.IMPORT_CHUNK_SIZE", 2), \
+                patch("portfolio.services.imports._import_chunk", fail_third_chunk), \
+                self.assertLogs("portfolio.services.import_jobs", "ERROR"):
+            job = self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())}).json()
+
+        # chunks commit one by one, so the first two survive the failure of the third
+        self.assertEqual(job["status"], ImportJob.Status.FAILED)
+        self.assertEqual(job["created_transactions"], 4)
+        self.assertIn("after importing 4 transactions", job["error"])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+        with patch("portfolio.services.imports.IMPORT_CHUNK_SIZE", 2):
+            job = self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())}).json()
+        self.assertEqual((job["status"], job["created_transactions"], job["skipped_existing"]), ("DONE", 1, 4))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 5)
+
+    def test_inline_import_of_many_chunks_stays_within_its_query_budget(self):
+        content = "data_symbol,txn_type,quantity,unit_price,div_amount,timestamp\n" + "".join(
+            f"AAA.AS,BUY,1,10,,{1610323200 + day * 86400}\n" for day in range(30)
+        )
+
+        # every chunk looks up the user's row hashes: 15 times the same SELECT
+        with patch("portfolio.services.imports.IMPORT_CHUNK_SIZE", 2):
+            with override_settings(QUERY_REPEAT_LIMITS={}), self.assertRaises(QueryBudgetExceeded):
+                self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())})
+            Transaction.objects.filter(user=self.user).delete()
+
+            response = self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())})
+        self.assertEqual((response.status_code, response.json()["created_transactions"]), (202, 30))
+
+    @patch("portfolio.services.prices_cache._download_with_retries", return_value=pd.DataFrame())
+    def test_reimporting_an_export_skips_existing_rows(self, _mock_download):
+        asset = Asset.objects.get(user=self.user, data_symbol="AAA.AS")
+        Transaction.objects.create(
+            user=self.user, asset=asset, txn_type="BUY", quantity="2", unit_price="10.5",
+            timestamp=datetime(2021, 1, 11, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        )
+        Transaction.objects.create(
+            user=self.user, asset=asset, txn_type="DIV", div_amount="0.75",
+            timestamp=datetime(2021, 2, 1, tzinfo=dt_timezone.utc),
+        )
+
+        export = self.client.get("/export")
+        upload = SimpleUploadedFile("export.xlsx", b"".join(export.streaming_content))
+        response = self.client.post("/import", {"file": upload})
+
+        data = response.json()
+        self.assertEqual(data["created_transactions"], 0)
+        self.assertEqual(data["skipped_existing"], 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+        content = "data_symbol,txn_type,quantity,unit_price,div_amount,timestamp\n" + "AAA.AS,SELL,1,11,,1612137600\n" * 2
+        response = self.client.post("/import", {"file": SimpleUploadedFile("t.csv", content.encode())})
+        self.assertEqual(response.json()["created_transactions"], 1)
+        self.assertEqual(response.json()["skipped_duplicates"], 1)
+
+        # renaming the asset re-keys its hashes, so the export still matches
+        self.client.put(f"/assets/{asset.id}", {"data_symbol": "AAA.PA"}, content_type="application/json")
+        self.assertEqual(
+            set(Transaction.objects.filter(user=self.user).values_list("row_hash", flat=True)),
+            {txn.compute_row_hash() for txn in Transaction.objects.filter(user=self.user).select_related("asset")},
+        )
+
+    def test_csv_export_streams_and_round_trips(self):
+        asset = Asset.objects.get(user=self.user, data_symbol="AAA.AS")
+        for day in range(3):
+            Transaction.objects.create(
+                user=self.user, asset=asset, txn_type="BUY", quantity="1.5", unit_price="10",
+                timestamp=datetime(2021, 1, 11 + day, tzinfo=dt_timezone.utc),
+            )
+
+        response = self.client.get("/export?format=csv")
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content)
+        self.assertEqual(
+            content.decode().splitlines()[:2],
+            ["data_symbol,txn_type,quantity,unit_price,div_amount,timestamp", "AAA.AS,BUY,1.50000000,10.00000000,,1610323200"],
+        )
+
+        response = self.client.post("/import", {"file": SimpleUploadedFile("export.csv", content)})
+        self.assertEqual(response.json()["skipped_existing"], 3)
+
+
+class TransactionListTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="dave", password="password123")
+        self.client.force_login(self.user)
+        self.asset = Asset.objects.create(
+            user=self.user, ticker="AAA", name="Asset A", asset_type=Asset.AssetType.STOCK,
+            currency="EUR", exchange="", data_symbol="AAA.AS",
+        )
+        # two rows per day, so pages have to break ties on id
+        for day in range(5):
+            for quantity in ("1", "2"):
+                Transaction.objects.create(
+                    user=self.user, asset=self.asset, txn_type="BUY", quantity=quantity, unit_price="10",
+                    timestamp=datetime(2021, 1, 11 + day, tzinfo=dt_timezone.utc),
+                )
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen = []
+        cursor = ""
+        while True:
+            with self.assertNumQueries(3):  # session, user, page
+                page = self.client.get("/transactions", {"limit": 3, "cursor": cursor, "fields": "id,timestamp"}).json()
+            self.assertTrue(all(set(row) == {"id", "timestamp"} for row in page["transactions"]))
+            seen += [(row["timestamp"], row["id"]) for row in page["transactions"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_filters_and_errors(self):
+        page = self.client.get("/transactions", {"from": "2021-01-12", "to": "2021-01-13"}).json()
+        self.assertEqual(len(page["transactions"]), 4)
+        self.assertEqual(page["transactions"][0], Transaction.objects.get(id=page["transactions"][0]["id"]).serialize())
+
+        self.assertEqual(len(self.client.get("/transactions", {"txn_type": "sell"}).json()["transactions"]), 0)
+        self.assertEqual(self.client.get("/transactions", {"fields": "id,password"}).status_code, 400)
+        self.assertEqual(self.client.get("/transactions", {"cursor": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get("/transactions", {"limit": 0}).status_code, 400)
+
+    def test_bulk_endpoint_applies_batch_atomically(self):
+        rows = list(Transaction.objects.filter(user=self.user).order_by("id"))
+        batch = {
+            "create": [
+                {"asset_id": self.asset.id, "txn_type": "DIV", "div_amount": "3", "timestamp": "2021-02-01T00:00:00+00:00"},
+            ],
+            "update": [{"id": rows[0].id, "quantity": "5"}],
+            "delete": [rows[1].id, rows[2].id],
+        }
+
+        with patch("portfolio.services.bulk_transactions.invalidate_analytics_cache") as invalidate:
+            response = self.client.post("/transactions/bulk", batch, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        invalidate.assert_called_once_with(self.user, ["AAA.AS"])
+        self.assertEqual(response.json()["deleted"], [rows[1].id, rows[2].id])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 9)
+        updated = Transaction.objects.get(id=rows[0].id)
+        self.assertEqual(updated.quantity, 5)
+        self.assertEqual(updated.row_hash, updated.compute_row_hash())
+
+        # one bad row rejects the whole batch
+        response = self.client.post("/transactions/bulk", {
+            "create": [{"asset_id": self.asset.id, "txn_type": "BUY", "quantity": "1"}],
+            "update": [{"id": rows[6].id, "quantity": "2"}],
+            "delete": [rows[5].id],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(e["op"], e["index"]) for e in response.json()["errors"]], [("create", 0)])
+        self.assertTrue(Transaction.objects.filter(id=rows[5].id).exists())
+
+        # only imports skip identical rows: two same-day buys at one price can be entered by hand
+        response = self.client.post("/transactions/bulk", {"update": [{"id": rows[6].id, "quantity": "2"}]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/transactions", {
+            "asset_id": self.asset.id, "txn_type": "BUY", "quantity": "2", "unit_price": "10",
+            "timestamp": rows[7].timestamp.isoformat(),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Transaction.objects.filter(user=self.user, row_hash=rows[7].row_hash).count(), 3)
+
+    def test_query_budgets_catch_n_plus_one_patterns(self):
+        with query_budget(5, repeat_limit=2):
+            self.client.get("/transactions", {"limit": 10})
+
+        # serialize() reads user and asset: one query each per row unless selected
+        with self.assertRaisesRegex(QueryBudgetExceeded, r"possible N\+1, 10 x SELECT"):
+            with query_budget(repeat_limit=2):
+                [txn.serialize() for txn in Transaction.objects.filter(user=self.user)]
+        with query_budget(1, repeat_limit=2):
+            [txn.serialize() for txn in Transaction.objects.filter(user=self.user).select_related("asset", "user")]
+
+        # the test runner is strict; outside it a request over budget is only logged
+        with override_settings(QUERY_BUDGETS={"transactions": 1}):
+            with self.assertRaisesRegex(QueryBudgetExceeded, r"GET /transactions: 3 queries, budget 1"):
+                self.client.get("/transactions")
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs("portfolio.queries", "WARNING"):
+                self.assertEqual(self.client.get("/transactions").status_code, 200)
+
+
+@tag("benchmark")
+class AnalyticsBenchmarkTests(TestCase):
+    """Smoke run of the benchmark suite; `manage.py test portfolio --tag benchmark` runs only this."""
+
+    def test_suite_reports_every_case_and_rolls_back(self):
+        output = StringIO()
+        call_command(
+            "benchmark_analytics", "--assets", "3", "--transactions", "60", "--years", "1", "--repeat", "1", "--skip-memory",
+            stdout=output,
+        )
+        report = json.loads(output.getvalue())
+
+        names = [result["name"] for result in report["results"]]
+        self.assertIn("get_close_prices_cached:stale", names)
+        self.assertIn("returns_payload", names)
+        self.assertIn("export:xlsx", names)
+        for result in report["results"]:
+            self.assertGreater(result["wall_seconds"], 0)
+        warm = next(result for result in report["results"] if result["name"] == "get_close_prices_cached:warm")
+        cold = next(result for result in report["results"] if result["name"] == "get_close_prices_cached:cold")
+        self.assertLess(warm["queries"], cold["queries"])
+        self.assertEqual(report["meta"]["scale"]["transactions"], 60)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_workers_start_without_the_analytics_stack(self):
+        lazy = measure_startup(repeat=1)
+        self.assertEqual(lazy.heavy_modules, [])
+        self.assertGreater(lazy.rss_bytes, 0)
+        self.assertTrue(lazy.slowest_imports)
+
+        preloaded = measure_startup(preload=True, repeat=1)
+        self.assertIn("pandas", preloaded.heavy_modules)
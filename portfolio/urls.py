@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# ASGI deployments serve analytics and price refreshes from the async views.
+analytics_views = async_views if settings.ASYNC_ANALYTICS_VIEWS else views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -10,23 +13,31 @@ urlpatterns = [
 
     # API Routes
     path("transactions", views.transactions, name="transactions"),
+    path("transactions/bulk", views.transactions_bulk, name="transactions-bulk"),
     path("transactions/<int:transaction_id>", views.transaction, name="transaction"),
     path("import", views.import_data, name="import"),
+    path("import/<int:job_id>", views.import_job, name="import-job"),
     path("export", views.export_data, name="export"),
 
     path("assets", views.assets, name="assets"), 
     path("assets/<int:asset_id>", views.asset, name="asset"), 
-    path("assets/<int:asset_id>/refresh-prices", views.refresh_asset_prices, name="asset-refresh-prices"),
+    path("assets/<int:asset_id>/refresh-prices", analytics_views.refresh_asset_prices, name="asset-refresh-prices"),
 
     path("profile", views.profile, name="profile"),
     path("profile/password", views.profile_password, name="profile-password"),
 
-    path("analytics/growth", views.analytics_growth, name="analytics-growth"),
-    path("analytics/allocation", views.analytics_allocation, name="analytics-allocation"),
-    path("analytics/asset-growth", views.analytics_asset_growth, name="analytics-asset-growth"),
-    path("analytics/dividends-monthly", views.analytics_dividends_monthly, name="analytics-dividends-monthly"),
-    path("analytics/winners-losers", views.analytics_winners_losers, name="analytics-winners-losers"),
-    path("analytics/details", views.analytics_details, name="analytics-details"),
+    path("analytics/growth", analytics_views.analytics_growth, name="analytics-growth"),
+    path("analytics/allocation", analytics_views.analytics_allocation, name="analytics-allocation"),
+    path("analytics/asset-growth", analytics_views.analytics_asset_growth, name="analytics-asset-growth"),
+    path("analytics/dividends-monthly", analytics_views.analytics_dividends_monthly, name="analytics-dividends-monthly"),
+    path("analytics/winners-losers", analytics_views.analytics_winners_losers, name="analytics-winners-losers"),
+    path("analytics/matrices/<str:name>", views.analytics_matrix, name="analytics-matrix"),
+    path("analytics/details", analytics_views.analytics_details, name="analytics-details"),
+    path("analytics/returns", analytics_views.analytics_returns, name="analytics-returns"),
+    path("analytics/valuation", analytics_views.analytics_valuation, name="analytics-valuation"),
+
+    path("metrics", views.metrics, name="metrics"),
+    path("debug/prices", views.debug_prices, name="debug-prices"),
 ]
 
 if settings.REGISTRATION_ENABLED:
@@ -1,7 +1,7 @@
 from django.shortcuts import render
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.conf import settings
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.db import IntegrityError
 from django.db import transaction as db_transaction
 from django.db.models import Q
@@ -9,30 +9,39 @@ from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.contrib.auth.decorators import login_required
-from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_date, parse_datetime
 from django.core.exceptions import ValidationError
 from django.core.cache import cache
 
+import hmac
 import json
 import logging
-import re
-from io import BytesIO
-from datetime import datetime, timezone as dt_timezone
-
-from .models import User, Asset, Transaction
-from .services.prices_cache import refresh_asset_price_history
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from .models import User, Asset, ImportJob, Transaction
+from .services.analytics_cache import (
+    analytics_cache_key as _analytics_cache_key,
+    invalidate_analytics_cache,
+    payload_cache_timeout,
+    priced_value,
+    return_period,
+)
+from .services.bulk_transactions import BulkTransactionError, apply_bulk_transactions
+from .services.conditional import conditional_get, mark_user_data_changed, payload_response, prices_version
+from .services.exports import iter_csv_export, write_xlsx_export
+from .services.import_jobs import enqueue_import
+from .services.profiling import bypass_cache
+from .services.request_timing import record_cache
+from .services.transaction_list import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    TransactionListError,
+    parse_fields,
+    transaction_page,
+)
 
 logger = logging.getLogger(__name__)
 
-ANALYTICS_CACHE_TIMEOUT = 300  # 5 minutes
-
-def _analytics_cache_key(user_id, endpoint):
-    return f"analytics:{user_id}:{endpoint}"
-
-def invalidate_analytics_cache(user):
-    for endpoint in ("growth", "allocation", "asset_growth", "dividends_monthly", "winners_losers", "details"):
-        cache.delete(_analytics_cache_key(user.id, endpoint))
-
 try:
     from django_ratelimit.decorators import ratelimit
 except ModuleNotFoundError:
@@ -131,11 +140,66 @@ def register(request):
         return render(request, "portfolio/register.html")
     
 # Transaction views
+def _page_size(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise TransactionListError("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise TransactionListError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def _transaction_list_filters(params):
+    """asset/type/date filters of GET /transactions. Dates are UTC days, both ends inclusive."""
+    filters = {}
+
+    if params.get("asset_id"):
+        try:
+            filters["asset_id"] = int(params["asset_id"])
+        except ValueError:
+            raise TransactionListError("asset_id must be an integer")
+
+    if params.get("txn_type"):
+        txn_type = params["txn_type"].upper()
+        if txn_type not in Transaction.TransactionType.values:
+            raise TransactionListError("txn_type must be BUY, SELL or DIV")
+        filters["txn_type"] = txn_type
+
+    for param, key, offset in (("from", "date_from", 0), ("to", "date_to", 1)):
+        if not params.get(param):
+            continue
+        try:
+            day = parse_date(params[param])
+        except ValueError:
+            day = None
+        if day is None:
+            raise TransactionListError(f"{param} must be a date (YYYY-MM-DD)")
+        filters[key] = datetime.combine(day + timedelta(days=offset), time.min, tzinfo=dt_timezone.utc)
+
+    return filters
+
+
 @login_required
+@conditional_get()
 def transactions(request):
     if request.method == "GET":
-        transactions = (Transaction.objects.filter(user=request.user).select_related("asset").order_by("-timestamp"))
-        return JsonResponse({"transactions": [transaction.serialize() for transaction in transactions]})
+        try:
+            fields = parse_fields(request.GET.get("fields"))
+            limit = _page_size(request.GET.get("limit"))
+            filters = _transaction_list_filters(request.GET)
+            page = transaction_page(
+                request.user,
+                fields=fields,
+                cursor=request.GET.get("cursor"),
+                limit=limit,
+                filters=filters,
+            )
+        except TransactionListError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        return JsonResponse(page)
 
     if request.method == "POST":
         data = json.loads(request.body or "{}")
@@ -170,19 +234,21 @@ def transactions(request):
         except ValidationError as error:
             return JsonResponse({"errors": error.message_dict}, status=400)
 
-        invalidate_analytics_cache(request.user)
+        invalidate_analytics_cache(request.user, [asset.data_symbol])
         return JsonResponse(transaction.serialize(), status=201)
 
 @login_required
 def transaction(request, transaction_id):
     try:
-        transaction = Transaction.objects.select_related("asset").get(id=transaction_id, user=request.user)
+        transaction = Transaction.objects.select_related("asset", "user").get(id=transaction_id, user=request.user)
     except Transaction.DoesNotExist:
         return JsonResponse({"error": "Transaction not found"}, status=404)
 
     if request.method == "GET":
         return JsonResponse(transaction.serialize())
 
+    original_data_symbol = transaction.asset.data_symbol
+
     if request.method == "PUT":
         data = json.loads(request.body or "{}")
 
@@ -207,18 +273,49 @@ def transaction(request, transaction_id):
         except ValidationError as error:
             return JsonResponse({"errors": error.message_dict}, status=400)
 
-        invalidate_analytics_cache(request.user)
+        invalidate_analytics_cache(request.user, [original_data_symbol, transaction.asset.data_symbol])
         return JsonResponse(transaction.serialize())
 
     if request.method == "DELETE":
         transaction.delete()
-        invalidate_analytics_cache(request.user)
+        invalidate_analytics_cache(request.user, [original_data_symbol])
         return JsonResponse({"message": "Deleted"})
 
     return JsonResponse({"error": "GET, PUT, DELETE required"}, status=405)
 
 
 @login_required
+def transactions_bulk(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+
+    try:
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    operations = {}
+    for key in ("create", "update", "delete"):
+        value = data.get(key) or []
+        if not isinstance(value, list):
+            return JsonResponse({"error": f"{key} must be a list"}, status=400)
+        operations[key] = value
+
+    try:
+        result = apply_bulk_transactions(
+            request.user,
+            creates=operations["create"],
+            updates=operations["update"],
+            deletes=operations["delete"],
+        )
+    except BulkTransactionError as error:
+        return JsonResponse({"errors": error.errors}, status=400)
+
+    return JsonResponse(result)
+
+
+@login_required
+@conditional_get()
 def assets(request):
     # GET: list / search assets
     if request.method == "GET":
@@ -290,6 +387,7 @@ def assets(request):
         except IntegrityError:
             return JsonResponse({"error": "Asset already exists for this account"}, status=400)
 
+        mark_user_data_changed(request.user)
         return JsonResponse({
             "id": asset.id,
             "ticker": asset.ticker,
@@ -361,7 +459,10 @@ def asset(request, asset_id):
 
         try:
             asset.full_clean()
-            asset.save()
+            with db_transaction.atomic():
+                asset.save()
+                if symbol_changed:
+                    Transaction.rehash_asset(asset)
         except ValidationError as error:
             return JsonResponse({"errors": error.message_dict}, status=400)
         except IntegrityError:
@@ -369,9 +470,13 @@ def asset(request, asset_id):
 
         refresh_result = None
         if refresh_prices:
+            try:
+                from portfolio.services.prices_cache import refresh_asset_price_history
+            except ModuleNotFoundError:
+                return JsonResponse({"error": "Price refresh is unavailable because pandas is not installed"}, status=500)
             refresh_result = refresh_asset_price_history(asset, user=request.user)
 
-        invalidate_analytics_cache(request.user)
+        invalidate_analytics_cache(request.user, [original_data_symbol, asset.data_symbol])
         return JsonResponse({
             "id": asset.id,
             "ticker": asset.ticker,
@@ -393,7 +498,7 @@ def asset(request, asset_id):
             )
 
         asset.delete()
-        invalidate_analytics_cache(request.user)
+        invalidate_analytics_cache(request.user, [asset.data_symbol])
         return JsonResponse({"message": "Deleted"})
 
     return JsonResponse({"error": "GET, PUT, or DELETE required"}, status=405)
@@ -404,13 +509,18 @@ def refresh_asset_prices(request, asset_id):
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=405)
 
+    try:
+        from portfolio.services.prices_cache import refresh_asset_price_history
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Price refresh is unavailable because pandas is not installed"}, status=500)
+
     try:
         asset = Asset.objects.get(id=asset_id, user=request.user)
     except Asset.DoesNotExist:
         return JsonResponse({"error": "Asset not found"}, status=404)
 
     result = refresh_asset_price_history(asset, user=request.user)
-    invalidate_analytics_cache(request.user)
+    invalidate_analytics_cache(request.user, [asset.data_symbol])
     return JsonResponse({
         "asset_id": asset.id,
         "data_symbol": asset.data_symbol,
@@ -503,61 +613,7 @@ def profile_password(request):
 
     return JsonResponse({"message": "Password updated"})
 
-### IMPORTING FROM CSV AND HELPER FUNCTIONS
-
-def _normalize_header(value):
-    if value is None:
-        return ""
-    text = str(value).strip().lower()
-    text = re.sub(r"\s+", "_", text)  # all whitespace -> underscore
-    return text
-
-
-def _clean_text(value):
-    if value is None:
-        return ""
-    return str(value).strip()
-
-
-def _clean_decimal(value):
-    """
-    Takes Excel values like '€415.10' or '415,10' and returns a string like '415.10'.
-    Returns None if empty.
-    """
-    if value is None or value == "":
-        return None
-
-    text = str(value).strip()
-    text = text.replace("€", "").replace("$", "").replace("£", "")
-    text = text.replace(" ", "")
-
-    # comma decimal (EU) -> dot
-    if "," in text and "." not in text:
-        text = text.replace(",", ".")
-
-    # thousand separators
-    if "," in text and "." in text:
-        text = text.replace(",", "")
-
-    return text or None
-
-
-def _parse_unix_timestamp(value):
-    if value is None or str(value).strip() == "":
-        return None
-
-    text = str(value).strip()
-    if not text.isdigit():
-        return None
-
-    seconds = int(text)
-    dt_utc = datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
-    return dt_utc.astimezone(timezone.get_current_timezone())
-
-
-def _derive_ticker(data_symbol):
-    return data_symbol.split(".")[0].strip().upper()
-
+### IMPORTING
 
 @login_required
 def import_data(request):
@@ -567,88 +623,40 @@ def import_data(request):
     if "file" not in request.FILES:
         return JsonResponse({"error": "No file uploaded (field name should be 'file')"}, status=400)
 
-    uploaded_file = request.FILES["file"]
-    if not (uploaded_file.name or "").lower().endswith(".xlsx"):
-        return JsonResponse({"error": "Please upload an .xlsx file"}, status=400)
-
     try:
-        from openpyxl import load_workbook
-    except ModuleNotFoundError:
+        from .services.imports import SUPPORTED_IMPORT_EXTENSIONS, import_extension
+    except ModuleNotFoundError as error:
         return JsonResponse(
-            {"error": "Excel import is unavailable because openpyxl is not installed"},
+            {"error": f"Import is unavailable because {error.name} is not installed"},
             status=500,
         )
 
-    workbook = load_workbook(uploaded_file, data_only=True)
-    sheet = workbook.active
-
-    header_row = list(sheet.iter_rows(min_row=1, max_row=1, values_only=True))[0]
-    headers = [_normalize_header(h) for h in header_row]
-    header_set = set([h for h in headers if h])
-
-    required = {"data_symbol", "txn_type", "timestamp"}
-    missing = required - header_set
-    if missing:
-        return JsonResponse({"error": f"Missing required columns: {sorted(list(missing))}"}, status=400)
-
-    created_assets = 0
-    created_transactions = 0
-    row_errors = []
-
-    for excel_row_index, row_values in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        row = dict(zip(headers, row_values))
-
-        data_symbol = _clean_text(row.get("data_symbol"))
-        txn_type = _clean_text(row.get("txn_type")).upper()
-        ts = _parse_unix_timestamp(row.get("timestamp"))
-
-        quantity = _clean_decimal(row.get("quantity"))
-        unit_price = _clean_decimal(row.get("unit_price"))
-        div_amount = _clean_decimal(row.get("div_amount"))
-
-        if not data_symbol or not txn_type:
-            row_errors.append({"row": excel_row_index, "error": "data_symbol and txn_type are required"})
-            continue
+    uploaded_file = request.FILES["file"]
+    extension = import_extension(uploaded_file.name)
+    if extension is None:
+        return JsonResponse(
+            {"error": f"Please upload one of: {', '.join(SUPPORTED_IMPORT_EXTENSIONS)}"},
+            status=400,
+        )
 
-        if ts is None:
-            row_errors.append({"row": excel_row_index, "error": "timestamp must be unix seconds (e.g. 1610323200)"})
-            continue
+    # Stored and processed by the import worker; the client polls the job.
+    job = enqueue_import(request.user, uploaded_file, extension)
+    response = JsonResponse(job.serialize(), status=202)
+    response["Location"] = reverse("import-job", args=[job.id])
+    return response
 
-        asset, was_created = Asset.objects.get_or_create(
-            user=request.user,
-            data_symbol=data_symbol,
-            defaults={
-                "ticker": _derive_ticker(data_symbol),
-                "name": "",
-                "exchange": "",
-                "currency": "EUR",
-                "asset_type": Asset.AssetType.STOCK,
-            }
-        )
-        if was_created:
-            created_assets += 1
 
-        txn = Transaction(
-            user=request.user,
-            asset=asset,
-            txn_type=txn_type,
-            quantity=quantity,
-            unit_price=unit_price,
-            div_amount=div_amount,
-            timestamp=ts,
-        )
+@login_required
+def import_job(request, job_id):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
 
-        try:
-            txn.save()  # model save calls full_clean()
-            created_transactions += 1
-        except Exception as e:
-            row_errors.append({"row": excel_row_index, "error": str(e)})
+    try:
+        job = ImportJob.objects.get(id=job_id, user=request.user)
+    except ImportJob.DoesNotExist:
+        return JsonResponse({"error": "Import job not found"}, status=404)
 
-    return JsonResponse({
-        "created_transactions": created_transactions,
-        "created_assets": created_assets,
-        "row_errors": row_errors,
-    }, status=201)
+    return JsonResponse(job.serialize())
 
 
 @login_required
@@ -656,55 +664,51 @@ def export_data(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
 
+    export_format = request.GET.get("format", "xlsx").lower()
+    if export_format not in ("xlsx", "csv"):
+        return JsonResponse({"error": "format must be xlsx or csv"}, status=400)
+
+    filename = f"transactions_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    if export_format == "csv":
+        response = StreamingHttpResponse(iter_csv_export(request.user), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
     try:
-        from openpyxl import Workbook
+        output = write_xlsx_export(request.user)
     except ModuleNotFoundError:
         return JsonResponse(
             {"error": "Excel export is unavailable because openpyxl is not installed"},
             status=500,
         )
 
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.title = "transactions"
-
-    headers = ["data_symbol", "txn_type", "quantity", "unit_price", "div_amount", "timestamp"]
-    sheet.append(headers)
-
-    transactions = (
-        Transaction.objects
-        .filter(user=request.user)
-        .select_related("asset")
-        .order_by("timestamp")
-    )
-
-    for transaction in transactions:
-        unix_ts = int(transaction.timestamp.astimezone(dt_timezone.utc).timestamp())
-        sheet.append([
-            transaction.asset.data_symbol,
-            transaction.txn_type,
-            str(transaction.quantity) if transaction.quantity is not None else "",
-            str(transaction.unit_price) if transaction.unit_price is not None else "",
-            str(transaction.div_amount) if transaction.div_amount is not None else "",
-            unix_ts,
-        ])
-
-    output = BytesIO()
-    workbook.save(output)
-    output.seek(0)
-
-    filename = f"transactions_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response = HttpResponse(
-        output.getvalue(),
+    # FileResponse streams the temporary file in blocks and closes (deletes) it afterwards.
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    return response
 
 
 ### ANALYTICS
 
+def _cached_analytics_response(user, entry, payload_function, **kwargs):
+    from portfolio.services.analytics import budgeted_payload
+
+    key = _analytics_cache_key(user.id, entry)
+    version = prices_version(user.id)
+    payload = None if bypass_cache() else priced_value(cache.get(key), version)
+    record_cache(entry, payload is not None)
+    if payload is None:
+        payload = budgeted_payload(payload_function, user, **kwargs)
+        cache.set(key, (version, payload), payload_cache_timeout(payload))
+    return payload_response(payload)
+
+
 @login_required
+@conditional_get(prices=True)
 def analytics_growth(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -714,15 +718,11 @@ def analytics_growth(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    key = _analytics_cache_key(request.user.id, "growth")
-    payload = cache.get(key)
-    if payload is None:
-        payload = growth_payload(request.user)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    return _cached_analytics_response(request.user, "growth", growth_payload)
 
 
 @login_required
+@conditional_get(prices=True)
 def analytics_allocation(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -732,15 +732,11 @@ def analytics_allocation(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    key = _analytics_cache_key(request.user.id, "allocation")
-    payload = cache.get(key)
-    if payload is None:
-        payload = allocation_payload(request.user)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    return _cached_analytics_response(request.user, "allocation", allocation_payload)
 
 
 @login_required
+@conditional_get(prices=True)
 def analytics_asset_growth(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -750,15 +746,11 @@ def analytics_asset_growth(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    key = _analytics_cache_key(request.user.id, "asset_growth")
-    payload = cache.get(key)
-    if payload is None:
-        payload = asset_growth_payload(request.user)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    return _cached_analytics_response(request.user, "asset_growth", asset_growth_payload)
 
 
 @login_required
+@conditional_get(prices=True)
 def analytics_dividends_monthly(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -768,15 +760,11 @@ def analytics_dividends_monthly(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    key = _analytics_cache_key(request.user.id, "dividends_monthly")
-    payload = cache.get(key)
-    if payload is None:
-        payload = dividends_monthly_payload(request.user)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    return _cached_analytics_response(request.user, "dividends_monthly", dividends_monthly_payload)
 
 
 @login_required
+@conditional_get(prices=True)
 def analytics_winners_losers(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -786,16 +774,12 @@ def analytics_winners_losers(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    period = request.GET.get("range", "M")
-    key = _analytics_cache_key(request.user.id, f"winners_losers:{period}")
-    payload = cache.get(key)
-    if payload is None:
-        payload = winners_losers_payload(request.user, period=period)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    period = return_period(request.GET.get("range"))
+    return _cached_analytics_response(request.user, f"winners_losers:{period}", winners_losers_payload, period=period)
 
 
 @login_required
+@conditional_get(prices=True)
 def analytics_details(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET required"}, status=405)
@@ -805,9 +789,133 @@ def analytics_details(request):
     except ModuleNotFoundError:
         return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
 
-    key = _analytics_cache_key(request.user.id, "details")
-    payload = cache.get(key)
-    if payload is None:
-        payload = details_payload(request.user)
-        cache.set(key, payload, ANALYTICS_CACHE_TIMEOUT)
-    return JsonResponse(payload)
+    return _cached_analytics_response(request.user, "details", details_payload)
+
+
+@login_required
+@conditional_get(prices=True)
+def analytics_returns(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+
+    try:
+        from portfolio.services.analytics import returns_payload
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
+
+    return _cached_analytics_response(request.user, "returns_payload", returns_payload)
+
+
+@login_required
+@conditional_get(prices=True)
+def analytics_valuation(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+
+    try:
+        from portfolio.services.analytics import budgeted_payload, valuation_payload
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
+
+    as_of = None
+    if request.GET.get("as_of"):
+        try:
+            as_of = parse_date(request.GET["as_of"])
+        except ValueError:
+            as_of = None
+        if as_of is None:
+            return JsonResponse({"error": "as_of must be a date (YYYY-MM-DD)"}, status=400)
+        if as_of > timezone.now().date():
+            return JsonResponse({"error": "as_of cannot be in the future"}, status=400)
+
+    payload = budgeted_payload(valuation_payload, request.user, as_of=as_of)
+    return payload_response(payload)
+
+
+@login_required
+@conditional_get(prices=True)
+def analytics_matrix(request, name):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+
+    try:
+        from portfolio.services.analytics import MATRIX_NAMES, analytics_matrices
+        from portfolio.services.arrow_export import ARROW_FORMATS, matrix_table, table_bytes
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Analytics is unavailable because pandas is not installed"}, status=500)
+
+    if name not in MATRIX_NAMES:
+        return JsonResponse({"error": f"matrix must be one of: {', '.join(MATRIX_NAMES)}"}, status=404)
+
+    export_format = request.GET.get("format", "arrow").lower()
+    if export_format not in ARROW_FORMATS:
+        return JsonResponse({"error": f"format must be one of: {', '.join(ARROW_FORMATS)}"}, status=400)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ModuleNotFoundError:
+        return JsonResponse({"error": "Arrow export is unavailable because pyarrow is not installed"}, status=500)
+
+    matrices = analytics_matrices(request.user, names=[name])
+    if not matrices:
+        return JsonResponse({"error": "No transactions to export"}, status=404)
+
+    as_of = timezone.now().date()
+    table = matrix_table(matrices[name], name, as_of=as_of)
+    content_type, file_extension = ARROW_FORMATS[export_format]
+
+    response = HttpResponse(table_bytes(table, export_format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{name}_{as_of:%Y%m%d}{file_extension}"'
+    return response
+
+
+
+### OPERATIONS
+
+def _metrics_allowed(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    # scrapers have no session; they send METRICS_TOKEN as a bearer token
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(authorization, f"Bearer {token}")
+
+
+def metrics(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+    if not _metrics_allowed(request):
+        return JsonResponse({"error": "Staff only"}, status=403)
+
+    from portfolio.services.metrics import render_prometheus
+
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def debug_prices(request):
+    """Staff only: explain_price_decisions() for ?user= (default: yourself) and ?symbols=A,B."""
+    if request.method != "GET":
+        return JsonResponse({"error": "GET required"}, status=405)
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return JsonResponse({"error": "Staff only"}, status=403)
+
+    from portfolio.services.price_explain import explain_price_decisions
+
+    user = request.user
+    if request.GET.get("user"):
+        try:
+            user = User.objects.get(username=request.GET["user"])
+        except User.DoesNotExist:
+            return JsonResponse({"error": "User not found"}, status=404)
+
+    symbols = [symbol.strip() for symbol in request.GET.get("symbols", "").split(",") if symbol.strip()]
+    try:
+        reports = explain_price_decisions(
+            user,
+            data_symbols=symbols or None,
+            start_date=request.GET.get("start") or None,
+            end_date=request.GET.get("end") or None,
+        )
+    except ValueError:
+        return JsonResponse({"error": "start and end must be dates (YYYY-MM-DD)"}, status=400)
+    return JsonResponse({"user": user.username, "symbols": reports})